@@ -0,0 +1,107 @@
+"""
+Activity Log Writer
+Request handlers enqueue activity/audit events in memory and return immediately;
+a background flusher writes them to the storage backend in batches (one Firestore
+batched write per up to 500 events), retrying failed batches and draining the
+queue on shutdown.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+
+from storage_backend import get_storage
+
+MAX_QUEUE = 10000              # Events held while storage is slow/down; beyond this new events are dropped
+BATCH_SIZE = 500               # Events per write (Firestore's limit on writes per batch)
+FLUSH_INTERVAL_SECONDS = 2.0
+MAX_ATTEMPTS = 5
+SHUTDOWN_TIMEOUT_SECONDS = 10
+
+
+class ActivityLogWriter:
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_QUEUE)
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.stats = {"queued": 0, "dropped": 0, "written": 0, "batches": 0, "retries": 0, "failed": 0}
+
+    def log(self, user_id: Optional[str], activity_type: str, details: Optional[dict] = None) -> bool:
+        """Enqueue an event without waiting for storage. False if the queue is full."""
+        event = {
+            "user_id": user_id,
+            "type": activity_type,
+            "details": details or {},
+            "timestamp": datetime.utcnow(),  # When it happened, not when the batch lands
+        }
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["queued"] += 1
+        if self._queue.qsize() >= BATCH_SIZE:
+            self._wake.set()  # A full batch is waiting: don't sit out the interval
+        return True
+
+    def _take(self) -> List[dict]:
+        chunk = []
+        while len(chunk) < BATCH_SIZE and not self._queue.empty():
+            chunk.append(self._queue.get_nowait())
+        return chunk
+
+    async def _write(self, chunk: List[dict], attempts: int = MAX_ATTEMPTS) -> bool:
+        for attempt in range(attempts):
+            try:
+                await get_storage().add_activity_logs(chunk)
+                self.stats["written"] += len(chunk)
+                self.stats["batches"] += 1
+                return True
+            except Exception as e:
+                if attempt + 1 == attempts:
+                    print(f"[ACTIVITY LOG] Dropping {len(chunk)} events after {attempts} attempts: {e}")
+                    break
+                self.stats["retries"] += 1
+                await asyncio.sleep(min(2 ** attempt, 30))
+        self.stats["failed"] += len(chunk)
+        return False
+
+    async def flush(self, attempts: int = MAX_ATTEMPTS):
+        """Write everything queued so far"""
+        while not self._queue.empty():
+            await self._write(self._take(), attempts)
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush(attempts=1 if self._closing else MAX_ATTEMPTS)
+        await self.flush(attempts=1)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher after writing out whatever is still queued"""
+        if not self._task:
+            return
+        self._closing = True
+        self._wake.set()
+        try:
+            await asyncio.wait_for(self._task, SHUTDOWN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            print(f"[ACTIVITY LOG] Shutdown flush timed out, {self._queue.qsize()} events lost")
+        self._task = None
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "pending": self._queue.qsize()}
+
+
+# Global instance
+activity_log = ActivityLogWriter()
@@ -7,6 +7,7 @@ from bson import ObjectId
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
+TOKEN_LEEWAY_SECONDS = 1  # Same as dependencies.py: iat can be up to 1s ahead after an invalidation
 
 # Global database reference (will be set by main app)
 db: AsyncIOMotorDatabase = None
@@ -22,7 +23,7 @@ class AdminAuth:
     @staticmethod
     def verify_token(token: str) -> dict:
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], leeway=TOKEN_LEEWAY_SECONDS)
             return payload
         except jwt.ExpiredSignatureError:
             raise HTTPException(
@@ -0,0 +1,166 @@
+"""
+Advisory Precompute
+Background job that evaluates the advisory rules once per symbol on any user's
+watchlist (deduplicated across users) and stores the results in Redis keyed by
+rule version and symbol, so /portfolio/signals and /portfolio/screener-match are
+lookups. A symbol is re-evaluated only when its rule inputs change.
+"""
+
+import asyncio
+import hashlib
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from advisory_rules import (
+    RULES_VERSION,
+    generate_advisory_signals,
+    generate_screener_conditions,
+    validate_screener_conditions,
+)
+from portfolio_loader import PortfolioLoader
+from redis_config import redis_manager
+from storage_backend import get_storage
+
+PRECOMPUTE_INTERVAL_SECONDS = 300
+RESULT_TTL = 2 * 86400  # Outlives a missed run or two; stale inputs are replaced on the next one
+
+
+def _input_hash(stock_data: dict) -> str:
+    """Fingerprint of exactly the fields the rules read"""
+    quote = stock_data.get("quote") or {}
+    inputs = [
+        quote.get("ltp"), quote.get("close"),
+        stock_data.get("pe_ratio"), stock_data.get("debt_equity"),
+        stock_data.get("roe"), stock_data.get("revenue_growth"),
+    ]
+    return hashlib.md5(json.dumps(inputs, default=str).encode()).hexdigest()[:16]
+
+
+class AdvisoryPrecomputer:
+    """advisory:{RULES_VERSION}:{symbol} -> {input_hash, signals, conditions, screener_status, ...}"""
+
+    def __init__(self):
+        self.redis = redis_manager
+        self._hashes: Dict[str, str] = {}  # symbol -> input hash of the stored result
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[datetime] = None
+        self.stats = {"runs": 0, "symbols": 0, "computed": 0, "unchanged": 0, "lookups": 0, "misses": 0}
+
+    def _key(self, symbol: str) -> str:
+        return f"advisory:{RULES_VERSION}:{symbol}"
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    async def get_many(self, symbols: List[str]) -> Dict[str, dict]:
+        """Stored results for the symbols that have one"""
+        if not symbols or not self.redis.is_connected:
+            return {}
+        raw = await asyncio.gather(*(self.redis.get(self._key(s)) for s in symbols), return_exceptions=True)
+        results = {}
+        for symbol, value in zip(symbols, raw):
+            self.stats["lookups"] += 1
+            if not value or isinstance(value, Exception):
+                self.stats["misses"] += 1
+                continue
+            try:
+                results[symbol] = json.loads(value)
+            except Exception:
+                self.stats["misses"] += 1
+        return results
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    async def compute(self, symbol: str, stock_data: dict) -> dict:
+        """Evaluate the rules for one symbol and store the result"""
+        input_hash = _input_hash(stock_data)
+        result = {
+            "symbol": symbol,
+            "rules_version": RULES_VERSION,
+            "input_hash": input_hash,
+            "has_quote": bool(stock_data.get("quote")),
+            "signals": await generate_advisory_signals(symbol, stock_data),
+            "conditions": await generate_screener_conditions(symbol, stock_data),
+            "screener_status": validate_screener_conditions(symbol, stock_data),
+            "computed_at": datetime.utcnow().isoformat(),
+        }
+        # Nothing fetched (upstream failure): answer this caller but don't pin the empty result
+        if self.redis.is_connected and (stock_data.get("quote") or stock_data.get("fundamentals")):
+            try:
+                await self.redis.set(self._key(symbol), json.dumps(result), RESULT_TTL)
+                self._hashes[symbol] = input_hash
+            except Exception as e:
+                print(f"[ADVISORY] Store failed for {symbol}: {e}")
+        self.stats["computed"] += 1
+        return result
+
+    @staticmethod
+    async def _watchlist_symbols() -> List[dict]:
+        """Every (symbol, exchange) on any user's watchlist, once"""
+        seen = {}
+        for item in await get_storage().list_watchlist_symbols():
+            if not item.get("symbol"):
+                continue
+            stock = {"symbol": item["symbol"], "exchange": item.get("exchange", "NSE")}
+            seen.setdefault(PortfolioLoader.key(stock), stock)
+        return list(seen.values())
+
+    async def run_once(self) -> dict:
+        stocks = await self._watchlist_symbols()
+        if not stocks:
+            return {"symbols": 0, "computed": 0}
+
+        loader = PortfolioLoader(stocks)
+        data = await loader.stock_data()
+        if not self._hashes:
+            # After a restart, recover the stored hashes instead of recomputing everything
+            stored = await self.get_many(list(data))
+            self._hashes.update({symbol: entry.get("input_hash") for symbol, entry in stored.items()})
+
+        computed = 0
+        for symbol, stock_data in data.items():
+            if not stock_data.get("quote") and not stock_data.get("fundamentals"):
+                continue  # Upstream failure: keep the previous result rather than storing an empty one
+            if self._hashes.get(symbol) == _input_hash(stock_data):
+                self.stats["unchanged"] += 1
+                continue
+            await self.compute(symbol, stock_data)
+            computed += 1
+
+        self.last_run = datetime.now()
+        self.stats["runs"] += 1
+        self.stats["symbols"] = len(data)
+        print(f"[ADVISORY] Evaluated {len(data)} watchlist symbols, {computed} with changed inputs")
+        return {"symbols": len(data), "computed": computed}
+
+    def start(self, interval: int = PRECOMPUTE_INTERVAL_SECONDS):
+        async def loop():
+            while True:
+                try:
+                    await self.run_once()
+                except Exception as e:
+                    print(f"[ADVISORY] Precompute run failed: {e}")
+                await asyncio.sleep(interval)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "rules_version": RULES_VERSION,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+        }
+
+
+# Global instance
+advisory_precomputer = AdvisoryPrecomputer()
@@ -0,0 +1,198 @@
+"""
+Advisory Rules
+Screener-condition and advisory-signal rules evaluated over a stock's combined
+quote + fundamentals data (the portfolio_loader stock_data shape).
+"""
+
+from datetime import datetime
+from typing import List
+
+# Bump whenever a rule or threshold below changes: precomputed results are keyed by it
+RULES_VERSION = "1"
+
+
+def validate_screener_conditions(symbol: str, stock_data: dict) -> str:
+    """Validate if stock still meets common screener conditions"""
+    try:
+        quote = stock_data.get("quote", {})
+        if not quote:
+            return "not_matched"
+        
+        ltp = quote.get("ltp", 0)
+        if ltp <= 0:
+            return "not_matched"
+        
+        # Get fundamentals
+        pe_ratio = stock_data.get("pe_ratio")
+        debt_equity = stock_data.get("debt_equity")
+        roe = stock_data.get("roe")
+        
+        matched_count = 0
+        total_conditions = 0
+        
+        # Common screener conditions
+        if pe_ratio is not None:
+            total_conditions += 1
+            if 0 < pe_ratio < 30:
+                matched_count += 1
+        
+        if debt_equity is not None:
+            total_conditions += 1
+            if debt_equity < 1.5:
+                matched_count += 1
+        
+        if roe is not None:
+            total_conditions += 1
+            if roe > 10:
+                matched_count += 1
+        
+        # If no fundamental data available, check price movement
+        if total_conditions == 0:
+            prev_close = quote.get("close", 0)
+            if prev_close > 0:
+                change_pct = ((ltp - prev_close) / prev_close) * 100
+                # If price hasn't crashed, consider partially matched
+                if change_pct > -10:
+                    return "partially_matched"
+            return "not_matched"
+        
+        # Calculate match percentage
+        match_pct = (matched_count / total_conditions) if total_conditions > 0 else 0
+        
+        if match_pct >= 0.8:
+            return "fully_matched"
+        elif match_pct >= 0.4:
+            return "partially_matched"
+        else:
+            return "not_matched"
+    except Exception as e:
+        print(f"[SCREENER VALIDATION ERROR] {symbol}: {e}")
+        return "not_matched"
+
+
+async def generate_screener_conditions(symbol: str, stock_data: dict) -> List[dict]:
+    """Generate actual screener conditions based on real data"""
+    conditions = []
+    
+    quote = stock_data.get("quote", {})
+    pe_ratio = stock_data.get("pe_ratio")
+    debt_equity = stock_data.get("debt_equity")
+    roe = stock_data.get("roe")
+    revenue_growth = stock_data.get("revenue_growth")
+    
+    # PE Ratio condition
+    if pe_ratio is not None and pe_ratio > 0:
+        status = "matched" if pe_ratio < 30 else "broken"
+        conditions.append({
+            "name": "PE Ratio < 30",
+            "status": status,
+            "current_value": f"{pe_ratio:.2f}",
+            "threshold": "< 30"
+        })
+    
+    # Debt/Equity condition
+    if debt_equity is not None:
+        status = "matched" if debt_equity < 1.5 else "broken"
+        conditions.append({
+            "name": "Debt/Equity < 1.5",
+            "status": status,
+            "current_value": f"{debt_equity:.2f}",
+            "threshold": "< 1.5"
+        })
+    
+    # ROE condition
+    if roe is not None:
+        status = "matched" if roe > 10 else "broken"
+        conditions.append({
+            "name": "ROE > 10%",
+            "status": status,
+            "current_value": f"{roe:.1f}%",
+            "threshold": "> 10%"
+        })
+    
+    # Revenue Growth
+    if revenue_growth is not None:
+        status = "matched" if revenue_growth > 5 else "broken"
+        conditions.append({
+            "name": "Revenue Growth > 5%",
+            "status": status,
+            "current_value": f"{revenue_growth:.1f}%",
+            "threshold": "> 5%"
+        })
+    
+    # Price momentum (from quote)
+    if quote:
+        ltp = quote.get("ltp", 0)
+        prev_close = quote.get("close", 0)
+        if ltp > 0 and prev_close > 0:
+            change_pct = ((ltp - prev_close) / prev_close) * 100
+            status = "matched" if change_pct > -5 else "broken"
+            conditions.append({
+                "name": "Not in severe decline",
+                "status": status,
+                "current_value": f"{change_pct:.2f}%",
+                "threshold": "> -5%"
+            })
+    
+    return conditions if conditions else [
+        {"name": "No data available", "status": "unknown", "current_value": "N/A", "threshold": "N/A"}
+    ]
+
+
+async def generate_advisory_signals(symbol: str, stock_data: dict) -> List[dict]:
+    """Generate advisory signals based on actual stock data"""
+    signals = []
+    
+    quote = stock_data.get("quote", {})
+    if not quote:
+        return signals
+    
+    ltp = quote.get("ltp", 0)
+    prev_close = quote.get("close", 0)
+    pe_ratio = stock_data.get("pe_ratio")
+    debt_equity = stock_data.get("debt_equity")
+    roe = stock_data.get("roe")
+    
+    # Price decline signal
+    if ltp > 0 and prev_close > 0:
+        change_pct = ((ltp - prev_close) / prev_close) * 100
+        if change_pct < -5:
+            signals.append({
+                "symbol": symbol,
+                "type": "price_movement",
+                "message": f"{symbol} declined {abs(change_pct):.1f}% today",
+                "severity": "warning",
+                "timestamp": datetime.utcnow().isoformat()
+            })
+    
+    # High PE signal
+    if pe_ratio and pe_ratio > 40:
+        signals.append({
+            "symbol": symbol,
+            "type": "valuation",
+            "message": f"{symbol} PE ratio at {pe_ratio:.1f}, above typical threshold",
+            "severity": "info",
+            "timestamp": datetime.utcnow().isoformat()
+        })
+    
+    # High debt signal
+    if debt_equity and debt_equity > 2:
+        signals.append({
+            "symbol": symbol,
+            "type": "fundamental_change",
+            "message": f"{symbol} debt-to-equity ratio at {debt_equity:.2f}, monitoring recommended",
+            "severity": "warning",
+            "timestamp": datetime.utcnow().isoformat()
+        })
+    
+    # Low ROE signal
+    if roe is not None and roe < 8:
+        signals.append({
+            "symbol": symbol,
+            "type": "profitability",
+            "message": f"{symbol} ROE at {roe:.1f}%, below typical threshold",
+            "severity": "info",
+            "timestamp": datetime.utcnow().isoformat()
+        })
+    
+    return signals
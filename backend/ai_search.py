@@ -1,17 +1,59 @@
 import os
+from typing import Tuple
 from gemini_service import gemini_service
+from query_validator import query_validator, FAST_PATH_CONFIDENCE
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Market leader returned for sector searches ("IT stocks" -> TCS), same rule the LLM prompt uses
+SECTOR_LEADERS = {
+    "it": "TCS",
+    "banking": "HDFCBANK",
+    "finance": "BAJFINANCE",
+    "pharma": "SUNPHARMA",
+    "auto": "TATAMOTORS",
+    "fmcg": "HINDUNILVR",
+    "energy": "RELIANCE",
+    "metals": "TATASTEEL",
+    "realty": "DLF",
+}
+
+def resolve_search_query(query: str) -> Tuple[str, str]:
+    """
+    Search query -> (symbol to search for, path taken).
+    Path is "rules" when query_validator recognized a company or sector with
+    enough confidence, "llm" when Gemini was asked, "passthrough" otherwise.
+    """
+    if len(query) < 3:
+        return query, "passthrough"
+    
+    try:
+        validated = query_validator.validate(query)
+        if validated.confidence >= FAST_PATH_CONFIDENCE:
+            if validated.stock_symbols:
+                symbol = validated.stock_symbols[0].split("-")[0]
+                print(f"[AI SEARCH] '{query}' → '{symbol}' (rules, {validated.confidence:.2f})")
+                return symbol, "rules"
+            leader = SECTOR_LEADERS.get((validated.sector or "").lower())
+            if leader:
+                print(f"[AI SEARCH] '{query}' → '{leader}' (rules, {validated.confidence:.2f})")
+                return leader, "rules"
+    except ValueError:
+        return query, "passthrough"
+    
+    result = _ai_search_llm(query)
+    return result, "llm" if result != query else "passthrough"
+
 def ai_search_query(query: str) -> str:
     """
     Use AI to interpret search query and return best stock symbol
     Returns symbol to search for, or original query if AI fails
     """
-    if len(query) < 3:
-        return query
-    
+    return resolve_search_query(query)[0]
+
+def _ai_search_llm(query: str) -> str:
+    """Ask Gemini for the best symbol; original query if it fails"""
     try:
         prompt = f"""You are a stock symbol assistant for Indian stocks (NSE/BSE).
         
@@ -23,6 +23,23 @@ load_dotenv()
 # Cache TTL
 ANGEL_HISTORY_TTL = 60 # 1 minute for intraday data (it changes fast)
 
+# Max days Angel One returns per getCandleData request, per interval
+ANGEL_HISTORY_MAX_DAYS = {
+    "ONE_MINUTE": 30,
+    "THREE_MINUTE": 60,
+    "FIVE_MINUTE": 100,
+    "TEN_MINUTE": 100,
+    "FIFTEEN_MINUTE": 200,
+    "THIRTY_MINUTE": 200,
+    "ONE_HOUR": 400,
+    "ONE_DAY": 2000
+}
+HISTORY_MAX_WORKERS = 3  # Parallel chunk fetches for long backfills
+
+
+class HistoryIncompleteError(Exception):
+    """Some history chunks failed and the candle store couldn't cover them"""
+
 
 # Angel One credentials
 API_KEY = os.getenv("ANGELONE_API_KEY")
@@ -84,6 +101,7 @@ class RateLimiter:
             self.params['last_call_time'] = time.time()
 
 _rate_limiter = RateLimiter(max_calls_per_second=3)
+_history_rate_limiter = RateLimiter(max_calls_per_second=3)  # Historical API has its own budget
 
 # Login rate limiting
 _last_login_attempt = {}
@@ -531,23 +549,82 @@ async def get_stock_history_angel(symbol: str, exchange: str = "NSE", days: int
     """
     # Import locally to avoid circular dependency
     from market_cache import market_data_cache
+    from candle_store import candle_store, calendar_days
     
     cache_key = f"angel_history:{symbol}:{exchange}:{interval}:{days}"
     cached_data = await market_data_cache.get(cache_key)
     if cached_data:
         return cached_data
 
+    # Split long ranges into chunks within Angel One's per-request day limit
+    to_date = datetime.now()
+    chunks = plan_history_chunks(to_date - timedelta(days=days), to_date, interval)
+    chunk_days = [calendar_days(_chunk_date(start), _chunk_date(end)) for start, end in chunks]
+    
+    # Chunks of closed days already backfilled come from the candle store, the rest from the API
+    today = to_date.strftime("%Y-%m-%d")
+    
+    async def read_stored(chunk, chunk_day_list):
+        if chunk_day_list[-1] >= today:
+            return None  # Today's bars are still forming
+        return await candle_store.read_range(
+            symbol, exchange, interval, _chunk_date(chunk[0]), _chunk_date(chunk[1]), complete=True
+        )
+    
+    stored = await asyncio.gather(*(read_stored(chunk, day_list) for chunk, day_list in zip(chunks, chunk_days)))
+    to_fetch = [chunk for chunk, candles in zip(chunks, stored) if candles is None]
+    
     # Run sync function in thread
-    data = await asyncio.to_thread(_get_stock_history_angel_sync, symbol, exchange, days, interval)
+    result = await asyncio.to_thread(_get_stock_history_angel_sync, symbol, exchange, interval, to_fetch) if to_fetch else ([], [])
+    if result is None:
+        return []
+    fetched, failed = result
+    if failed:
+        # Never cache or store a series with holes in it
+        raise HistoryIncompleteError(f"{len(failed)} of {len(chunks)} history chunks failed for {symbol} {interval}")
     
+    data = _merge_candles([candles for candles in stored if candles] + [fetched])
     if data:
         await market_data_cache.set(cache_key, data, ttl=ANGEL_HISTORY_TTL)
-        
+    
+    covered = [day for chunk, day_list in zip(chunks, chunk_days) if chunk in to_fetch for day in day_list]
+    await candle_store.write(symbol, exchange, interval, fetched, covered)
+    
     return data
 
-def _get_stock_history_angel_sync(symbol: str, exchange: str = "NSE", days: int = 30, interval: str = "ONE_DAY"):
+def _chunk_date(value: str) -> datetime:
+    """plan_history_chunks bound ("YYYY-MM-DD HH:MM") -> datetime"""
+    return datetime.strptime(value, "%Y-%m-%d %H:%M")
+
+def _merge_candles(series: list) -> list:
+    """Merge candle lists, dedupe on timestamp (chunk edges can overlap), oldest first"""
+    merged = {}
+    for candles in series:
+        for candle in candles:
+            merged[candle["date"]] = candle
+    return [merged[key] for key in sorted(merged)]
+
+def plan_history_chunks(from_date: datetime, to_date: datetime, interval: str) -> list:
+    """
+    Split [from_date, to_date] into consecutive day ranges no longer than
+    Angel One's per-request limit for the interval. Returns [(from_str, to_str)].
+    """
+    max_days = ANGEL_HISTORY_MAX_DAYS.get(interval, 30)
+    chunks = []
+    chunk_start = from_date
+    while chunk_start.date() <= to_date.date():
+        chunk_end = min(chunk_start + timedelta(days=max_days - 1), to_date)
+        chunks.append((
+            chunk_start.strftime("%Y-%m-%d 09:15"),
+            chunk_end.strftime("%Y-%m-%d 15:30")
+        ))
+        chunk_start = chunk_end + timedelta(days=1)
+    return chunks
+
+def _get_stock_history_angel_sync(symbol: str, exchange: str, interval: str, chunks: list):
     """
-    Internal Sync function for historical data
+    Internal Sync function for historical data: fetches the given chunks.
+    Returns (candles, failed chunks), or None if history can't be requested at all.
     """
     try:
         # Normalize symbol - remove exchange suffix but keep -EQ
@@ -570,13 +647,13 @@ def _get_stock_history_angel_sync(symbol: str, exchange: str = "NSE", days: int
             api = get_smart_api()
             if not api or not auth_token:
                 print("[ANGELONE] Not authenticated for history")
-                return []
+                return None
             use_token = auth_token
             use_key = API_KEY
 
         if not use_token:
              print("[ANGELONE] No auth token available for history")
-             return []
+             return None
         
         # Convert exchange format
         exchange_map = {
@@ -591,22 +668,41 @@ def _get_stock_history_angel_sync(symbol: str, exchange: str = "NSE", days: int
         instrument = get_instrument_by_symbol_sync(normalized_symbol, angel_exchange)
         if not instrument:
             print(f"[ANGELONE] Instrument not found for history: {normalized_symbol}.{angel_exchange}")
-            return []
+            return None
         
         token = instrument.get("token")
         if not token:
             print(f"[ANGELONE] No token for history: {normalized_symbol}")
-            return []
+            return None
+        
+        print(f"[ANGELONE DEBUG] Requesting history for {normalized_symbol} | Interval: {interval} | Chunks: {len(chunks)}")
+        
+        def fetch_chunk(chunk):
+            return _fetch_history_chunk_sync(symbol, angel_exchange, str(token), interval, chunk[0], chunk[1], use_token, use_key)
+        
+        if len(chunks) == 1:
+            chunk_results = [fetch_chunk(chunks[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(HISTORY_MAX_WORKERS, len(chunks))) as executor:
+                chunk_results = list(executor.map(fetch_chunk, chunks))
         
-        # Calculate date range
-        to_date = datetime.now()
-        from_date = to_date - timedelta(days=days)
+        failed = [chunk for chunk, result in zip(chunks, chunk_results) if result is None]
+        candles = _merge_candles([result for result in chunk_results if result])
         
-        # Format dates for Angel One API (YYYY-MM-DD HH:MM)
-        from_date_str = from_date.strftime("%Y-%m-%d 09:15")
-        to_date_str = to_date.strftime("%Y-%m-%d 15:30")
+        print(f"[ANGELONE] Got {len(candles)} candles for {symbol} ({len(failed)} failed chunks)")
+        return candles, failed
         
-        print(f"[ANGELONE DEBUG] Requesting history for {normalized_symbol} | Days: {days}| Interval: {interval}")
+    except Exception as e:
+        print(f"[ANGELONE ERROR] History failed for {symbol}: {e}")
+        return None
+
+def _fetch_history_chunk_sync(symbol: str, angel_exchange: str, token: str, interval: str,
+                              from_date_str: str, to_date_str: str, use_token: str, use_key: str) -> list:
+    """
+    Single getCandleData call for one chunk (dates as YYYY-MM-DD HH:MM).
+    [] when the range has no bars, None when the request failed.
+    """
+    try:
         print(f"[ANGELONE DEBUG] From: {from_date_str} To: {to_date_str}")
         
         # Make direct API call with proper auth header
@@ -625,13 +721,14 @@ def _get_stock_history_angel_sync(symbol: str, exchange: str = "NSE", days: int
         
         payload = {
             "exchange": angel_exchange,
-            "symboltoken": str(token),
+            "symboltoken": token,
             "interval": interval,
             "fromdate": from_date_str,
             "todate": to_date_str
         }
         
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
+        _history_rate_limiter.wait()
+        response = get_http_session().post(url, headers=headers, json=payload, timeout=10)
         hist_data = response.json()
         
         if hist_data.get("data"):
@@ -646,16 +743,16 @@ def _get_stock_history_angel_sync(symbol: str, exchange: str = "NSE", days: int
                     "close": float(candle[4]),
                     "volume": int(candle[5])
                 })
-            print(f"[ANGELONE] Got {len(candles)} candles for {symbol}")
             return candles
-        else:
-            print(f"[ANGELONE] History API error: {hist_data}")
+        if hist_data.get("status"):
+            return []  # Successful reply, no bars in range (holidays, before the open)
         
-        return []
+        print(f"[ANGELONE] History API error: {hist_data}")
+        return None
         
     except Exception as e:
-        print(f"[ANGELONE ERROR] History failed for {symbol}: {e}")
-        return []
+        print(f"[ANGELONE ERROR] History chunk {from_date_str} - {to_date_str} failed for {symbol}: {e}")
+        return None
 
 # Main functions for the app
 async def search_stocks(query: str, use_ai: bool = True):
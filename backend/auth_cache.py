@@ -0,0 +1,113 @@
+"""
+Auth Cache
+Supports the claims-based auth fast path: users whose profile, role or ban state
+changed are marked stale (tokens issued before the change must be re-checked
+against Firestore), and re-checked users are kept in a small TTL/LRU cache.
+Invalidations fan out to every process over Redis pub/sub.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from redis_config import redis_manager
+
+USER_CACHE_TTL = 60          # Seconds a Firestore-checked user is trusted without another read
+USER_CACHE_MAX = 10000
+STALE_MARK_TTL = 7 * 86400   # Matches the access token lifetime: older tokens have expired anyway
+INVALIDATION_CHANNEL = "auth:invalidate"
+
+
+class AuthCache:
+    """Per-process view of stale users + recently checked users"""
+
+    def __init__(self):
+        self._users: "OrderedDict[str, tuple]" = OrderedDict()  # user_id -> (expires_at, user)
+        self._stale_before: Dict[str, float] = {}                # user_id -> tokens with iat below are re-checked
+        self._listener: Optional[asyncio.Task] = None
+        self.stats = {"fast_path": 0, "cache_hits": 0, "lookups": 0, "invalidations": 0}
+
+    # ------------------------------------------------------------------
+    # Fast path
+    # ------------------------------------------------------------------
+
+    def claims_current(self, user_id: str, issued_at: Optional[float]) -> bool:
+        """Token claims are still authoritative: issued after the user's last invalidation"""
+        if issued_at is None:
+            return False  # Token minted before claims were signed in
+        return issued_at >= self._stale_before.get(user_id, 0)
+
+    def issue_time(self, user_id: str) -> float:
+        """iat for a token minted now: never before the user's stale mark, which is
+        rounded up to the next second, so a token issued right after an invalidation
+        still takes the fast path. Up to 1s ahead of the clock, hence the decode leeway
+        in dependencies.verify_token."""
+        return max(time.time(), self._stale_before.get(str(user_id), 0))
+
+    def get(self, user_id: str) -> Optional[dict]:
+        entry = self._users.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._users[user_id]
+            return None
+        self._users.move_to_end(user_id)
+        return entry[1]
+
+    def put(self, user_id: str, user: dict):
+        self._users[user_id] = (time.monotonic() + USER_CACHE_TTL, user)
+        self._users.move_to_end(user_id)
+        while len(self._users) > USER_CACHE_MAX:
+            self._users.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def _apply(self, user_id: str, at: float):
+        self._users.pop(user_id, None)
+        self._stale_before[user_id] = max(self._stale_before.get(user_id, 0), at)
+        self.stats["invalidations"] += 1
+
+    async def invalidate(self, user_id: str):
+        """Role/ban/profile changed: reject this user's existing claims everywhere"""
+        user_id = str(user_id)
+        # Whole seconds, rounded up: JWT iat has second precision
+        at = float(int(time.time()) + 1)
+        self._apply(user_id, at)
+        await redis_manager.set(f"auth:stale:{user_id}", str(at), STALE_MARK_TTL)
+        await redis_manager.publish(INVALIDATION_CHANNEL, json.dumps({"user_id": user_id, "at": at}))
+
+    def _on_message(self, data: str):
+        message = json.loads(data)
+        self._apply(str(message["user_id"]), float(message["at"]))
+
+    async def _load_stale_marks(self):
+        """Marks set before this process started (pub/sub only reaches running listeners)"""
+        keys = await redis_manager.get_keys("auth:stale:*")
+        values = await asyncio.gather(*(redis_manager.get(key) for key in keys))
+        for key, value in zip(keys, values):
+            if value:
+                self._apply(key.split(":", 2)[2], float(value))
+
+    async def start(self):
+        try:
+            await self._load_stale_marks()
+        except Exception as e:
+            print(f"[AUTH CACHE] Loading stale marks failed: {e}")
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(redis_manager.listen(INVALIDATION_CHANNEL, self._on_message))
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "cached_users": len(self._users), "stale_users": len(self._stale_before)}
+
+
+# Global instance
+auth_cache = AuthCache()
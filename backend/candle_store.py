@@ -0,0 +1,149 @@
+"""
+Candle Store
+Persists broker history in Redis, partitioned by trading day, so backfilled
+ranges survive the short-lived request caches and can be merged incrementally.
+Closed days covered by a successful fetch get a partition even without bars
+(weekends, holidays), so a range with every partition present is complete and
+is served from here instead of the broker.
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import pytz
+
+from redis_config import redis_manager
+
+IST = pytz.timezone("Asia/Kolkata")
+
+# How long closed trading days are kept, per Angel One interval (seconds)
+RETENTION_SECONDS = {
+    "ONE_MINUTE": 60 * 86400,
+    "THREE_MINUTE": 120 * 86400,
+    "FIVE_MINUTE": 200 * 86400,
+    "TEN_MINUTE": 200 * 86400,
+    "FIFTEEN_MINUTE": 400 * 86400,
+    "THIRTY_MINUTE": 400 * 86400,
+    "ONE_HOUR": 800 * 86400,
+    "ONE_DAY": 3650 * 86400,
+}
+
+# Today's partition still has a forming bar, keep it short-lived
+OPEN_DAY_TTL = 60
+
+
+def calendar_days(from_date: datetime, to_date: datetime) -> List[str]:
+    """Every calendar day in [from_date, to_date] as YYYY-MM-DD"""
+    days = []
+    current = from_date.date()
+    while current <= to_date.date():
+        days.append(current.strftime("%Y-%m-%d"))
+        current += timedelta(days=1)
+    return days
+
+
+class CandleStore:
+    """Day-partitioned candle store: candles:{exchange}:{symbol}:{interval}:{YYYY-MM-DD}"""
+
+    def __init__(self):
+        self.redis = redis_manager
+        self.stats = {"days_written": 0, "candles_written": 0, "days_read": 0, "days_missing": 0}
+
+    def _get_key(self, symbol: str, exchange: str, interval: str, day: str) -> str:
+        return f"candles:{exchange}:{symbol}:{interval}:{day}"
+
+    @staticmethod
+    def _day_of(candle: dict) -> str:
+        # Angel One dates look like "2024-01-07T09:15:00+05:30" - the prefix is the IST trading day
+        return str(candle["date"])[:10]
+
+    @staticmethod
+    def _merge(existing: List[dict], new: List[dict]) -> List[dict]:
+        """Union by timestamp; newer data wins for duplicate bars"""
+        merged = {c["date"]: c for c in existing}
+        merged.update({c["date"]: c for c in new})
+        return [merged[key] for key in sorted(merged)]
+
+    async def write(
+        self, symbol: str, exchange: str, interval: str, candles: List[dict], covered_days: Iterable[str] = ()
+    ) -> int:
+        """
+        Merge candles into their day partitions. `covered_days` are days the fetch
+        fully covered; closed ones are recorded even when they had no bars.
+        Returns number of days touched.
+        """
+        if not self.redis.is_connected:
+            return 0
+
+        today = datetime.now(IST).strftime("%Y-%m-%d")
+        by_day: Dict[str, List[dict]] = {day: [] for day in covered_days if day < today}
+        for candle in candles:
+            by_day.setdefault(self._day_of(candle), []).append(candle)
+        if not by_day:
+            return 0
+
+        retention = RETENTION_SECONDS.get(interval, 60 * 86400)
+
+        async def write_day(day: str, day_candles: List[dict]):
+            key = self._get_key(symbol, exchange, interval, day)
+            existing = []
+            raw = await self.redis.get(key)
+            if raw:
+                try:
+                    existing = json.loads(raw)
+                except Exception:
+                    existing = []
+            merged = self._merge(existing, day_candles)
+            ttl = OPEN_DAY_TTL if day >= today else retention
+            await self.redis.set(key, json.dumps(merged), ttl)
+
+        try:
+            await asyncio.gather(*(write_day(day, day_candles) for day, day_candles in by_day.items()))
+            self.stats["days_written"] += len(by_day)
+            self.stats["candles_written"] += len(candles)
+            return len(by_day)
+        except Exception as e:
+            print(f"[CANDLE STORE] Write failed for {symbol} {interval}: {e}")
+            return 0
+
+    async def read_range(
+        self, symbol: str, exchange: str, interval: str, from_date: datetime, to_date: datetime,
+        complete: bool = False
+    ) -> Optional[List[dict]]:
+        """
+        Candles for every calendar day in [from_date, to_date], oldest first.
+        Days with no partition (never fetched) are skipped, or with `complete`
+        make the whole read a miss (None).
+        """
+        if not self.redis.is_connected:
+            return None
+
+        days = calendar_days(from_date, to_date)
+        raw_days = await asyncio.gather(
+            *(self.redis.get(self._get_key(symbol, exchange, interval, day)) for day in days)
+        )
+
+        if complete and not all(raw_days):
+            self.stats["days_missing"] += 1
+            return None
+
+        candles = []
+        for raw in raw_days:
+            if not raw:
+                self.stats["days_missing"] += 1
+                continue
+            self.stats["days_read"] += 1
+            try:
+                candles.extend(json.loads(raw))
+            except Exception:
+                continue
+        return candles
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
+
+
+# Global instance
+candle_store = CandleStore()
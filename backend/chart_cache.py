@@ -1,19 +1,63 @@
 """
 Chart Cache Service - Aggressive caching and background updates for chart data
+
+Two tiers:
+- L1: per-process LRU bounded by a byte budget
+- L2: shared Redis tier, zlib-compressed. Closed candles never expire,
+  the forming (last) bar carries a short TTL and gates freshness.
 """
 import asyncio
-from datetime import datetime, timedelta
+import base64
+import json
+import os
+import zlib
+from collections import OrderedDict
+from datetime import datetime
 from typing import Dict, Optional, List
 import time
+import pytz
+
+from redis_config import redis_manager
+
+IST = pytz.timezone("Asia/Kolkata")
+
+# L1 budget (serialized bytes, default 64 MB)
+CHART_CACHE_MAX_BYTES = int(os.getenv("CHART_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+FORMING_BAR_MAX_TTL = 300  # Cap on the forming bar TTL while the market is open
+
+# Background refresh scheduler
+SCHEDULER_TICK_SECONDS = 5
+MIN_REFRESH_SECONDS = 15
+IDLE_GRACE_SECONDS = 120  # Keep refreshing this long after the last viewer leaves
+
+# NSE trading holidays (exchange circulars). Extra dates, e.g. next year's list or
+# special closures, can be added with NSE_HOLIDAYS=YYYY-MM-DD,YYYY-MM-DD
+NSE_HOLIDAYS = {
+    # 2025
+    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10", "2025-04-14", "2025-04-18",
+    "2025-05-01", "2025-08-15", "2025-08-27", "2025-10-02", "2025-10-21", "2025-10-22",
+    "2025-11-05", "2025-12-25",
+    # 2026
+    "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31", "2026-04-03", "2026-04-14",
+    "2026-05-01", "2026-05-28", "2026-06-26", "2026-09-14", "2026-10-02", "2026-10-20",
+    "2026-11-10", "2026-11-24", "2026-12-25",
+} | {day.strip() for day in os.getenv("NSE_HOLIDAYS", "").split(",") if day.strip()}
 
 class ChartCacheService:
     def __init__(self):
-        # Multi-level cache: symbol -> interval -> data
-        self._cache: Dict[str, Dict[str, dict]] = {}
-        self._cache_timestamps: Dict[str, Dict[str, float]] = {}
+        # L1: symbol:interval -> {"closed", "forming", "expires_at", "bytes"}, LRU order
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        self._bytes_used = 0
+        self.max_bytes = CHART_CACHE_MAX_BYTES
+        self.redis = redis_manager
+        self.stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "evictions": 0, "l2_closed_writes_skipped": 0}
         
-        # Background update tasks
-        self._update_tasks: Dict[str, asyncio.Task] = {}
+        # Background refresh: viewer refcounts and one scheduler loop for all charts
+        self._viewers: Dict[str, int] = {}  # symbol:interval -> viewer count
+        self._idle_since: Dict[str, float] = {}  # symbol:interval -> time count hit 0
+        self._next_refresh: Dict[str, float] = {}  # symbol:interval -> next due time
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._batch_fetch_func = None
         
         # Cache TTLs (in seconds)
         self.ttl_config = {
@@ -32,112 +76,205 @@ class ChartCacheService:
             "HINDUNILVR", "ITC", "SBIN", "BHARTIARTL", "KOTAKBANK"
         ]
         
-        # Track active charts for background updates
-        self._active_charts: Dict[str, set] = {}  # symbol -> set of intervals
-        
     def _get_cache_key(self, symbol: str, interval: str) -> str:
         """Generate cache key"""
         return f"{symbol}:{interval}"
     
-    def get_cached_chart(self, symbol: str, interval: str) -> Optional[List[dict]]:
-        """Get cached chart data if valid"""
+    def _forming_ttl(self, interval: str) -> int:
+        """Forming bar TTL: short while NSE is open, full interval TTL otherwise"""
+        ttl = self.ttl_config.get(interval, 300)
+        return min(ttl, FORMING_BAR_MAX_TTL) if self._is_market_open() else ttl
+    
+    @staticmethod
+    def _encode(data) -> str:
+        raw = json.dumps(data, separators=(",", ":")).encode()
+        return base64.b64encode(zlib.compress(raw, 6)).decode()
+    
+    @staticmethod
+    def _decode(value: str):
+        return json.loads(zlib.decompress(base64.b64decode(value)))
+    
+    def _l1_put(self, cache_key: str, closed: List[dict], forming: Optional[dict], ttl: int):
+        size = len(json.dumps(closed, separators=(",", ":"))) + 128
+        old = self._cache.pop(cache_key, None)
+        if old:
+            self._bytes_used -= old["bytes"]
+        self._cache[cache_key] = {
+            "closed": closed,
+            "forming": forming,
+            "expires_at": time.time() + ttl,
+            "bytes": size
+        }
+        self._bytes_used += size
+        
+        # Evict least recently used charts until back under budget
+        while self._bytes_used > self.max_bytes and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self._bytes_used -= evicted["bytes"]
+            self.stats["evictions"] += 1
+    
+    @staticmethod
+    def _assemble(closed: List[dict], forming: Optional[dict]) -> List[dict]:
+        return closed + [forming] if forming else list(closed)
+    
+    async def get_cached_chart(self, symbol: str, interval: str) -> Optional[List[dict]]:
+        """Get cached chart data if valid (L1, then shared Redis tier)"""
         cache_key = self._get_cache_key(symbol, interval)
         
-        if symbol not in self._cache or interval not in self._cache[symbol]:
-            return None
+        entry = self._cache.get(cache_key)
+        if entry and entry["expires_at"] > time.time():
+            self._cache.move_to_end(cache_key)
+            self.stats["l1_hits"] += 1
+            print(f"[CHART_CACHE] HIT: {cache_key}")
+            return self._assemble(entry["closed"], entry["forming"])
         
-        # Check if cache is still valid
-        if symbol in self._cache_timestamps and interval in self._cache_timestamps[symbol]:
-            cache_time = self._cache_timestamps[symbol][interval]
-            ttl = self.ttl_config.get(interval, 300)
-            
-            if time.time() - cache_time < ttl:
-                print(f"[CHART_CACHE] HIT: {cache_key}")
-                return self._cache[symbol][interval]
-            else:
-                print(f"[CHART_CACHE] EXPIRED: {cache_key}")
+        if self.redis.is_connected:
+            try:
+                forming_raw, closed_raw = await asyncio.gather(
+                    self.redis.get(f"chart:{cache_key}:forming"),
+                    self.redis.get(f"chart:{cache_key}:closed")
+                )
+                if forming_raw and closed_raw:
+                    forming = self._decode(forming_raw)
+                    closed = self._decode(closed_raw)
+                    self._l1_put(cache_key, closed, forming, self._forming_ttl(interval))
+                    self.stats["l2_hits"] += 1
+                    print(f"[CHART_CACHE] REDIS HIT: {cache_key}")
+                    return self._assemble(closed, forming)
+            except Exception as e:
+                print(f"[CHART_CACHE] Redis read failed for {cache_key}: {e}")
         
+        self.stats["misses"] += 1
         return None
     
-    def set_cached_chart(self, symbol: str, interval: str, data: List[dict]):
-        """Cache chart data"""
-        if symbol not in self._cache:
-            self._cache[symbol] = {}
-            self._cache_timestamps[symbol] = {}
-        
-        self._cache[symbol][interval] = data
-        self._cache_timestamps[symbol][interval] = time.time()
-        
-        cache_key = self._get_cache_key(symbol, interval)
-        print(f"[CHART_CACHE] SET: {cache_key} ({len(data)} candles)")
-    
-    async def start_background_updates(self, symbol: str, interval: str, fetch_func):
-        """Start background updates for an active chart"""
+    async def set_cached_chart(self, symbol: str, interval: str, data: List[dict]):
+        """Cache chart data: last bar is the forming bar, everything before it is closed"""
+        if not data:
+            return
         cache_key = self._get_cache_key(symbol, interval)
+        closed, forming = data[:-1], data[-1]
+        ttl = self._forming_ttl(interval)
         
-        # Mark as active
-        if symbol not in self._active_charts:
-            self._active_charts[symbol] = set()
-        self._active_charts[symbol].add(interval)
+        # Closed bars only change when a new bar closes - skip rewriting an identical series
+        previous = self._cache.get(cache_key)
+        closed_unchanged = (
+            previous is not None
+            and len(previous["closed"]) == len(closed)
+            and (not closed or previous["closed"][-1].get("time") == closed[-1].get("time"))
+        )
         
-        # Cancel existing task if any
-        if cache_key in self._update_tasks:
-            self._update_tasks[cache_key].cancel()
+        self._l1_put(cache_key, closed, forming, ttl)
         
-        # Start new background update task
-        task = asyncio.create_task(
-            self._background_update_loop(symbol, interval, fetch_func)
-        )
-        self._update_tasks[cache_key] = task
+        if self.redis.is_connected:
+            try:
+                if closed_unchanged:
+                    self.stats["l2_closed_writes_skipped"] += 1
+                else:
+                    await self.redis.set(f"chart:{cache_key}:closed", self._encode(closed), None)
+                await self.redis.set(f"chart:{cache_key}:forming", self._encode(forming), ttl)
+            except Exception as e:
+                print(f"[CHART_CACHE] Redis write failed for {cache_key}: {e}")
         
-        print(f"[CHART_CACHE] Started background updates for {cache_key}")
+        print(f"[CHART_CACHE] SET: {cache_key} ({len(data)} candles)")
+    
+    def _is_market_open(self) -> bool:
+        """NSE cash session: Mon-Fri 09:15-15:30 IST, except exchange holidays"""
+        now = datetime.now(IST)
+        if now.weekday() >= 5 or now.strftime("%Y-%m-%d") in NSE_HOLIDAYS:
+            return False
+        minutes = now.hour * 60 + now.minute
+        return 9 * 60 + 15 <= minutes < 15 * 60 + 30
     
-    async def _background_update_loop(self, symbol: str, interval: str, fetch_func):
-        """Background loop to update chart data"""
+    def acquire_chart(self, symbol: str, interval: str) -> int:
+        """Register a viewer for a chart. Returns the new viewer count."""
         cache_key = self._get_cache_key(symbol, interval)
-        update_interval = self.ttl_config.get(interval, 300) // 2  # Update at half TTL
-        
-        try:
-            while True:
-                await asyncio.sleep(update_interval)
-                
-                # Check if still active
-                if symbol not in self._active_charts or interval not in self._active_charts[symbol]:
-                    print(f"[CHART_CACHE] Stopping updates for inactive {cache_key}")
-                    break
-                
-                # Fetch fresh data
-                try:
-                    print(f"[CHART_CACHE] Background update for {cache_key}")
-                    data = await fetch_func(symbol, interval)
-                    if data:
-                        self.set_cached_chart(symbol, interval, data)
-                except Exception as e:
-                    print(f"[CHART_CACHE] Background update failed for {cache_key}: {e}")
-        
-        except asyncio.CancelledError:
-            print(f"[CHART_CACHE] Background task cancelled for {cache_key}")
-        finally:
-            # Cleanup
-            if cache_key in self._update_tasks:
-                del self._update_tasks[cache_key]
+        self._viewers[cache_key] = self._viewers.get(cache_key, 0) + 1
+        self._idle_since.pop(cache_key, None)
+        self._next_refresh.setdefault(cache_key, time.time())  # First refresh on the next tick
+        return self._viewers[cache_key]
     
-    def stop_background_updates(self, symbol: str, interval: str):
-        """Stop background updates when user exits chart"""
+    def release_chart(self, symbol: str, interval: str) -> int:
+        """Drop a viewer. The chart keeps refreshing for the idle grace period."""
         cache_key = self._get_cache_key(symbol, interval)
-        
-        # Mark as inactive
-        if symbol in self._active_charts and interval in self._active_charts[symbol]:
-            self._active_charts[symbol].discard(interval)
-            if not self._active_charts[symbol]:
-                del self._active_charts[symbol]
-        
-        # Cancel task
-        if cache_key in self._update_tasks:
-            self._update_tasks[cache_key].cancel()
-            del self._update_tasks[cache_key]
-        
-        print(f"[CHART_CACHE] Stopped background updates for {cache_key}")
+        if cache_key not in self._viewers:
+            return 0
+        self._viewers[cache_key] = max(0, self._viewers[cache_key] - 1)
+        if self._viewers[cache_key] == 0:
+            self._idle_since[cache_key] = time.time()
+        return self._viewers[cache_key]
+    
+    async def start_background_updates(self, symbol: str, interval: str, fetch_func=None):
+        """Start background updates for an active chart (refcounted, see acquire_chart)"""
+        self.acquire_chart(symbol, interval)
+    
+    def stop_background_updates(self, symbol: str, interval: str):
+        """Stop background updates when user exits chart (refcounted, see release_chart)"""
+        self.release_chart(symbol, interval)
+    
+    def _refresh_period(self, interval: str) -> int:
+        return max(MIN_REFRESH_SECONDS, self.ttl_config.get(interval, 300) // 2)  # Update at half TTL
+    
+    def start_refresh_scheduler(self, batch_fetch_func):
+        """
+        Start the single refresh loop for all viewed charts.
+        batch_fetch_func(symbols, interval) -> {symbol: candles}
+        """
+        self._batch_fetch_func = batch_fetch_func
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+            print("[CHART_CACHE] Refresh scheduler started")
+    
+    async def stop_refresh_scheduler(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+            print("[CHART_CACHE] Refresh scheduler stopped")
+    
+    def _evict_idle(self, now: float):
+        """Forget charts nobody has viewed for the grace period"""
+        for cache_key, idle_since in list(self._idle_since.items()):
+            if now - idle_since >= IDLE_GRACE_SECONDS:
+                self._idle_since.pop(cache_key, None)
+                self._viewers.pop(cache_key, None)
+                self._next_refresh.pop(cache_key, None)
+                print(f"[CHART_CACHE] Stopped updates for idle {cache_key}")
+    
+    async def _refresh_loop(self):
+        """Refresh due charts, one batch call per interval, only while NSE is open"""
+        while True:
+            await asyncio.sleep(SCHEDULER_TICK_SECONDS)
+            now = time.time()
+            self._evict_idle(now)
+            
+            if not self._viewers or not self._is_market_open():
+                continue
+            
+            # Group due charts by interval
+            due: Dict[str, List[str]] = {}
+            for cache_key, next_at in self._next_refresh.items():
+                if next_at <= now:
+                    symbol, interval = cache_key.rsplit(":", 1)
+                    due.setdefault(interval, []).append(symbol)
+            
+            for interval, symbols in due.items():
+                try:
+                    print(f"[CHART_CACHE] Background refresh {interval}: {len(symbols)} charts")
+                    results = await self._batch_fetch_func(symbols, interval)
+                    for symbol, data in (results or {}).items():
+                        if data:
+                            await self.set_cached_chart(symbol, interval, data)
+                except Exception as e:
+                    print(f"[CHART_CACHE] Background refresh failed for {interval}: {e}")
+                finally:
+                    next_at = time.time() + self._refresh_period(interval)
+                    for symbol in symbols:
+                        cache_key = self._get_cache_key(symbol, interval)
+                        if cache_key in self._next_refresh:
+                            self._next_refresh[cache_key] = next_at
     
     async def preload_popular_charts(self, fetch_func):
         """Preload charts for popular stocks"""
@@ -156,37 +293,40 @@ class ChartCacheService:
         try:
             data = await fetch_func(symbol, interval)
             if data:
-                self.set_cached_chart(symbol, interval, data)
+                await self.set_cached_chart(symbol, interval, data)
         except Exception as e:
             print(f"[CHART_CACHE] Preload failed for {symbol} {interval}: {e}")
     
     def get_cache_stats(self) -> dict:
         """Get cache statistics"""
-        total_cached = sum(len(intervals) for intervals in self._cache.values())
-        active_updates = len(self._update_tasks)
+        lookups = self.stats["l1_hits"] + self.stats["l2_hits"] + self.stats["misses"]
+        hits = self.stats["l1_hits"] + self.stats["l2_hits"]
         
         return {
-            "total_cached_charts": total_cached,
-            "active_background_updates": active_updates,
-            "cached_symbols": list(self._cache.keys()),
-            "active_charts": {
-                symbol: list(intervals) 
-                for symbol, intervals in self._active_charts.items()
-            }
+            "total_cached_charts": len(self._cache),
+            "bytes_used": self._bytes_used,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(hits / lookups * 100, 2) if lookups else 0.0,
+            **self.stats,
+            "active_background_updates": len(self._next_refresh),
+            "total_viewers": sum(self._viewers.values()),
+            "market_open": self._is_market_open()
         }
     
-    def clear_cache(self, symbol: Optional[str] = None):
-        """Clear cache for a symbol or all"""
-        if symbol:
-            if symbol in self._cache:
-                del self._cache[symbol]
-            if symbol in self._cache_timestamps:
-                del self._cache_timestamps[symbol]
-            print(f"[CHART_CACHE] Cleared cache for {symbol}")
-        else:
-            self._cache.clear()
-            self._cache_timestamps.clear()
-            print("[CHART_CACHE] Cleared all cache")
+    def reset_stats(self):
+        for key in self.stats:
+            self.stats[key] = 0
+    
+    async def clear_cache(self, symbol: Optional[str] = None):
+        """Clear cache for a symbol or all (both tiers)"""
+        prefix = f"{symbol}:" if symbol else ""
+        for cache_key in [k for k in self._cache if k.startswith(prefix)]:
+            self._bytes_used -= self._cache.pop(cache_key)["bytes"]
+        
+        for key in await self.redis.get_keys(f"chart:{prefix}*"):
+            await self.redis.delete(key)
+        
+        print(f"[CHART_CACHE] Cleared cache for {symbol or 'all charts'}")
 
 # Global instance
 chart_cache = ChartCacheService()
@@ -1,24 +1,13 @@
 from datetime import datetime
 from typing import List, Dict, Optional
-from firebase_config import get_firestore
+from storage_backend import get_storage
 
-# Collection reference
-def get_conversations_collection():
-    """Get the conversations collection ref"""
-    db = get_firestore()
-    if not db:
-        raise RuntimeError("Firestore not initialized")
-    return db.collection("chat_conversations")
-
-import asyncio
 async def save_conversation(user_id: str, messages: List[Dict], title: Optional[str] = None) -> str:
     """
-    Save a chat conversation to Firestore
+    Save a chat conversation to storage
     Returns conversation ID
     """
     try:
-        conversations_ref = get_conversations_collection()
-        
         # Generate title from first user message if not provided
         if not title:
             first_user_msg = next((msg for msg in messages if msg.get('role') == 'user'), None)
@@ -30,19 +19,14 @@ async def save_conversation(user_id: str, messages: List[Dict], title: Optional[
                 title = "New Conversation"
         
         conversation = {
-            "user_id": str(user_id), # Ensure string for Firestore
+            "user_id": str(user_id), # Ensure string (storage IDs are strings)
             "title": title,
             "messages": messages,
             "created_at": datetime.utcnow().isoformat(),
             "updated_at": datetime.utcnow().isoformat()
         }
         
-        # Add new document (Sync call wrapped in thread)
-        def add_doc():
-            update_time, doc_ref = conversations_ref.add(conversation)
-            return doc_ref.id
-
-        return await asyncio.to_thread(add_doc)
+        return await get_storage().add_conversation(conversation)
         
     except Exception as e:
         print(f"[CHAT HISTORY] Error saving conversation: {e}")
@@ -53,21 +37,10 @@ async def get_user_conversations(user_id: str, limit: int = 50) -> List[Dict]:
     Get all conversations for a user
     """
     try:
-        conversations_ref = get_conversations_collection()
-        
-        def fetch_docs():
-            query = conversations_ref.where("user_id", "==", str(user_id))\
-                .order_by("updated_at", direction="DESCENDING")\
-                .limit(limit)
-            return list(query.stream())
-            
-        docs = await asyncio.to_thread(fetch_docs)
-        
         conversations = []
-        for doc in docs:
-            data = doc.to_dict()
+        for data in await get_storage().list_conversations(str(user_id), limit):
             conversations.append({
-                "id": doc.id,
+                "id": data["id"],
                 "title": data.get("title", "Untitled"),
                 "message_count": len(data.get("messages", [])),
                 "created_at": data.get("created_at"),
@@ -84,20 +57,13 @@ async def get_conversation(conversation_id: str, user_id: str) -> Optional[Dict]
     Get a specific conversation by ID
     """
     try:
-        conversations_ref = get_conversations_collection()
+        data = await get_storage().get_conversation(conversation_id)
         
-        def fetch_doc():
-            doc_ref = conversations_ref.document(conversation_id)
-            return doc_ref.get()
-            
-        doc = await asyncio.to_thread(fetch_doc)
-        
-        if doc.exists:
-            data = doc.to_dict()
+        if data:
             # Verify ownership
             if str(data.get("user_id")) == str(user_id):
                 return {
-                    "id": doc.id,
+                    "id": data["id"],
                     "title": data.get("title", "Untitled"),
                     "messages": data.get("messages", []),
                     "created_at": data.get("created_at"),
@@ -113,19 +79,12 @@ async def delete_conversation(conversation_id: str, user_id: str) -> bool:
     Delete a conversation
     """
     try:
-        conversations_ref = get_conversations_collection()
-        
-        def delete_doc():
-            doc_ref = conversations_ref.document(conversation_id)
-            doc = doc_ref.get()
-            if doc.exists:
-                data = doc.to_dict()
-                if str(data.get("user_id")) == str(user_id):
-                    doc_ref.delete()
-                    return True
-            return False
-
-        return await asyncio.to_thread(delete_doc)
+        storage = get_storage()
+        data = await storage.get_conversation(conversation_id)
+        if data and str(data.get("user_id")) == str(user_id):
+            await storage.delete_conversation(conversation_id)
+            return True
+        return False
     except Exception as e:
         print(f"[CHAT HISTORY] Error deleting conversation: {e}")
         return False
@@ -38,6 +38,33 @@ If asked about stocks from other exchanges (NYSE, NASDAQ, etc.), politely mentio
 Be confident and specific in your advice. Avoid generic disclaimers - give real, data-driven recommendations like a professional advisor would.
 """
 
+async def get_technical_context(symbol: str) -> str:
+    """Latest daily technical indicators for a symbol, formatted for the LLM prompt"""
+    try:
+        from routers.candles import get_chart_candles
+        from indicators import indicator_service
+        
+        series = await indicator_service.get_indicators(symbol, "1d", get_chart_candles)
+        latest = indicator_service.latest(series)
+        if not latest or latest.get("rsi_14") is None:
+            return ""
+        
+        def fmt(name: str) -> str:
+            value = latest.get(name)
+            return f"{value:.2f}" if value is not None else "N/A"
+        
+        context = f"**Technical Indicators (Daily):**\n"
+        context += f"- RSI (14): {fmt('rsi_14')}\n"
+        context += f"- MACD: {fmt('macd')} (Signal: {fmt('macd_signal')}, Histogram: {fmt('macd_hist')})\n"
+        context += f"- SMA 20: ₹{fmt('sma_20')} | SMA 50: ₹{fmt('sma_50')}\n"
+        context += f"- EMA 20: ₹{fmt('ema_20')}\n"
+        context += f"- Bollinger Bands: ₹{fmt('bb_lower')} - ₹{fmt('bb_upper')}\n"
+        context += f"- ATR (14): {fmt('atr_14')}\n\n"
+        return context
+    except Exception as e:
+        print(f"[CHAT] Technical indicators unavailable for {symbol}: {e}")
+        return ""
+
 async def get_chat_response(history: List[Dict[str, str]], message: str) -> str:
     try:
         # Validate and normalize query first
@@ -101,6 +128,8 @@ async def get_chat_response(history: List[Dict[str, str]], message: str) -> str:
                             market_context += f"- Current Price: ₹{fundamentals.get('current_price', 0)}\n"
                             market_context += f"- Price Change: ₹{fundamentals.get('change', 0):.2f} ({fundamentals.get('change_percent', 0):.2f}%)\n\n"
                         
+                        market_context += await get_technical_context(symbol)
+                        
                         market_context += "Analyze this data thoroughly and provide a detailed investment recommendation."
                         break  # Found data, stop searching
                 except Exception as sym_error:
@@ -144,6 +173,8 @@ async def get_chat_response(history: List[Dict[str, str]], message: str) -> str:
                     market_context += f"- Current Price: ₹{fundamentals.get('current_price', 0)}\n"
                     market_context += f"- Price Change: ₹{fundamentals.get('change', 0):.2f} ({fundamentals.get('change_percent', 0):.2f}%)\n\n"
                 
+                market_context += await get_technical_context(symbol)
+                
                 market_context += "Analyze this data thoroughly and provide a detailed investment recommendation."
             else:
                  print(f"[DEBUG] No data found for {symbol}")
@@ -218,6 +249,8 @@ async def get_chat_response(history: List[Dict[str, str]], message: str) -> str:
                             market_context += f"- Current Price: ₹{fundamentals.get('current_price', 0)}\n"
                             market_context += f"- Price Change: ₹{fundamentals.get('change', 0):.2f} ({fundamentals.get('change_percent', 0):.2f}%)\n\n"
                         
+                        market_context += await get_technical_context(symbol)
+                        
                         market_context += "Analyze this data thoroughly and provide a detailed investment recommendation."
 
 
@@ -6,9 +6,10 @@ from typing import Optional
 import os
 import jwt
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
 from dotenv import load_dotenv
 from user_service import user_service
+from auth_cache import auth_cache
+from password_hasher import password_hasher
 
 # Load environment variables
 env_path = os.path.join(os.path.dirname(__file__), '.env')
@@ -18,9 +19,9 @@ load_dotenv(env_path)
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
-
-# Password Hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# iat may sit up to 1s ahead: tokens minted right after an invalidation carry its
+# (rounded-up) stale mark, see auth_cache.issue_time
+TOKEN_LEEWAY_SECONDS = 1
 
 # Using User Service (Firebase)
 _storage = user_service
@@ -30,11 +31,12 @@ def set_auth_db(db):
     pass
 
 # Helper Functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    # bcrypt is CPU-bound: runs in the hasher's process pool, off the event loop
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -42,25 +44,38 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    if "user_id" in to_encode:
+        issued_at = datetime.utcfromtimestamp(auth_cache.issue_time(to_encode["user_id"]))
+    else:
+        issued_at = datetime.utcnow()
+    to_encode.update({"exp": expire, "iat": issued_at})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def verify_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], leeway=TOKEN_LEEWAY_SECONDS)
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has expired"
         )
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
 
+def user_claims(db_user: dict) -> dict:
+    """Identity signed into access tokens, so authenticated requests needn't read the user back"""
+    return {
+        "user_id": str(db_user["id"]),
+        "email": db_user["email"],
+        "name": db_user.get("full_name", db_user.get("username")),
+        "role": "admin" if db_user.get("is_admin") else "user"
+    }
+
 async def get_current_user(authorization: Optional[str] = Header(None)):
     if not authorization:
         raise HTTPException(
@@ -72,22 +87,40 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
         # Extract token from "Bearer <token>"
         token = authorization.replace("Bearer ", "")
         payload = verify_token(token)
-        user_id = payload.get("user_id")
+        user_id = str(payload.get("user_id"))
+        
+        # Fast path: the signed claims, unless the user was changed/banned after the token was issued
+        if "role" in payload and auth_cache.claims_current(user_id, payload.get("iat")):
+            auth_cache.stats["fast_path"] += 1
+            return {
+                "id": user_id,
+                "name": payload.get("name"),
+                "email": payload.get("email"),
+                "role": payload["role"]
+            }
+        
+        cached = auth_cache.get(user_id)
+        if cached:
+            auth_cache.stats["cache_hits"] += 1
+            return cached
         
         # Get user from User Service (Firebase)
-        db_user = await _storage.get_user_by_id(str(user_id))
-        if not db_user:
+        auth_cache.stats["lookups"] += 1
+        db_user = await _storage.get_user_by_id(user_id)
+        if not db_user or db_user.get("is_banned") or db_user.get("is_active") is False:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found"
             )
         
+        claims = user_claims(db_user)
         user_data = {
-            "id": str(db_user["id"]),
-            "name": db_user.get("full_name", db_user.get("username")),
-            "email": db_user["email"],
-            "role": "admin" if db_user.get("is_admin") else "user"
+            "id": claims["user_id"],
+            "name": claims["name"],
+            "email": claims["email"],
+            "role": claims["role"]
         }
+        auth_cache.put(user_id, user_data)
         
         return user_data
     except Exception as e:
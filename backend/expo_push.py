@@ -0,0 +1,191 @@
+"""
+Expo Push Client
+Sends push notifications through Expo's push API over one shared aiohttp session.
+Messages are packed into Expo's 100-per-request batches which are posted
+concurrently, paced by a messages-per-second budget (Expo's per-project limit).
+Returns one push ticket per message, in message order; receipts for those
+tickets are fetched in bulk with get_receipts (see push_receipts).
+
+Malformed tokens never reach Expo (they get an InvalidPushToken ticket), and a
+batch Expo rejects as a whole (400) is split until the bad message is isolated,
+so one bad message can't drop the other 99.
+"""
+
+import asyncio
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+EXPO_PUSH_URL = "https://exp.host/--/api/v2/push/send"
+EXPO_RECEIPTS_URL = "https://exp.host/--/api/v2/push/getReceipts"
+EXPO_BATCH_SIZE = 100                                                  # Expo's per-request message limit
+EXPO_RECEIPT_BATCH_SIZE = 1000                                         # Expo's per-request receipt id limit
+PUSH_CONCURRENCY = int(os.getenv("PUSH_CONCURRENCY", "6"))             # Requests in flight
+PUSH_RATE_PER_SECOND = int(os.getenv("PUSH_RATE_PER_SECOND", "600"))   # Messages per second
+PUSH_MAX_ATTEMPTS = 3
+REQUEST_TIMEOUT_SECONDS = 15
+
+PUSH_TOKEN_PATTERN = re.compile(r"^Expo(?:nent)?PushToken\[[^\[\]\s]+\]$")
+INVALID_TOKEN_ERROR = "InvalidPushToken"
+
+
+def is_valid_push_token(token) -> bool:
+    """ExponentPushToken[...] / ExpoPushToken[...]"""
+    return isinstance(token, str) and bool(PUSH_TOKEN_PATTERN.match(token))
+
+
+class _RateBudget:
+    """Reservation-based pacing: each batch books its share of the per-second budget"""
+
+    def __init__(self, per_second: int):
+        self.per_second = per_second
+        self._next = 0.0
+
+    async def acquire(self, count: int):
+        now = time.monotonic()
+        start = max(now, self._next)
+        self._next = start + count / self.per_second
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class ExpoPushClient:
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore = asyncio.Semaphore(PUSH_CONCURRENCY)
+        self._budget = _RateBudget(PUSH_RATE_PER_SECOND)
+        self.stats = {
+            "messages": 0, "batches": 0, "ok": 0, "errors": 0, "failed_batches": 0, "retries": 0,
+            "split_batches": 0, "invalid_tokens": 0,
+        }
+        self.last_send: Optional[dict] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS),
+                connector=aiohttp.TCPConnector(limit=PUSH_CONCURRENCY),
+                headers={
+                    "Accept": "application/json",
+                    "Accept-Encoding": "gzip, deflate",
+                    "Content-Type": "application/json",
+                },
+            )
+        return self._session
+
+    async def _request_batch(self, batch: List[Dict]) -> Tuple[Optional[List[Dict]], Optional[int], object]:
+        """(tickets, None, None) on success, else (None, last HTTP status or None, error)"""
+        error, status = None, None
+        async with self._semaphore:
+            for attempt in range(PUSH_MAX_ATTEMPTS):
+                await self._budget.acquire(len(batch))
+                try:
+                    async with self._get_session().post(EXPO_PUSH_URL, json=batch) as response:
+                        status = response.status
+                        result = await response.json(content_type=None)
+                        if status == 200 and isinstance(result.get("data"), list):
+                            self.stats["batches"] += 1
+                            tickets = result["data"]
+                            # Never misalign tickets with messages, even on a short reply
+                            return (tickets + [{"status": "error", "message": "No ticket"}] * len(batch))[:len(batch)], None, None
+                        error = result.get("errors") or result
+                        retryable = status == 429 or status >= 500
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    error, status, retryable = str(e), None, True
+                if not retryable or attempt + 1 == PUSH_MAX_ATTEMPTS:
+                    break
+                self.stats["retries"] += 1
+                await asyncio.sleep(2 ** attempt)
+        return None, status, error
+
+    async def _post_batch(self, batch: List[Dict]) -> List[Dict]:
+        """Tickets for one request of up to EXPO_BATCH_SIZE messages"""
+        tickets, status, error = await self._request_batch(batch)
+        if tickets is not None:
+            return tickets
+
+        if status == 400 and len(batch) > 1:
+            # Request-level validation error: retry the halves so only the bad message fails
+            self.stats["split_batches"] += 1
+            middle = len(batch) // 2
+            halves = await asyncio.gather(self._post_batch(batch[:middle]), self._post_batch(batch[middle:]))
+            return halves[0] + halves[1]
+
+        print(f"[PUSH] Batch of {len(batch)} failed: {error}")
+        self.stats["failed_batches"] += 1
+        return [{"status": "error", "message": str(error)} for _ in batch]
+
+    async def send(self, messages: List[Dict]) -> dict:
+        """Send messages; returns counts, throughput and `tickets` aligned with `messages`"""
+        if not messages:
+            return {"messages": 0, "batches": 0, "ok": 0, "errors": 0, "seconds": 0.0, "per_second": 0.0, "tickets": []}
+
+        started = time.perf_counter()
+        valid = [i for i, message in enumerate(messages) if is_valid_push_token(message.get("to"))]
+        tickets = [{
+            "status": "error",
+            "message": f"Not an Expo push token: {message.get('to')!r}",
+            "details": {"error": INVALID_TOKEN_ERROR},
+        } for message in messages]
+        self.stats["invalid_tokens"] += len(messages) - len(valid)
+
+        # Batch only well-formed messages, then put each ticket back at its message's position
+        batches = [valid[i:i + EXPO_BATCH_SIZE] for i in range(0, len(valid), EXPO_BATCH_SIZE)]
+        results = await asyncio.gather(*(self._post_batch([messages[i] for i in batch]) for batch in batches))
+        for batch, result in zip(batches, results):
+            for i, ticket in zip(batch, result):
+                tickets[i] = ticket
+        elapsed = time.perf_counter() - started
+
+        ok = sum(1 for ticket in tickets if ticket.get("status") == "ok")
+        summary = {
+            "messages": len(messages),
+            "batches": len(batches),
+            "ok": ok,
+            "errors": len(messages) - ok,
+            "seconds": round(elapsed, 2),
+            "per_second": round(len(messages) / elapsed, 1) if elapsed else 0.0,
+        }
+        self.stats["messages"] += len(messages)
+        self.stats["ok"] += ok
+        self.stats["errors"] += len(messages) - ok
+        self.last_send = summary
+        if len(batches) > 1:
+            print(f"[PUSH] {len(messages)} messages in {len(batches)} batches, "
+                  f"{summary['seconds']}s ({summary['per_second']}/s), {summary['errors']} errors")
+        return {**summary, "tickets": tickets}
+
+    async def _fetch_receipts(self, ids: List[str]) -> Dict[str, Dict]:
+        async with self._semaphore:
+            try:
+                async with self._get_session().post(EXPO_RECEIPTS_URL, json={"ids": ids}) as response:
+                    result = await response.json(content_type=None)
+                    if response.status == 200 and isinstance(result.get("data"), dict):
+                        return result["data"]
+                    print(f"[PUSH] Receipt request failed ({response.status}): {result.get('errors') or result}")
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print(f"[PUSH] Receipt request failed: {e}")
+        return {}
+
+    async def get_receipts(self, ticket_ids: List[str]) -> Dict[str, Dict]:
+        """ticket id -> receipt, for the receipts Expo has ready (missing ids aren't ready or failed to fetch)"""
+        chunks = [ticket_ids[i:i + EXPO_RECEIPT_BATCH_SIZE] for i in range(0, len(ticket_ids), EXPO_RECEIPT_BATCH_SIZE)]
+        receipts = {}
+        for result in await asyncio.gather(*(self._fetch_receipts(chunk) for chunk in chunks)):
+            receipts.update(result)
+        return receipts
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "last_send": self.last_send}
+
+
+# Global instance
+expo_push_client = ExpoPushClient()
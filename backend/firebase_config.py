@@ -1,6 +1,6 @@
 import os
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
 import logging
 from dotenv import load_dotenv
 
@@ -10,6 +10,10 @@ logger = logging.getLogger(__name__)
 
 # Global instances
 db = None
+async_db = None
+
+# Per-RPC deadline for async client calls (a stalled call fails instead of hanging the request)
+FIRESTORE_TIMEOUT = float(os.getenv("FIRESTORE_TIMEOUT_SECONDS", "10"))
 
 def initialize_firebase():
     """
@@ -65,3 +69,15 @@ def get_firestore():
     if db is None:
         raise Exception("Firebase not initialized")
     return db
+
+def get_async_firestore():
+    """
+    Shared async Firestore client: calls are awaited natively on the event loop
+    (no executor thread) and every request reuses its one gRPC channel.
+    """
+    global async_db
+    if async_db is None:
+        if not firebase_admin._apps:
+            raise Exception("Firebase not initialized")
+        async_db = firestore_async.client()
+    return async_db
@@ -0,0 +1,258 @@
+"""
+Firestore Storage Backend
+Production implementation of StorageBackend on the async Firestore client
+(see firebase_config.get_async_firestore): one shared gRPC channel, and every
+RPC carries the FIRESTORE_TIMEOUT deadline.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from firebase_admin import firestore
+
+from firebase_config import get_async_firestore, FIRESTORE_TIMEOUT
+from storage_backend import SERVER_TIMESTAMP, StorageBackend
+
+BATCH_LIMIT = 500  # Firestore's limit on writes per batch
+
+
+def _prepare(data: Dict) -> Dict:
+    return {k: firestore.SERVER_TIMESTAMP if v is SERVER_TIMESTAMP else v for k, v in data.items()}
+
+
+def _with_id(doc) -> Dict:
+    return {**doc.to_dict(), "id": doc.id}
+
+
+class FirestoreBackend(StorageBackend):
+    name = "firestore"
+
+    def _db(self):
+        return get_async_firestore()
+
+    def _users(self):
+        return self._db().collection("users")
+
+    # ------------------------------------------------------------------
+    # Users
+    # ------------------------------------------------------------------
+
+    async def get_user(self, user_id: str) -> Optional[Dict]:
+        doc = await self._users().document(str(user_id)).get(timeout=FIRESTORE_TIMEOUT)
+        return _with_id(doc) if doc.exists else None
+
+    async def get_user_by_email(self, email: str) -> Optional[Dict]:
+        docs = self._users().where("email", "==", email).limit(1).stream(timeout=FIRESTORE_TIMEOUT)
+        async for doc in docs:
+            return _with_id(doc)  # Use document ID as user ID
+        return None
+
+    async def create_user(self, data: Dict) -> str:
+        update_time, doc_ref = await self._users().add(_prepare(data), timeout=FIRESTORE_TIMEOUT)
+        return doc_ref.id
+
+    async def update_user(self, user_id: str, updates: Dict) -> None:
+        await self._users().document(str(user_id)).update(_prepare(updates), timeout=FIRESTORE_TIMEOUT)
+
+    async def merge_user(self, user_id: str, fields: Dict) -> None:
+        await self._users().document(str(user_id)).set(_prepare(fields), merge=True, timeout=FIRESTORE_TIMEOUT)
+
+    async def list_push_users(self) -> List[Dict]:
+        # Ordering by the field only returns documents that have it
+        docs = self._users().order_by("expo_push_token").stream(timeout=FIRESTORE_TIMEOUT)
+        return [_with_id(doc) async for doc in docs if doc.to_dict().get("expo_push_token")]
+
+    async def clear_push_tokens(self, tokens: List[Tuple[str, str]]) -> int:
+        db = self._db()
+        dead = {str(user_id): token for user_id, token in tokens}
+        refs = [self._users().document(user_id) for user_id in dead]
+        removed = 0
+        for start in range(0, len(refs), BATCH_LIMIT):
+            batch = db.batch()
+            count = 0
+            # One batched read, then only clear tokens that are still the dead one
+            async for doc in db.get_all(refs[start:start + BATCH_LIMIT], field_paths=["expo_push_token"], timeout=FIRESTORE_TIMEOUT):
+                if doc.exists and (doc.to_dict() or {}).get("expo_push_token") == dead[doc.id]:
+                    batch.update(doc.reference, {
+                        "expo_push_token": firestore.DELETE_FIELD,
+                        "push_token_invalidated_at": firestore.SERVER_TIMESTAMP,
+                    })
+                    count += 1
+            if count:
+                await batch.commit(timeout=FIRESTORE_TIMEOUT)
+                removed += count
+        return removed
+
+    # ------------------------------------------------------------------
+    # Portfolio history / activity
+    # ------------------------------------------------------------------
+
+    async def add_portfolio_snapshot(self, user_id: str, snapshot: Dict) -> None:
+        # Subcollection: users/{user_id}/portfolio_history/{auto id}
+        await self._users().document(str(user_id)).collection("portfolio_history")\
+            .add(_prepare(snapshot), timeout=FIRESTORE_TIMEOUT)
+
+    async def list_portfolio_snapshots(self, user_id: str, since: datetime) -> List[Dict]:
+        docs = self._users().document(str(user_id)).collection("portfolio_history")\
+            .where("timestamp", ">=", since)\
+            .order_by("timestamp", direction=firestore.Query.DESCENDING)\
+            .stream(timeout=FIRESTORE_TIMEOUT)
+        return [doc.to_dict() async for doc in docs]
+
+    async def add_activity_logs(self, events: List[Dict]) -> None:
+        db = self._db()
+        collection = db.collection("activity_logs")
+        for start in range(0, len(events), BATCH_LIMIT):
+            batch = db.batch()
+            for event in events[start:start + BATCH_LIMIT]:
+                batch.set(collection.document(), _prepare(event))
+            await batch.commit(timeout=FIRESTORE_TIMEOUT)
+
+    # ------------------------------------------------------------------
+    # Watchlists (top-level "watchlists" collection with a user_id field)
+    # ------------------------------------------------------------------
+
+    def _watchlist_query(self, user_id, symbol: str):
+        return self._db().collection("watchlists")\
+            .where("user_id", "==", user_id)\
+            .where("symbol", "==", symbol)
+
+    async def list_watchlist(self, user_id) -> List[Dict]:
+        docs = self._db().collection("watchlists").where("user_id", "==", user_id).stream(timeout=FIRESTORE_TIMEOUT)
+        return [doc.to_dict() async for doc in docs]
+
+    async def put_watchlist_item(self, item_id: str, item: Dict) -> None:
+        await self._db().collection("watchlists").document(item_id).set(_prepare(item), timeout=FIRESTORE_TIMEOUT)
+
+    async def delete_watchlist_symbol(self, user_id, symbol: str) -> bool:
+        deleted = False
+        async for doc in self._watchlist_query(user_id, symbol).stream(timeout=FIRESTORE_TIMEOUT):
+            await doc.reference.delete(timeout=FIRESTORE_TIMEOUT)
+            deleted = True
+        return deleted
+
+    async def update_watchlist_symbol(self, user_id, symbol: str, updates: Dict) -> List[Dict]:
+        updated = []
+        async for doc in self._watchlist_query(user_id, symbol).limit(1).stream(timeout=FIRESTORE_TIMEOUT):
+            await doc.reference.update(_prepare(updates), timeout=FIRESTORE_TIMEOUT)
+            updated.append({**doc.to_dict(), **updates})
+        return updated
+
+    async def list_watchlist_symbols(self) -> List[Dict]:
+        docs = self._db().collection("watchlists").select(["symbol", "exchange"]).stream(timeout=FIRESTORE_TIMEOUT)
+        return [doc.to_dict() or {} async for doc in docs]
+
+    # ------------------------------------------------------------------
+    # Notifications (users/{user_id}/notifications)
+    # ------------------------------------------------------------------
+
+    def _notifications(self, user_id: str):
+        return self._users().document(str(user_id)).collection("notifications")
+
+    async def add_notification(self, user_id: str, notification: Dict) -> str:
+        doc_ref = self._notifications(user_id).document()
+        notification["id"] = doc_ref.id
+        await doc_ref.set(_prepare(notification), timeout=FIRESTORE_TIMEOUT)
+        return doc_ref.id
+
+    async def add_notifications(self, notifications: List[Dict]) -> List[str]:
+        db = self._db()
+        ids = []
+        for start in range(0, len(notifications), BATCH_LIMIT):
+            batch = db.batch()
+            for notification in notifications[start:start + BATCH_LIMIT]:
+                doc_ref = self._notifications(notification["user_id"]).document()
+                notification["id"] = doc_ref.id
+                batch.set(doc_ref, _prepare(notification))
+                ids.append(doc_ref.id)
+            await batch.commit(timeout=FIRESTORE_TIMEOUT)
+        return ids
+
+    async def list_notifications(self, user_id: str, limit: int, unread_only: bool = False) -> List[Dict]:
+        ref = self._notifications(user_id)
+        if unread_only:
+            ref = ref.where("read", "==", False)
+        query = ref.order_by("created_at", direction=firestore.Query.DESCENDING).limit(limit)
+        return [_with_id(doc) async for doc in query.stream(timeout=FIRESTORE_TIMEOUT)]
+
+    async def mark_notification_read(self, user_id: str, notification_id: str) -> None:
+        await self._notifications(user_id).document(str(notification_id)).update({"read": True}, timeout=FIRESTORE_TIMEOUT)
+
+    async def mark_all_notifications_read(self, user_id: str) -> None:
+        db = self._db()
+        batch = db.batch()
+        count = 0
+        async for doc in self._notifications(user_id).where("read", "==", False).stream(timeout=FIRESTORE_TIMEOUT):
+            batch.update(doc.reference, {"read": True})
+            count += 1
+            if count >= BATCH_LIMIT:
+                await batch.commit(timeout=FIRESTORE_TIMEOUT)
+                batch = db.batch()
+                count = 0
+        if count > 0:
+            await batch.commit(timeout=FIRESTORE_TIMEOUT)
+
+    # ------------------------------------------------------------------
+    # Market snapshots
+    # ------------------------------------------------------------------
+
+    async def put_market_snapshot(self, snapshot_id: str, snapshot: Dict) -> None:
+        await self._db().collection("market_snapshots").document(snapshot_id)\
+            .set(_prepare(snapshot), timeout=FIRESTORE_TIMEOUT)
+
+    async def latest_market_snapshot(self, date: Optional[str] = None) -> Optional[Dict]:
+        query = self._db().collection("market_snapshots")
+        if date:
+            query = query.where("date", "==", date)
+        docs = query.order_by("timestamp", direction=firestore.Query.DESCENDING).limit(1).stream(timeout=FIRESTORE_TIMEOUT)
+        async for doc in docs:
+            return doc.to_dict()
+        return None
+
+    async def list_market_snapshots(self, start_date: str, end_date: str) -> List[Dict]:
+        docs = self._db().collection("market_snapshots")\
+            .where("date", ">=", start_date)\
+            .where("date", "<=", end_date)\
+            .order_by("date", direction=firestore.Query.ASCENDING)\
+            .stream(timeout=FIRESTORE_TIMEOUT)
+        return [doc.to_dict() async for doc in docs]
+
+    # ------------------------------------------------------------------
+    # Chat conversations
+    # ------------------------------------------------------------------
+
+    def _conversations(self):
+        return self._db().collection("chat_conversations")
+
+    async def add_conversation(self, conversation: Dict) -> str:
+        update_time, doc_ref = await self._conversations().add(_prepare(conversation), timeout=FIRESTORE_TIMEOUT)
+        return doc_ref.id
+
+    async def list_conversations(self, user_id: str, limit: int) -> List[Dict]:
+        query = self._conversations().where("user_id", "==", str(user_id))\
+            .order_by("updated_at", direction=firestore.Query.DESCENDING)\
+            .limit(limit)
+        return [_with_id(doc) async for doc in query.stream(timeout=FIRESTORE_TIMEOUT)]
+
+    async def get_conversation(self, conversation_id: str) -> Optional[Dict]:
+        doc = await self._conversations().document(conversation_id).get(timeout=FIRESTORE_TIMEOUT)
+        return _with_id(doc) if doc.exists else None
+
+    async def delete_conversation(self, conversation_id: str) -> None:
+        await self._conversations().document(conversation_id).delete(timeout=FIRESTORE_TIMEOUT)
+
+    # ------------------------------------------------------------------
+    # Saved screens
+    # ------------------------------------------------------------------
+
+    def _saved_screens(self):
+        return self._db().collection("saved_screens")
+
+    async def list_saved_screens(self) -> List[Dict]:
+        return [_with_id(doc) async for doc in self._saved_screens().stream(timeout=FIRESTORE_TIMEOUT)]
+
+    async def put_saved_screen(self, screen_id: str, screen: Dict) -> None:
+        await self._saved_screens().document(screen_id).set(_prepare(screen), timeout=FIRESTORE_TIMEOUT)
+
+    async def delete_saved_screen(self, screen_id: str) -> None:
+        await self._saved_screens().document(screen_id).delete(timeout=FIRESTORE_TIMEOUT)
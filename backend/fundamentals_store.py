@@ -0,0 +1,209 @@
+"""
+Fundamentals Store
+Local SQLite table of Yahoo fundamentals for the whole instrument universe,
+filled by a nightly bulk ingestion job so request handlers never wait on yf.Ticker.info.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache")
+FUNDAMENTALS_DB_FILE = os.path.join(CACHE_DIR, "fundamentals.db")
+
+INGEST_WORKERS = int(os.getenv("FUNDAMENTALS_INGEST_WORKERS", "4"))
+INGEST_RETRIES = 3
+INGEST_BATCH_SIZE = 50
+INGEST_TIME = "02:00"  # Nightly, well outside market hours
+
+
+def reference_close(fund: dict) -> float:
+    """
+    Close that today's change is measured against. Rows ingested on an earlier
+    day (the nightly run) carry the last session's close as their current price.
+    """
+    today = date.today().isoformat()
+    if (fund.get("refreshed_on") or today) < today:
+        return fund.get("current_price") or 0
+    return fund.get("previous_close") or 0
+
+
+class FundamentalsStore:
+    """symbol (Yahoo ticker) -> fundamentals JSON + date of last refresh"""
+
+    def __init__(self, path: str = FUNDAMENTALS_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.ingest_running = False
+        self.last_ingest: Optional[dict] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS fundamentals (
+                    symbol TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    refreshed_on TEXT NOT NULL
+                )"""
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, symbol: str) -> Optional[dict]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT data, refreshed_on FROM fundamentals WHERE symbol = ?", (symbol,)
+            ).fetchone()
+        return {**json.loads(row[0]), "refreshed_on": row[1]} if row else None
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, dict]:
+        symbols = list(symbols)
+        results = {}
+        with self._lock:
+            conn = self._connect()
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(symbols), 500):
+                chunk = symbols[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for symbol, data, refreshed_on in conn.execute(
+                    f"SELECT symbol, data, refreshed_on FROM fundamentals WHERE symbol IN ({placeholders})", chunk
+                ):
+                    results[symbol] = {**json.loads(data), "refreshed_on": refreshed_on}
+        return results
+
+    def load_universe(self) -> Dict[str, dict]:
+        """Stored fundamentals for every NSE equity, keyed by plain symbol (RELIANCE)"""
+        stored = self.get_many(self.universe_tickers())
+        return {ticker[:-3]: fund for ticker, fund in stored.items()}
+
+    def upsert_many(self, rows: Dict[str, dict], refreshed_on: Optional[str] = None):
+        refreshed_on = refreshed_on or date.today().isoformat()
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO fundamentals (symbol, data, refreshed_on) VALUES (?, ?, ?)",
+                [(symbol, json.dumps(data, separators=(",", ":")), refreshed_on) for symbol, data in rows.items()],
+            )
+            conn.commit()
+
+    def refreshed_symbols(self, refreshed_on: str) -> set:
+        with self._lock:
+            return {
+                row[0] for row in self._connect().execute(
+                    "SELECT symbol FROM fundamentals WHERE refreshed_on = ?", (refreshed_on,)
+                )
+            }
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM fundamentals").fetchone()[0]
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total, oldest, newest = self._connect().execute(
+                "SELECT COUNT(*), MIN(refreshed_on), MAX(refreshed_on) FROM fundamentals"
+            ).fetchone()
+        return {
+            "symbols": total,
+            "oldest_refresh": oldest,
+            "newest_refresh": newest,
+            "ingest_running": self.ingest_running,
+            "last_ingest": self.last_ingest,
+        }
+
+    # ------------------------------------------------------------------
+    # Bulk ingestion
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def universe_tickers() -> List[str]:
+        """Yahoo tickers for every NSE equity in the instrument master"""
+        from instrument_master import load_instruments_sync
+
+        tickers = set()
+        for inst in load_instruments_sync():
+            symbol = inst.get("symbol", "")
+            if inst.get("exch_seg") == "NSE" and symbol.endswith("-EQ"):
+                tickers.add(f"{symbol[:-3]}.NS")
+        return sorted(tickers)
+
+    @classmethod
+    def in_universe(cls, ticker: str) -> bool:
+        """Ticker covered by the nightly ingestion (indices and BSE-only listings are not)"""
+        return not ticker.startswith("^") and ticker in set(cls.universe_tickers())
+
+    @staticmethod
+    def _fetch_with_retry(ticker: str) -> Optional[dict]:
+        from yahoo_service import _fetch_stock_fundamentals_sync
+
+        for attempt in range(INGEST_RETRIES):
+            data = _fetch_stock_fundamentals_sync(ticker)
+            if data and data.get("current_price"):
+                return data
+            time.sleep(1 + attempt * 2)  # Backoff; empty info usually means throttling
+        return None
+
+    def run_ingestion(self, tickers: Optional[List[str]] = None, force: bool = False) -> dict:
+        """
+        Pull fundamentals for the universe (sync, run in a thread).
+        Tickers already refreshed today are skipped unless force=True, so a
+        crashed or interrupted run resumes where it stopped.
+        """
+        if self.ingest_running:
+            print("[FUNDAMENTALS] Ingestion already running")
+            return {"skipped": True}
+
+        self.ingest_running = True
+        started = time.time()
+        today = date.today().isoformat()
+        fetched = failed = 0
+        try:
+            tickers = tickers or self.universe_tickers()
+            if not force:
+                done = self.refreshed_symbols(today)
+                tickers = [t for t in tickers if t not in done]
+            print(f"[FUNDAMENTALS] Ingesting {len(tickers)} symbols with {INGEST_WORKERS} workers")
+
+            batch: Dict[str, dict] = {}
+            with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as executor:
+                futures = {executor.submit(self._fetch_with_retry, t): t for t in tickers}
+                for future in as_completed(futures):
+                    ticker = futures[future]
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        print(f"[FUNDAMENTALS] {ticker} failed: {e}")
+                        data = None
+                    if data:
+                        batch[ticker] = data
+                        fetched += 1
+                    else:
+                        failed += 1
+                    if len(batch) >= INGEST_BATCH_SIZE:
+                        self.upsert_many(batch, today)
+                        batch = {}
+            if batch:
+                self.upsert_many(batch, today)
+        finally:
+            self.ingest_running = False
+            self.last_ingest = {
+                "finished_at": datetime.now().isoformat(),
+                "fetched": fetched,
+                "failed": failed,
+                "duration_seconds": round(time.time() - started, 1),
+            }
+            print(f"[FUNDAMENTALS] Ingestion done: {self.last_ingest}")
+        return self.last_ingest
+
+
+# Global instance
+fundamentals_store = FundamentalsStore()
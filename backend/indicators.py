@@ -0,0 +1,462 @@
+"""
+Technical Indicator Engine
+Computes SMA, EMA, RSI, MACD, Bollinger Bands, ATR and VWAP over candle series.
+- Full series are computed with vectorized numpy/pandas operations
+- Per-chart state is kept so new bars are applied incrementally (O(1) per bar)
+"""
+import math
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Callable, Awaitable
+
+import numpy as np
+import pandas as pd
+
+IST_OFFSET_SECONDS = 19800  # +05:30, used to split VWAP sessions by trading day
+
+SUPPORTED_INDICATORS = ["sma", "ema", "rsi", "macd", "bollinger", "atr", "vwap"]
+
+DEFAULT_PARAMS = {
+    "sma_periods": (20, 50),
+    "ema_periods": (20,),
+    "rsi_period": 14,
+    "macd": (12, 26, 9),
+    "bollinger": (20, 2.0),
+    "atr_period": 14,
+}
+
+
+# ============================================================================
+# VECTORIZED SERIES FUNCTIONS
+# ============================================================================
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """Simple moving average using a cumulative sum window"""
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    if period <= 0 or len(values) < period:
+        return out
+    csum = np.cumsum(np.insert(values, 0, 0.0))
+    out[period - 1:] = (csum[period:] - csum[:-period]) / period
+    return out
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    """Exponential moving average (alpha = 2 / (period + 1)), seeded with the first value"""
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return values
+    return pd.Series(values).ewm(span=period, adjust=False).mean().to_numpy()
+
+
+def rsi(closes: np.ndarray, period: int = 14) -> np.ndarray:
+    """Relative Strength Index with Wilder smoothing"""
+    closes = np.asarray(closes, dtype=float)
+    out = np.full(closes.shape, np.nan)
+    if len(closes) <= period:
+        return out
+    delta = np.diff(closes)
+    gains = pd.Series(np.clip(delta, 0, None))
+    losses = pd.Series(np.clip(-delta, 0, None))
+    avg_gain = gains.ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+    avg_loss = losses.ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        values = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + rs))
+    out[1:] = values
+    out[:period] = np.nan
+    return out
+
+
+def macd(closes: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """MACD line, signal line and histogram"""
+    macd_line = ema(closes, fast) - ema(closes, slow)
+    signal_line = ema(macd_line, signal)
+    return {
+        "macd": macd_line,
+        "macd_signal": signal_line,
+        "macd_hist": macd_line - signal_line,
+    }
+
+
+def bollinger(closes: np.ndarray, period: int = 20, num_std: float = 2.0) -> Dict[str, np.ndarray]:
+    """Bollinger Bands (population standard deviation)"""
+    series = pd.Series(np.asarray(closes, dtype=float))
+    middle = series.rolling(period).mean().to_numpy()
+    std = series.rolling(period).std(ddof=0).to_numpy()
+    return {
+        "bb_upper": middle + num_std * std,
+        "bb_middle": middle,
+        "bb_lower": middle - num_std * std,
+    }
+
+
+def atr(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 14) -> np.ndarray:
+    """Average True Range with Wilder smoothing"""
+    highs = np.asarray(highs, dtype=float)
+    lows = np.asarray(lows, dtype=float)
+    closes = np.asarray(closes, dtype=float)
+    if len(closes) == 0:
+        return closes
+    prev_close = np.roll(closes, 1)
+    prev_close[0] = closes[0]
+    true_range = np.maximum.reduce([
+        highs - lows,
+        np.abs(highs - prev_close),
+        np.abs(lows - prev_close),
+    ])
+    out = pd.Series(true_range).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy(copy=True)  # pandas may return a read-only view
+    out[:period - 1] = np.nan
+    return out
+
+
+def vwap(times: np.ndarray, highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, volumes: np.ndarray) -> np.ndarray:
+    """Session VWAP, reset at the start of every IST trading day"""
+    typical = (np.asarray(highs, dtype=float) + np.asarray(lows, dtype=float) + np.asarray(closes, dtype=float)) / 3.0
+    volumes = np.asarray(volumes, dtype=float)
+    sessions = (np.asarray(times, dtype=np.int64) + IST_OFFSET_SECONDS) // 86400
+    frame = pd.DataFrame({"session": sessions, "pv": typical * volumes, "v": volumes})
+    cum = frame.groupby("session")[["pv", "v"]].cumsum()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(cum["v"].to_numpy() > 0, cum["pv"].to_numpy() / cum["v"].to_numpy(), typical)
+
+
+def compute_indicators(candles: List[dict], indicators: Optional[List[str]] = None, params: Optional[dict] = None) -> Dict[str, list]:
+    """
+    Compute indicators for a whole candle series.
+    Candles use the /api/candles format (time, open, high, low, close, volume), oldest first.
+    Returns a columnar dict: {"time": [...], "rsi_14": [...], ...} with None for warm-up values.
+    """
+    indicators = indicators or SUPPORTED_INDICATORS
+    p = {**DEFAULT_PARAMS, **(params or {})}
+
+    times = np.array([c["time"] for c in candles], dtype=np.int64)
+    highs = np.array([c["high"] for c in candles], dtype=float)
+    lows = np.array([c["low"] for c in candles], dtype=float)
+    closes = np.array([c["close"] for c in candles], dtype=float)
+    volumes = np.array([c.get("volume", 0) for c in candles], dtype=float)
+
+    columns: Dict[str, np.ndarray] = {}
+    if "sma" in indicators:
+        for period in p["sma_periods"]:
+            columns[f"sma_{period}"] = sma(closes, period)
+    if "ema" in indicators:
+        for period in p["ema_periods"]:
+            columns[f"ema_{period}"] = ema(closes, period)
+    if "rsi" in indicators:
+        columns[f"rsi_{p['rsi_period']}"] = rsi(closes, p["rsi_period"])
+    if "macd" in indicators:
+        columns.update(macd(closes, *p["macd"]))
+    if "bollinger" in indicators:
+        columns.update(bollinger(closes, *p["bollinger"]))
+    if "atr" in indicators:
+        columns[f"atr_{p['atr_period']}"] = atr(highs, lows, closes, p["atr_period"])
+    if "vwap" in indicators:
+        columns["vwap"] = vwap(times, highs, lows, closes, volumes)
+
+    result = {"time": times.tolist()}
+    for name, values in columns.items():
+        result[name] = _to_json_list(values)
+    return result
+
+
+def _to_json_list(values: np.ndarray) -> list:
+    """Round to 4 decimals and replace NaN with None for JSON responses"""
+    return [None if (v is None or math.isnan(v)) else round(float(v), 4) for v in values]
+
+
+# ============================================================================
+# INCREMENTAL STATE
+# ============================================================================
+
+class _RollingWindow:
+    """Fixed-size window with running sum and sum of squares"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.values = deque(maxlen=period)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, value: float):
+        if len(self.values) == self.period:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+    def mean(self) -> Optional[float]:
+        if len(self.values) < self.period:
+            return None
+        return self.total / self.period
+
+    def std(self) -> Optional[float]:
+        mean = self.mean()
+        if mean is None:
+            return None
+        return math.sqrt(max(self.total_sq / self.period - mean * mean, 0.0))
+
+    def copy(self) -> "_RollingWindow":
+        clone = _RollingWindow(self.period)
+        clone.values = deque(self.values, maxlen=self.period)
+        clone.total = self.total
+        clone.total_sq = self.total_sq
+        return clone
+
+
+class IncrementalIndicators:
+    """
+    Indicator state for one chart that advances one bar at a time.
+
+    `update(candle)` applies a new bar in O(1). Re-sending the bar with the
+    last seen time (the forming bar) replaces it instead of appending.
+    """
+
+    def __init__(self, params: Optional[dict] = None):
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.last_time: Optional[int] = None
+        self._state = self._empty_state()
+        self._prev_state = None  # state before the last bar, used to replace a forming bar
+
+    def _empty_state(self) -> dict:
+        p = self.params
+        return {
+            "count": 0,
+            "prev_close": None,
+            "sma": {period: _RollingWindow(period) for period in p["sma_periods"]},
+            "bb": _RollingWindow(p["bollinger"][0]),
+            "ema": {period: None for period in p["ema_periods"]},
+            "macd_fast": None,
+            "macd_slow": None,
+            "macd_signal": None,
+            "avg_gain": None,
+            "avg_loss": None,
+            "atr": None,
+            "vwap_session": None,
+            "cum_pv": 0.0,
+            "cum_v": 0.0,
+        }
+
+    @staticmethod
+    def _copy_state(state: dict) -> dict:
+        clone = dict(state)
+        clone["sma"] = {period: window.copy() for period, window in state["sma"].items()}
+        clone["bb"] = state["bb"].copy()
+        clone["ema"] = dict(state["ema"])
+        return clone
+
+    @staticmethod
+    def _ema_step(prev: Optional[float], value: float, period: int) -> float:
+        if prev is None:
+            return value
+        alpha = 2.0 / (period + 1)
+        return prev + alpha * (value - prev)
+
+    @staticmethod
+    def _wilder_step(prev: Optional[float], value: float, period: int) -> float:
+        if prev is None:
+            return value
+        return prev + (value - prev) / period
+
+    @classmethod
+    def from_candles(cls, candles: List[dict], params: Optional[dict] = None) -> "IncrementalIndicators":
+        """Build state by replaying a candle series"""
+        engine = cls(params)
+        for candle in candles:
+            engine.update(candle)
+        return engine
+
+    def update(self, candle: dict) -> Dict[str, Optional[float]]:
+        """Apply one bar and return the latest indicator values"""
+        if self.last_time is not None and candle["time"] < self.last_time:
+            raise ValueError("Candles must be applied in ascending time order")
+
+        if self.last_time is not None and candle["time"] == self.last_time and self._prev_state is not None:
+            # Forming bar re-sent: roll back and re-apply
+            self._state = self._copy_state(self._prev_state)
+        else:
+            self._prev_state = self._copy_state(self._state)
+        self.last_time = candle["time"]
+
+        s = self._state
+        p = self.params
+        close = float(candle["close"])
+        high = float(candle["high"])
+        low = float(candle["low"])
+        volume = float(candle.get("volume", 0))
+        prev_close = s["prev_close"]
+        s["count"] += 1
+        values: Dict[str, Optional[float]] = {}
+
+        for period, window in s["sma"].items():
+            window.push(close)
+            values[f"sma_{period}"] = window.mean()
+
+        for period in s["ema"]:
+            s["ema"][period] = self._ema_step(s["ema"][period], close, period)
+            values[f"ema_{period}"] = s["ema"][period]
+
+        fast, slow, signal = p["macd"]
+        s["macd_fast"] = self._ema_step(s["macd_fast"], close, fast)
+        s["macd_slow"] = self._ema_step(s["macd_slow"], close, slow)
+        macd_line = s["macd_fast"] - s["macd_slow"]
+        s["macd_signal"] = self._ema_step(s["macd_signal"], macd_line, signal)
+        values["macd"] = macd_line
+        values["macd_signal"] = s["macd_signal"]
+        values["macd_hist"] = macd_line - s["macd_signal"]
+
+        rsi_period = p["rsi_period"]
+        rsi_value = None
+        if prev_close is not None:
+            delta = close - prev_close
+            s["avg_gain"] = self._wilder_step(s["avg_gain"], max(delta, 0.0), rsi_period)
+            s["avg_loss"] = self._wilder_step(s["avg_loss"], max(-delta, 0.0), rsi_period)
+            if s["count"] > rsi_period:
+                if s["avg_loss"] == 0:
+                    rsi_value = 100.0
+                else:
+                    rsi_value = 100.0 - 100.0 / (1.0 + s["avg_gain"] / s["avg_loss"])
+        values[f"rsi_{rsi_period}"] = rsi_value
+
+        s["bb"].push(close)
+        middle = s["bb"].mean()
+        if middle is None:
+            values.update({"bb_upper": None, "bb_middle": None, "bb_lower": None})
+        else:
+            band = p["bollinger"][1] * s["bb"].std()
+            values.update({"bb_upper": middle + band, "bb_middle": middle, "bb_lower": middle - band})
+
+        atr_period = p["atr_period"]
+        ref_close = prev_close if prev_close is not None else close
+        true_range = max(high - low, abs(high - ref_close), abs(low - ref_close))
+        s["atr"] = self._wilder_step(s["atr"], true_range, atr_period)
+        values[f"atr_{atr_period}"] = s["atr"] if s["count"] >= atr_period else None
+
+        session = (int(candle["time"]) + IST_OFFSET_SECONDS) // 86400
+        if session != s["vwap_session"]:
+            s["vwap_session"] = session
+            s["cum_pv"] = 0.0
+            s["cum_v"] = 0.0
+        typical = (high + low + close) / 3.0
+        s["cum_pv"] += typical * volume
+        s["cum_v"] += volume
+        values["vwap"] = s["cum_pv"] / s["cum_v"] if s["cum_v"] > 0 else typical
+
+        s["prev_close"] = close
+        return {k: (round(v, 4) if v is not None else None) for k, v in values.items()}
+
+
+# ============================================================================
+# SERVICE
+# ============================================================================
+
+class IndicatorService:
+    """
+    Keeps computed indicator series per (symbol, interval) and extends them
+    incrementally as new candles show up in the candle cache.
+    """
+
+    def __init__(self, max_entries: int = 200):
+        self.max_entries = max_entries
+        # key -> {"engine": IncrementalIndicators, "series": {column: [...]}}
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.stats = {"full_computes": 0, "incremental_updates": 0, "bars_applied": 0}
+
+    def _get_cache_key(self, symbol: str, interval: str) -> str:
+        return f"{symbol.upper()}:{interval}"
+
+    def _full_compute(self, key: str, candles: List[dict]) -> dict:
+        series = compute_indicators(candles)
+        entry = {"engine": IncrementalIndicators.from_candles(candles), "series": series}
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.stats["full_computes"] += 1
+        return entry
+
+    def _apply_new_bars(self, entry: dict, new_candles: List[dict]):
+        engine: IncrementalIndicators = entry["engine"]
+        series = entry["series"]
+        for candle in new_candles:
+            values = engine.update(candle)
+            if series["time"] and series["time"][-1] == candle["time"]:
+                for name, value in values.items():
+                    if name in series:
+                        series[name][-1] = value
+            else:
+                series["time"].append(candle["time"])
+                for name, value in values.items():
+                    if name in series:
+                        series[name].append(value)
+            self.stats["bars_applied"] += 1
+        self.stats["incremental_updates"] += 1
+
+    def update_series(self, symbol: str, interval: str, candles: List[dict]) -> dict:
+        """
+        Return the indicator series for `candles`, reusing stored state.
+        Only bars at or after the last computed bar are processed; anything
+        else (history changed, gap, first request) falls back to a full compute.
+        """
+        key = self._get_cache_key(symbol, interval)
+        entry = self._entries.get(key)
+        if not candles:
+            return {"time": []}
+
+        if entry is not None:
+            engine: IncrementalIndicators = entry["engine"]
+            known_times = entry["series"]["time"]
+            first_time = candles[0]["time"]
+            if engine.last_time is not None and known_times and known_times[0] == first_time:
+                new_candles = [c for c in candles if c["time"] >= engine.last_time]
+                if len(known_times) + len(new_candles) - 1 == len(candles):
+                    self._apply_new_bars(entry, new_candles)
+                    self._entries.move_to_end(key)
+                    return entry["series"]
+
+        return self._full_compute(key, candles)["series"]
+
+    def push_bar(self, symbol: str, interval: str, candle: dict) -> Optional[Dict[str, Optional[float]]]:
+        """Apply a single live bar to an existing chart state (no-op if not tracked)"""
+        entry = self._entries.get(self._get_cache_key(symbol, interval))
+        if entry is None:
+            return None
+        self._apply_new_bars(entry, [candle])
+        return {name: values[-1] for name, values in entry["series"].items()}
+
+    async def get_indicators(
+        self,
+        symbol: str,
+        interval: str,
+        fetch_func: Callable[[str, str], Awaitable[List[dict]]],
+        indicators: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+    ) -> dict:
+        """Fetch candles through `fetch_func` and return the requested indicator columns"""
+        candles = await fetch_func(symbol, interval)
+        series = self.update_series(symbol, interval, candles or [])
+        return self.select(series, indicators, limit)
+
+    @staticmethod
+    def select(series: dict, indicators: Optional[List[str]] = None, limit: Optional[int] = None) -> dict:
+        """Pick columns belonging to the requested indicators and trim to the last `limit` rows"""
+        wanted = indicators or SUPPORTED_INDICATORS
+        prefixes = {"bollinger": "bb_"}
+        result = {}
+        for name, values in series.items():
+            if name == "time" or any(name.startswith(prefixes.get(ind, ind)) for ind in wanted):
+                result[name] = values[-limit:] if limit else list(values)
+        return result
+
+    @staticmethod
+    def latest(series: dict) -> Dict[str, Optional[float]]:
+        """Last value of every column"""
+        return {name: values[-1] for name, values in series.items() if values}
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "tracked_charts": len(self._entries)}
+
+
+# Global instance
+indicator_service = IndicatorService()
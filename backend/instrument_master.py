@@ -1,5 +1,6 @@
 import os
 import json
+import asyncio
 import requests
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
@@ -169,7 +170,7 @@ async def search_instruments(query: str, limit: int = 10, use_ai: bool = True) -
     
     # First, try AI to interpret the query (if enabled)
     if use_ai:
-        ai_result = ai_search_query(query)
+        ai_result = await asyncio.to_thread(ai_search_query, query)
         if ai_result != query:
             query_lower = ai_result.lower()
             print(f"[INSTRUMENTS] AI converted '{query}' → '{ai_result}'")
@@ -352,12 +353,12 @@ def search_instruments_sync(query: str, limit: int = 10, use_ai: bool = True) ->
         # Try AI search if enabled
         if use_ai and not query_lower.isdigit():
             try:
-                ai_symbols = ai_search_query(query)
-                if ai_symbols:
-                    # Find instruments matching AI suggestions
+                ai_symbol = ai_search_query(query)
+                if ai_symbol:
+                    # Find instruments matching the AI suggestion
                     for inst in instruments:
                         symbol = inst.get("symbol", "").upper()
-                        if any(ai_sym.upper() in symbol for ai_sym in ai_symbols):
+                        if ai_symbol.upper() in symbol:
                             results.append({
                                 "symbol": symbol,
                                 "name": inst.get("name", ""),
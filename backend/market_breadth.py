@@ -0,0 +1,192 @@
+"""
+Market Breadth
+Advance/decline/unchanged and new 52-week high/low counters over the whole NSE
+equity universe, seeded from the fundamentals store and moved by the tick feed
+with O(1) work per tick.
+"""
+
+import asyncio
+import time
+from datetime import date, datetime
+from typing import Dict, Optional
+
+from fundamentals_store import fundamentals_store, reference_close
+from sector_classification import clean_symbol
+
+REFRESH_INTERVAL_SECONDS = 3600
+PUSH_INTERVAL_SECONDS = 1.0  # At most one WebSocket breadth push per second
+
+
+def _direction(price: float, prev_close: float) -> int:
+    if not prev_close or price == prev_close:
+        return 0
+    return 1 if price > prev_close else -1
+
+
+class MarketBreadth:
+    """
+    Each symbol remembers its current direction (+1/0/-1) and whether it has set
+    a new 52-week high or low today, so a tick only moves the counters it changes.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, dict] = {}   # symbol -> {prev_close, high_52w, low_52w, direction, new_high, new_low}
+        self._counts = {1: 0, -1: 0, 0: 0}
+        self.new_highs = 0
+        self.new_lows = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._dirty = False
+        self._last_push = 0.0
+        self.last_update: Optional[float] = None
+        self.last_refresh: Optional[datetime] = None
+        self.stats = {"refreshes": 0, "ticks_applied": 0, "pushes": 0}
+
+    @property
+    def size(self) -> int:
+        return len(self._entries)
+
+    @property
+    def is_live(self) -> bool:
+        """Ticks applied in today's session; otherwise the counters only hold the stored seed"""
+        return self.last_update is not None and datetime.fromtimestamp(self.last_update).date() == date.today()
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    async def refresh(self):
+        """Re-seed from the fundamentals store, keeping today's live state"""
+        rows = await asyncio.to_thread(fundamentals_store.load_universe)
+        if not rows:
+            return
+        # A new session starts from the stored closes with no new highs/lows yet
+        carried = self._entries if self.last_refresh and self.last_refresh.date() == date.today() else {}
+
+        entries = {}
+        for symbol, fund in rows.items():
+            prev_close = reference_close(fund)
+            if not prev_close:
+                continue
+            previous = carried.get(symbol)
+            if previous:
+                direction, new_high, new_low = previous["direction"], previous["new_high"], previous["new_low"]
+            else:
+                direction = _direction(fund.get("current_price") or prev_close, prev_close)
+                new_high = new_low = False
+            entries[symbol] = {
+                "prev_close": prev_close,
+                "high_52w": fund.get("52_week_high") or 0,
+                "low_52w": fund.get("52_week_low") or 0,
+                "direction": direction,
+                "new_high": new_high,
+                "new_low": new_low,
+            }
+
+        self._entries = entries
+        self._recount()
+        self.last_refresh = datetime.now()
+        self.stats["refreshes"] += 1
+        print(f"[BREADTH] Seeded {len(entries)} stocks: {self._counts[1]} up / {self._counts[-1]} down")
+
+    def _recount(self):
+        self._counts = {1: 0, -1: 0, 0: 0}
+        self.new_highs = self.new_lows = 0
+        for entry in self._entries.values():
+            self._counts[entry["direction"]] += 1
+            self.new_highs += entry["new_high"]
+            self.new_lows += entry["new_low"]
+        self._dirty = True
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def update(self, symbol: str, price: float):
+        """Apply one tick - O(1)"""
+        entry = self._entries.get(symbol)
+        if entry is None:
+            return
+
+        direction = _direction(price, entry["prev_close"])
+        if direction != entry["direction"]:
+            self._counts[entry["direction"]] -= 1
+            self._counts[direction] += 1
+            entry["direction"] = direction
+            self._dirty = True
+
+        # Stays set for the rest of the day once the stock trades through its 52-week range
+        if not entry["new_high"] and entry["high_52w"] and price > entry["high_52w"]:
+            entry["new_high"] = True
+            self.new_highs += 1
+            self._dirty = True
+        if not entry["new_low"] and entry["low_52w"] and price < entry["low_52w"]:
+            entry["new_low"] = True
+            self.new_lows += 1
+            self._dirty = True
+
+        self.last_update = time.time()
+        self.stats["ticks_applied"] += 1
+
+    def on_price_batch(self, batch: dict):
+        """PriceBatcher flush: {token: {symbol, ltp, ...}}"""
+        for data in batch.values():
+            symbol, ltp = data.get("symbol"), data.get("ltp")
+            if symbol and ltp:
+                self.update(clean_symbol(symbol), float(ltp))
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        advances, declines = self._counts[1], self._counts[-1]
+        return {
+            "advances": advances,
+            "declines": declines,
+            "unchanged": self._counts[0],
+            "total": len(self._entries),
+            "ad_ratio": round(advances / declines, 2) if declines else None,
+            "new_highs": self.new_highs,
+            "new_lows": self.new_lows,
+            "source": "live" if self.last_update else "stored",
+            "as_of": datetime.fromtimestamp(self.last_update).isoformat() if self.last_update else None,
+        }
+
+    def pop_update(self) -> Optional[dict]:
+        """Snapshot to push if the counters moved since the last push, throttled"""
+        now = time.time()
+        if not self._dirty or now - self._last_push < PUSH_INTERVAL_SECONDS:
+            return None
+        self._dirty = False
+        self._last_push = now
+        self.stats["pushes"] += 1
+        return self.snapshot()
+
+    def start(self, refresh_interval: int = REFRESH_INTERVAL_SECONDS):
+        """Background loop: initial seed, then periodic re-seeds as fundamentals are refreshed"""
+        async def loop():
+            while True:
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    print(f"[BREADTH] Refresh failed: {e}")
+                await asyncio.sleep(refresh_interval)
+
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(loop())
+
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "tracked": len(self._entries),
+            "last_refresh": self.last_refresh.isoformat() if self.last_refresh else None,
+        }
+
+
+# Global instance
+market_breadth = MarketBreadth()
@@ -11,6 +11,9 @@ import json
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from redis_config import redis_manager
+from chart_cache import chart_cache
+from sector_classification import sector_classification
+from market_breadth import market_breadth
 from angelone_service import get_stock_quote_angel_async
 import schedule
 import threading
@@ -188,6 +191,17 @@ class MarketDataCache:
     async def set_cached_data(self, cache_key: str, data: Any, ttl: int = 300) -> bool:
         return await self.set(cache_key, data, ttl)
 
+    def get_cache_metrics(self) -> Dict:
+        """Market data hit/miss metrics plus the chart cache tiers"""
+        return {
+            **self.metrics.get_stats(),
+            "chart_cache": chart_cache.get_cache_stats()
+        }
+
+    def reset_cache_metrics(self):
+        self.metrics.reset()
+        chart_cache.reset_stats()
+
     def _get_market_status(self) -> str:
         now = datetime.now()
         weekday = now.weekday()
@@ -259,19 +273,36 @@ class MarketDataCache:
             except Exception:
                 continue
                 
-        # Fill Sector Summary
+        # Fill Sector Summary - the live aggregates cover the whole universe, not just the sampled
+        # stocks, but only once today's ticks have moved them
+        if sector_classification.is_live:
+            snapshot["sector_summary"] = sector_classification.sector_summary()
         for sector, changes in sector_changes.items():
+            if sector in snapshot["sector_summary"]:
+                continue
             if changes:
                 snapshot["sector_summary"][sector] = {
                     "avg_change": round(sum(changes)/len(changes), 2),
                     "stock_count": len(changes)
                 }
 
-        snapshot["market_breadth"] = {
-            "gainers": gainers_count,
-            "losers": losers_count,
-            "unchanged": captured_count - gainers_count - losers_count
-        }
+        # Whole-universe counters once today's ticks have moved them, otherwise the sampled stocks
+        if market_breadth.is_live:
+            breadth = market_breadth.snapshot()
+            gainers_count, losers_count = breadth["advances"], breadth["declines"]
+            snapshot["market_breadth"] = {
+                "gainers": gainers_count,
+                "losers": losers_count,
+                "unchanged": breadth["unchanged"],
+                "new_highs": breadth["new_highs"],
+                "new_lows": breadth["new_lows"]
+            }
+        else:
+            snapshot["market_breadth"] = {
+                "gainers": gainers_count,
+                "losers": losers_count,
+                "unchanged": captured_count - gainers_count - losers_count
+            }
         
         snapshot["summary"]["market_sentiment"] = "Bullish" if gainers_count > losers_count else "Bearish"
 
@@ -281,8 +312,7 @@ class MarketDataCache:
         return snapshot
 
     def _get_stock_sector(self, symbol: str) -> str:
-        # Basic mapping - kept for consistency
-        return "Other" # Placeholder for brevity, real impl has map.
+        return sector_classification.sector_of(symbol)
 
     # Scheduling methods
     def schedule_daily_snapshot(self, snapshot_time: str = "15:45"):
@@ -1,5 +1,5 @@
 """
-Market Service Layer using Firebase and Redis
+Market Service Layer using the storage backend and Redis
 Replaces legacy DB service for market data operations.
 """
 
@@ -7,24 +7,23 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 import json
 import logging
-from firebase_config import get_firestore
+from storage_backend import get_storage, SERVER_TIMESTAMP
 from redis_config import redis_manager
 
 logger = logging.getLogger(__name__)
 
 class MarketService:
     """
-    Service layer for Market operations with Firebase (Persistence) and Redis (Cache/Realtime).
+    Service layer for Market operations with the storage backend (Persistence) and Redis (Cache/Realtime).
     """
     
     def __init__(self):
         self.redis = redis_manager
-        # FireStore client is retrieved lazily or on init if available
-        # We'll retrieve it in methods to ensure init order doesn't break
+        # Storage backend is retrieved lazily so init order doesn't matter
         pass
         
     def _get_db(self):
-        return get_firestore()
+        return get_storage()
 
     # ========================================================================
     # MARKET SNAPSHOTS
@@ -32,7 +31,7 @@ class MarketService:
     
     async def insert_market_snapshot(self, snapshot: dict) -> bool:
         """
-        Insert market snapshot into Firebase
+        Insert market snapshot into storage
         """
         try:
             db = self._get_db()
@@ -58,25 +57,15 @@ class MarketService:
             # Store in 'market_snapshots' collection
             # We might want to query by date.
             
-            snapshot['stored_at'] = firestore.SERVER_TIMESTAMP
+            snapshot['stored_at'] = SERVER_TIMESTAMP
             
-            # Use async/await if we had async firestore, but firebase-admin is sync blocking usually, 
-            # unless we use the async client (beta) or run in thread.
-            # For now, fastAPI handles creating threads for sync calls if not awaited, 
-            # but here we are in async methods. We should wrap in asyncio.to_thread if it blocks.
-            # BUT firebase-admin python is blocking.
+            await db.put_market_snapshot(doc_id, snapshot)
             
-            # Ideally we run this in a thread executor
-            import asyncio
-            await asyncio.to_thread(
-                db.collection("market_snapshots").document(doc_id).set, snapshot
-            )
-            
-            logger.info(f"[Firebase] Inserted market snapshot: {date_str}")
+            logger.info(f"[Storage] Inserted market snapshot: {date_str}")
             return True
             
         except Exception as e:
-            logger.error(f"[Firebase] Insert snapshot error: {e}")
+            logger.error(f"[Storage] Insert snapshot error: {e}")
             return False
 
     async def get_latest_snapshot(self, use_cache: bool = True) -> Optional[Dict]:
@@ -90,19 +79,8 @@ class MarketService:
                 if cached:
                     return json.loads(cached)
 
-            # 2. Fetch from Firebase
-            import asyncio
-            def fetch():
-                db = self._get_db()
-                docs = db.collection("market_snapshots")\
-                         .order_by("timestamp", direction=firestore.Query.DESCENDING)\
-                         .limit(1)\
-                         .stream()
-                for doc in docs:
-                    return doc.to_dict()
-                return None
-
-            snapshot = await asyncio.to_thread(fetch)
+            # 2. Fetch from storage
+            snapshot = await self._get_db().latest_market_snapshot()
             
             if snapshot and use_cache:
                 await self.redis.set("market_snapshot:latest", json.dumps(snapshot), ttl=300)
@@ -110,7 +88,7 @@ class MarketService:
             return snapshot
             
         except Exception as e:
-            logger.error(f"[Firebase] Get latest snapshot error: {e}")
+            logger.error(f"[Storage] Get latest snapshot error: {e}")
             return None
 
     async def get_snapshot_by_date(self, date: str, use_cache: bool = True) -> Optional[Dict]:
@@ -125,21 +103,8 @@ class MarketService:
                 if cached:
                     return json.loads(cached)
 
-            # 2. Fetch from Firebase
-            # We need to query where date == date
-            import asyncio
-            def fetch():
-                db = self._get_db()
-                docs = db.collection("market_snapshots")\
-                         .where("date", "==", date)\
-                         .order_by("timestamp", direction=firestore.Query.DESCENDING)\
-                         .limit(1)\
-                         .stream()
-                for doc in docs:
-                    return doc.to_dict()
-                return None
-
-            snapshot = await asyncio.to_thread(fetch)
+            # 2. Fetch from storage (latest snapshot taken on that date)
+            snapshot = await self._get_db().latest_market_snapshot(date)
             
             if snapshot and use_cache:
                 await self.redis.set(cache_key, json.dumps(snapshot), ttl=3600)
@@ -147,7 +112,7 @@ class MarketService:
             return snapshot
             
         except Exception as e:
-            logger.error(f"[Firebase] Get snapshot by date error: {e}")
+            logger.error(f"[Storage] Get snapshot by date error: {e}")
             return None
 
     async def get_snapshots_range(self, start_date: str, end_date: str) -> List[Dict]:
@@ -155,20 +120,10 @@ class MarketService:
         Get market snapshots for date range
         """
         try:
-            import asyncio
-            def fetch():
-                db = self._get_db()
-                docs = db.collection("market_snapshots")\
-                         .where("date", ">=", start_date)\
-                         .where("date", "<=", end_date)\
-                         .order_by("date", direction=firestore.Query.ASCENDING)\
-                         .stream()
-                return [doc.to_dict() for doc in docs]
-
-            return await asyncio.to_thread(fetch)
+            return await self._get_db().list_market_snapshots(start_date, end_date)
             
         except Exception as e:
-            logger.error(f"[Firebase] Get snapshots range error: {e}")
+            logger.error(f"[Storage] Get snapshots range error: {e}")
             return []
 
     # ========================================================================
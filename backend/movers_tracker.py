@@ -0,0 +1,132 @@
+"""
+Movers Tracker
+Top gainers/losers maintained from the live tick feed: two heaps keyed by
+percent change with lazy invalidation, so reads never poll quotes.
+"""
+
+import heapq
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+TOP_K = 5
+MIN_PRICE = 20.0  # Keep illiquid penny stocks from dominating the lists
+COMPACT_FACTOR = 4  # Rebuild the heaps once stale entries outnumber live ones this much
+LIVE_WINDOW_SECONDS = 120  # Without ticks for this long, /market/movers falls back to polling
+
+
+class MoversTracker:
+    """
+    Every update pushes a versioned entry onto both heaps; entries whose version
+    no longer matches the symbol's latest are discarded when they surface.
+    """
+
+    def __init__(self, top_k: int = TOP_K):
+        self.top_k = top_k
+        self._latest: Dict[str, dict] = {}      # symbol -> row (with "_version")
+        self._gainers: List[tuple] = []         # (-change_percent, version, symbol)
+        self._losers: List[tuple] = []          # (change_percent, version, symbol)
+        self._version = 0
+        self.last_update: Optional[float] = None
+        self.stats = {"updates": 0, "compactions": 0}
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    @property
+    def is_live(self) -> bool:
+        """Enough symbols tracked and ticks still flowing"""
+        return (
+            len(self._latest) >= 2 * self.top_k
+            and self.last_update is not None
+            and time.time() - self.last_update < LIVE_WINDOW_SECONDS
+        )
+
+    def update(self, symbol: str, price: float, change_percent: float, prev_close: float = 0,
+               volume: Optional[float] = None, name: Optional[str] = None):
+        """Record the latest quote for a symbol - O(log n)"""
+        if price < MIN_PRICE:
+            self._latest.pop(symbol, None)  # Heap entries go stale and are dropped lazily
+            return
+
+        previous = self._latest.get(symbol, {})
+        self._version += 1
+        self._latest[symbol] = {
+            "symbol": symbol,
+            "name": name or previous.get("name") or symbol,
+            "price": round(price, 2),
+            "change": round(price - prev_close, 2) if prev_close else previous.get("change", 0),
+            "changePercent": round(change_percent, 2),
+            "volume": volume if volume is not None else previous.get("volume", 0),
+            "exchange": "NSE",
+            "_version": self._version,
+        }
+        heapq.heappush(self._gainers, (-change_percent, self._version, symbol))
+        heapq.heappush(self._losers, (change_percent, self._version, symbol))
+        self.last_update = time.time()
+        self.stats["updates"] += 1
+
+        if len(self._gainers) > COMPACT_FACTOR * max(len(self._latest), 64):
+            self._compact()
+
+    def on_price_batch(self, batch: dict):
+        """PriceBatcher flush: {token: {symbol, ltp, volume?, ...}}"""
+        from sector_classification import sector_classification, clean_symbol
+
+        for data in batch.values():
+            symbol, ltp = data.get("symbol"), data.get("ltp")
+            if not symbol or not ltp:
+                continue
+            symbol = clean_symbol(symbol)
+            prev_close = sector_classification.reference_close(symbol)
+            if not prev_close:
+                continue
+            ltp = float(ltp)
+            self.update(symbol, ltp, (ltp / prev_close - 1) * 100, prev_close, data.get("volume"))
+
+    def _compact(self):
+        self._gainers = [(-row["changePercent"], row["_version"], s) for s, row in self._latest.items()]
+        self._losers = [(row["changePercent"], row["_version"], s) for s, row in self._latest.items()]
+        heapq.heapify(self._gainers)
+        heapq.heapify(self._losers)
+        self.stats["compactions"] += 1
+
+    def _top(self, heap: List[tuple], k: int, want_positive: bool) -> List[dict]:
+        """Pop until k live entries surface, discarding stale ones, then push the live ones back"""
+        live = []
+        while heap and len(live) < k:
+            entry = heapq.heappop(heap)
+            row = self._latest.get(entry[2])
+            if row is None or row["_version"] != entry[1]:
+                continue
+            live.append(entry)
+        for entry in live:
+            heapq.heappush(heap, entry)
+
+        rows = [{key: v for key, v in self._latest[e[2]].items() if key != "_version"} for e in live]
+        if want_positive:
+            return [r for r in rows if r["changePercent"] > 0]
+        return [r for r in rows if r["changePercent"] < 0]
+
+    def top(self, k: Optional[int] = None) -> dict:
+        """Same shape as get_equity_gainers_losers"""
+        k = k or self.top_k
+        return {
+            "gainers": self._top(self._gainers, k, True),
+            "losers": self._top(self._losers, k, False),
+            "total_fetched": len(self._latest),
+            "source": "live",
+            "as_of": datetime.fromtimestamp(self.last_update).isoformat() if self.last_update else None,
+        }
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "tracked": len(self._latest),
+            "heap_size": len(self._gainers),
+            "last_update": self.last_update,
+        }
+
+
+# Global instance
+movers_tracker = MoversTracker()
@@ -6,8 +6,9 @@ import asyncio
 import json
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any
-import aiohttp
 from models import NotificationPreference
+from expo_push import expo_push_client
+from push_receipts import push_receipts
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,7 +18,6 @@ class NotificationService:
     
     def __init__(self, storage=None):
         self.storage = storage
-        self.expo_push_url = "https://exp.host/--/api/v2/push/send"
         
     async def create_notification(
         self,
@@ -29,16 +29,7 @@ class NotificationService:
         priority: str = "normal"
     ) -> Dict:
         """Create a notification record"""
-        notification = {
-            "user_id": user_id,
-            "title": title,
-            "body": body,
-            "type": notification_type,  # news, alert, price_change, market_update
-            "data": data or {},
-            "priority": priority,  # low, normal, high
-            "read": False,
-            "created_at": datetime.now().isoformat(),
-        }
+        notification = self._notification_record(user_id, title, body, notification_type, data, priority)
         
         # Save to database
         if self.storage:
@@ -50,8 +41,28 @@ class NotificationService:
         
         return notification
     
-    async def send_push_notification(
-        self,
+    @staticmethod
+    def _notification_record(
+        user_id,
+        title: str,
+        body: str,
+        notification_type: str = "news",
+        data: Optional[Dict] = None,
+        priority: str = "normal"
+    ) -> Dict:
+        return {
+            "user_id": user_id,
+            "title": title,
+            "body": body,
+            "type": notification_type,  # news, alert, price_change, market_update
+            "data": data or {},
+            "priority": priority,  # low, normal, high
+            "read": False,
+            "created_at": datetime.now().isoformat(),
+        }
+    
+    @staticmethod
+    def _push_message(
         expo_push_token: str,
         title: str,
         body: str,
@@ -59,8 +70,6 @@ class NotificationService:
         sound: str = "default",
         badge: Optional[int] = None
     ) -> Dict:
-        """Send push notification via Expo Push Notification service"""
-        
         message = {
             "to": expo_push_token,
             "sound": sound,
@@ -70,25 +79,36 @@ class NotificationService:
             "priority": "high",
             "channelId": "stock-alerts"
         }
-        
         if badge is not None:
             message["badge"] = badge
+        return message
+    
+    async def send_push_notification(
+        self,
+        expo_push_token: str,
+        title: str,
+        body: str,
+        data: Optional[Dict] = None,
+        sound: str = "default",
+        badge: Optional[int] = None,
+        user_id: Optional[str] = None
+    ) -> Dict:
+        """Send push notification via Expo Push Notification service"""
+        
+        message = self._push_message(expo_push_token, title, body, data, sound, badge)
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.expo_push_url,
-                    json=message,
-                    headers={"Content-Type": "application/json"}
-                ) as response:
-                    result = await response.json()
-                    
-                    if response.status == 200:
-                        logger.info(f"Push notification sent successfully: {title}")
-                        return {"success": True, "result": result}
-                    else:
-                        logger.error(f"Push notification failed: {result}")
-                        return {"success": False, "error": result}
+            result = await expo_push_client.send([message])
+            ticket = result["tickets"][0]
+            # Receipt is checked later; user_id lets a dead token be removed from the user
+            push_receipts.track([(user_id, expo_push_token)], [ticket])
+            
+            if ticket.get("status") == "ok":
+                logger.info(f"Push notification sent successfully: {title}")
+                return {"success": True, "result": ticket}
+            else:
+                logger.error(f"Push notification failed: {ticket}")
+                return {"success": False, "error": ticket}
                         
         except Exception as e:
             logger.error(f"Push notification error: {e}")
@@ -127,6 +147,7 @@ class NotificationService:
                     push_token = user_prefs.get("expo_push_token")
                     if push_token:
                         await self.send_push_notification(
+                            user_id=user_id,
                             expo_push_token=push_token,
                             title="Market News",
                             body=news_item.get('headline', 'New market update'),
@@ -174,6 +195,7 @@ class NotificationService:
                     push_token = user_prefs.get("expo_push_token")
                     if push_token:
                         await self.send_push_notification(
+                            user_id=user_id,
                             expo_push_token=push_token,
                             title=title,
                             body=body,
@@ -186,6 +208,57 @@ class NotificationService:
         
         return notification
     
+    async def send_screen_alert(
+        self,
+        user_id: str,
+        screen_id: str,
+        screen_name: str,
+        entered: List[str],
+        left: List[str]
+    ) -> Dict:
+        """Send saved screen alert when stocks enter or leave a screen"""
+
+        parts = []
+        if entered:
+            parts.append(f"🔼 In: {', '.join(entered[:5])}" + (f" +{len(entered) - 5}" if len(entered) > 5 else ""))
+        if left:
+            parts.append(f"🔽 Out: {', '.join(left[:5])}" + (f" +{len(left) - 5}" if len(left) > 5 else ""))
+        title = f"🔎 {screen_name}"
+        body = " | ".join(parts)
+
+        # Create in-app notification
+        notification = await self.create_notification(
+            user_id=user_id,
+            title=title,
+            body=body,
+            notification_type="screen_alert",
+            priority="high",
+            data={
+                "screen_id": screen_id,
+                "entered": entered,
+                "left": left
+            }
+        )
+
+        # Send push notification
+        if self.storage:
+            try:
+                user_prefs = await self.storage.get_notification_preferences(user_id)
+                if user_prefs and user_prefs.get("alerts_enabled", True):
+                    push_token = user_prefs.get("expo_push_token")
+                    if push_token:
+                        await self.send_push_notification(
+                            user_id=user_id,
+                            expo_push_token=push_token,
+                            title=title,
+                            body=body,
+                            data={"type": "screen_alert", "screen_id": screen_id}
+                        )
+            except Exception as e:
+                logger.error(f"Failed to send push for screen alert: {e}")
+
+        return notification
+
     async def send_market_update(
         self,
         user_id: int,
@@ -217,6 +290,7 @@ class NotificationService:
                     push_token = user_prefs.get("expo_push_token")
                     if push_token:
                         await self.send_push_notification(
+                            user_id=user_id,
                             expo_push_token=push_token,
                             title=title,
                             body=body,
@@ -302,30 +376,47 @@ class NotificationService:
             return {"success": False, "error": "Storage not available"}
         
         try:
-            # Get all users with push notifications enabled
+            # Get all users with push notifications enabled (token and preferences are on the user)
             users = await self.storage.get_users_with_push_enabled()
+            recipients = [
+                user for user in users
+                if (user.get("notification_preferences") or {}).get("news_enabled", True)
+            ]
             
-            sent_count = 0
-            failed_count = 0
+            # 1. In-app inbox entries, written in bulk
+            title = f"📰 {news_item.get('headline', 'Market News')}"
+            body = news_item.get('summary', '')[:100] + "..."
+            data = {
+                "news_id": news_item.get("id"),
+                "url": news_item.get("url"),
+                "source": news_item.get("source"),
+                "image": news_item.get("image")
+            }
+            saved = await self.storage.save_notifications([
+                self._notification_record(user["id"], title, body, "news", data) for user in recipients
+            ])
             
-            for user in users:
-                try:
-                    await self.send_news_notification(
-                        user_id=user["id"],
-                        news_item=news_item,
-                        send_push=True
-                    )
-                    sent_count += 1
-                except Exception:
-                    failed_count += 1
-                
-                # Rate limiting
-                await asyncio.sleep(0.1)
+            # 2. Push: 100 messages per Expo request, batches sent concurrently under the rate budget
+            push = await expo_push_client.send([
+                self._push_message(
+                    user["expo_push_token"],
+                    "Market News",
+                    news_item.get('headline', 'New market update'),
+                    {"type": "news", "news_id": news_item.get("id")}
+                )
+                for user in recipients
+            ])
+            push_receipts.track([(user["id"], user["expo_push_token"]) for user in recipients], push["tickets"])
             
             return {
                 "success": True,
-                "sent": sent_count,
-                "failed": failed_count
+                "recipients": len(recipients),
+                "saved": saved,
+                "sent": push["ok"],
+                "failed": push["errors"],
+                "batches": push["batches"],
+                "seconds": push["seconds"],
+                "per_second": push["per_second"]
             }
             
         except Exception as e:
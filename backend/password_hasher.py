@@ -0,0 +1,122 @@
+"""
+Password Hasher
+bcrypt runs in a small dedicated process pool so hashing never blocks the event
+loop (and with it WebSocket price fan-out). Waiting work is capped: past the
+limit callers get HasherBusy instead of an ever-growing queue during login storms.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from passlib.context import CryptContext
+
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))  # Running + queued operations
+
+# Used inside the worker processes
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return pwd_context.verify(plain_password, hashed_password)
+    except (ValueError, TypeError):
+        return False  # Missing or malformed stored hash
+
+
+def _warm() -> bool:
+    return True
+
+
+class HasherBusy(Exception):
+    """Too many hashing operations already pending"""
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.stats = {
+            "submitted": 0, "completed": 0, "rejected": 0, "failed": 0, "pool_restarts": 0,
+            "max_pending": 0, "total_ms": 0.0, "max_ms": 0.0,
+        }
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking the server after its threads and event loop exist is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise HasherBusy(f"{self.pending} password operations pending")
+
+        self.pending += 1
+        self.stats["submitted"] += 1
+        self.stats["max_pending"] = max(self.stats["max_pending"], self.pending)
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            try:
+                result = await loop.run_in_executor(self._pool(), fn, *args)
+            except BrokenProcessPool:
+                # A worker died (OOM kill etc.): replace the pool and retry once
+                self.stats["pool_restarts"] += 1
+                self._executor = None
+                result = await loop.run_in_executor(self._pool(), fn, *args)
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self.pending -= 1
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats["completed"] += 1
+        self.stats["total_ms"] += elapsed
+        self.stats["max_ms"] = max(self.stats["max_ms"], elapsed)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, plain_password, hashed_password)
+
+    async def start(self):
+        """Spawn the workers now so the first login doesn't pay for process startup"""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._pool(), _warm) for _ in range(self.workers)))
+
+    def stop(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> dict:
+        completed = self.stats["completed"]
+        return {
+            **{k: v for k, v in self.stats.items() if k != "total_ms"},
+            "max_ms": round(self.stats["max_ms"], 1),
+            "avg_ms": round(self.stats["total_ms"] / completed, 1) if completed else 0.0,
+            "pending": self.pending,
+            "workers": self.workers,
+            "pending_limit": self.max_pending,
+        }
+
+
+# Global instance
+password_hasher = PasswordHasher()
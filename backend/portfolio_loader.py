@@ -0,0 +1,125 @@
+"""
+Portfolio Loader
+Request-scoped batched loading of watchlist quotes and fundamentals: every symbol
+is fetched once, concurrently under a shared bound, and the portfolio endpoints the
+app calls together (overview, stocks, analysis, signals, ai-summary) join the same
+fetches instead of each looping over the watchlist.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from angelone_service import get_stock_quote_angel_async
+from yahoo_service import get_stock_fundamentals
+
+LOADER_CONCURRENCY = 8  # Upstream calls in flight across all portfolio requests
+SHARE_TTL_SECONDS = 5   # Finished fetches stay joinable this long, covering the tab's parallel calls
+
+_semaphore = asyncio.Semaphore(LOADER_CONCURRENCY)
+# "quote:NSE:TCS" -> {"task", "done_at"}
+_shared: Dict[str, dict] = {}
+
+
+def _prune(now: float):
+    for key in [k for k, e in _shared.items() if e["done_at"] and now - e["done_at"] >= SHARE_TTL_SECONDS]:
+        _shared.pop(key, None)
+
+
+async def _shared_fetch(key: str, factory: Callable[[], Awaitable]):
+    """Join a running or just-finished fetch for key, otherwise start one"""
+    now = time.monotonic()
+    entry = _shared.get(key)
+    if entry is None or (entry["done_at"] and now - entry["done_at"] >= SHARE_TTL_SECONDS):
+        if len(_shared) > 1000:
+            _prune(now)
+
+        async def bounded():
+            async with _semaphore:
+                return await factory()
+
+        task = asyncio.ensure_future(bounded())
+        entry = {"task": task, "done_at": None}
+        _shared[key] = entry
+
+        def finished(t, entry=entry):
+            entry["done_at"] = time.monotonic()
+            # Failures are retried by the next caller rather than shared
+            if t.cancelled() or t.exception() is not None:
+                if _shared.get(key) is entry:
+                    del _shared[key]
+
+        task.add_done_callback(finished)
+
+    # Shield so one cancelled client doesn't cancel the fetch for everyone else
+    return await asyncio.shield(entry["task"])
+
+
+async def load_quote(symbol: str, exchange: str = "NSE") -> Optional[dict]:
+    return await _shared_fetch(
+        f"quote:{exchange}:{symbol}", lambda: get_stock_quote_angel_async(symbol, exchange)
+    )
+
+
+async def load_fundamentals(symbol: str, exchange: str = "NSE") -> Optional[dict]:
+    yahoo_symbol = f"{symbol}.NS" if exchange == "NSE" else f"{symbol}.BO"
+    return await _shared_fetch(f"fundamentals:{yahoo_symbol}", lambda: get_stock_fundamentals(yahoo_symbol))
+
+
+def stock_data_from(quote: Optional[dict], fundamentals: Optional[dict]) -> dict:
+    """The combined per-stock shape the portfolio helpers work on"""
+    return {
+        "quote": quote,
+        "fundamentals": fundamentals,
+        "pe_ratio": fundamentals.get("pe_ratio") if fundamentals else None,
+        "debt_equity": fundamentals.get("debt_to_equity") if fundamentals else None,
+        "roe": fundamentals.get("return_on_equity") if fundamentals else None,
+        "revenue_growth": fundamentals.get("revenue_growth") if fundamentals else None,
+    }
+
+
+class PortfolioLoader:
+    """
+    One per request: gathers the watchlist's symbols, and quotes / fundamentals
+    are each loaded at most once however many views of the portfolio are built.
+    """
+
+    def __init__(self, stocks: List[dict]):
+        self.stocks = stocks
+        self._quotes: Optional[asyncio.Task] = None
+        self._fundamentals: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def key(stock: dict) -> Tuple[str, str]:
+        return stock["symbol"].split('.')[0], stock.get("exchange", "NSE")
+
+    def _symbols(self) -> List[Tuple[str, str]]:
+        return list(dict.fromkeys(self.key(stock) for stock in self.stocks))
+
+    async def _gather(self, fetch: Callable, label: str) -> Dict[str, Optional[dict]]:
+        symbols = self._symbols()
+        fetched = await asyncio.gather(*(fetch(s, e) for s, e in symbols), return_exceptions=True)
+        results = {}
+        for (symbol, _), result in zip(symbols, fetched):
+            if isinstance(result, Exception):
+                print(f"[PORTFOLIO] {label} failed for {symbol}: {result}")
+                result = None
+            results[symbol] = result
+        return results
+
+    async def quotes(self) -> Dict[str, Optional[dict]]:
+        """symbol -> Angel One quote (None on failure)"""
+        if self._quotes is None:
+            self._quotes = asyncio.ensure_future(self._gather(load_quote, "Quote"))
+        return await self._quotes
+
+    async def fundamentals(self) -> Dict[str, Optional[dict]]:
+        """symbol -> Yahoo fundamentals (None on failure)"""
+        if self._fundamentals is None:
+            self._fundamentals = asyncio.ensure_future(self._gather(load_fundamentals, "Fundamentals"))
+        return await self._fundamentals
+
+    async def stock_data(self) -> Dict[str, dict]:
+        """symbol -> quote + fundamentals, both loaded concurrently"""
+        quotes, fundamentals = await asyncio.gather(self.quotes(), self.fundamentals())
+        return {symbol: stock_data_from(quotes.get(symbol), fundamentals.get(symbol)) for symbol in quotes}
@@ -0,0 +1,219 @@
+"""
+Portfolio Stream
+Live portfolio value and P&L for users connected over WebSocket. Each subscribed
+user keeps an in-memory holdings vector, and an inverted symbol -> users index
+routes every price delta only to the holdings it touches, so a flush costs
+O(touched holdings) regardless of how many users are connected.
+"""
+
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from dependencies import get_watchlist_collection
+from portfolio_loader import PortfolioLoader
+from sector_classification import sector_classification
+
+
+def _position_pct(position: dict) -> float:
+    prev_close = position["prev_close"]
+    return round((position["ltp"] / prev_close - 1) * 100, 2) if prev_close else 0.0
+
+
+class PortfolioStream:
+    """
+    Holdings are watchlist entries; `quantity` (default 1) and `avg_price`
+    (cost basis, optional) are read from the watchlist document when present.
+    """
+
+    def __init__(self):
+        self._portfolios: Dict[str, dict] = {}      # user_id -> {positions, totals}
+        self._symbol_users: Dict[str, Set[str]] = {}
+        self._refcounts: Dict[str, int] = {}          # Subscribed sockets per user
+        # Set by the server: async (user_id, message) -> None, delivers over WebSocket
+        self.on_event: Optional[Callable[[str, dict], Awaitable[None]]] = None
+        self.stats = {"subscriptions": 0, "ticks_routed": 0, "positions_touched": 0, "updates_sent": 0}
+
+    # ------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------
+
+    async def subscribe(self, user_id: str) -> dict:
+        """Register a socket for user_id; loads holdings on the first one. Returns the snapshot."""
+        self._refcounts[user_id] = self._refcounts.get(user_id, 0) + 1
+        self.stats["subscriptions"] += 1
+        if user_id not in self._portfolios:
+            await self.reload(user_id)
+        return self.snapshot(user_id)
+
+    def release(self, user_id: str):
+        """A subscribed socket went away; drop the holdings with the last one"""
+        remaining = self._refcounts.get(user_id, 0) - 1
+        if remaining > 0:
+            self._refcounts[user_id] = remaining
+            return
+        self._refcounts.pop(user_id, None)
+        self._unindex(user_id)
+
+    async def reload(self, user_id: str):
+        """(Re)build a user's holdings from the watchlist and current quotes"""
+        storage = get_watchlist_collection()
+        stocks = await storage.get_watchlist(int(user_id)) if storage else []
+        loader = PortfolioLoader(stocks or [])
+        quotes = await loader.quotes()
+
+        positions = {}
+        for stock in loader.stocks:
+            symbol, _ = PortfolioLoader.key(stock)
+            quote = quotes.get(symbol) or {}
+            ltp = float(quote.get("ltp") or 0)
+            prev_close = float(
+                sector_classification.reference_close(symbol)
+                or quote.get("previous_close") or quote.get("close") or ltp
+            )
+            positions[symbol] = {
+                "qty": float(stock.get("quantity") or 1),
+                "avg_price": float(stock["avg_price"]) if stock.get("avg_price") else None,
+                "ltp": ltp,
+                "prev_close": prev_close,
+            }
+
+        # Subscribers may have left while the watchlist was loading
+        if user_id not in self._refcounts:
+            return
+        self._unindex(user_id)
+        self._portfolios[user_id] = {"positions": positions, "totals": self._totals(positions)}
+        for symbol in positions:
+            self._symbol_users.setdefault(symbol, set()).add(user_id)
+
+    async def watchlist_changed(self, user_id: str):
+        """Watchlist edited over REST: rebuild a live user's holdings and push a fresh snapshot"""
+        if user_id not in self._refcounts:
+            return
+        try:
+            await self.reload(user_id)
+            snapshot = self.snapshot(user_id)
+            if snapshot and self.on_event:
+                await self.on_event(user_id, snapshot)
+        except Exception as e:
+            print(f"[PORTFOLIO STREAM] Reload failed for {user_id}: {e}")
+
+    def _unindex(self, user_id: str):
+        portfolio = self._portfolios.pop(user_id, None)
+        if not portfolio:
+            return
+        for symbol in portfolio["positions"]:
+            users = self._symbol_users.get(symbol)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self._symbol_users[symbol]
+
+    @staticmethod
+    def _totals(positions: Dict[str, dict]) -> dict:
+        """Full recompute, only on (re)load - ticks adjust these incrementally"""
+        totals = {"value": 0.0, "prev_value": 0.0, "cost": 0.0, "costed_value": 0.0}
+        for p in positions.values():
+            totals["value"] += p["qty"] * p["ltp"]
+            totals["prev_value"] += p["qty"] * p["prev_close"]
+            if p["avg_price"] is not None:
+                totals["cost"] += p["qty"] * p["avg_price"]
+                totals["costed_value"] += p["qty"] * p["ltp"]
+        return totals
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def on_price_batch(self, batch: dict) -> Dict[str, dict]:
+        """PriceBatcher flush -> {user_id: portfolio_update message} for users whose holdings moved"""
+        if not self._symbol_users:
+            return {}
+
+        touched: Dict[str, Dict[str, None]] = {}  # user -> moved symbols, insertion-ordered
+        for data in batch.values():
+            symbol, ltp = data.get("symbol"), data.get("ltp")
+            if not symbol or not ltp:
+                continue
+            symbol = symbol.replace("-EQ", "")
+            users = self._symbol_users.get(symbol)
+            if not users:
+                continue
+            ltp = float(ltp)
+            self.stats["ticks_routed"] += 1
+            for user_id in users:
+                portfolio = self._portfolios[user_id]
+                position = portfolio["positions"][symbol]
+                delta = position["qty"] * (ltp - position["ltp"])
+                if not delta:
+                    continue
+                totals = portfolio["totals"]
+                if not position["prev_close"]:
+                    # No quote at load time: the first tick becomes the day's reference
+                    position["prev_close"] = ltp
+                    totals["prev_value"] += position["qty"] * ltp
+                totals["value"] += delta
+                if position["avg_price"] is not None:
+                    totals["costed_value"] += delta
+                position["ltp"] = ltp
+                touched.setdefault(user_id, {})[symbol] = None
+                self.stats["positions_touched"] += 1
+
+        messages = {}
+        for user_id, symbols in touched.items():
+            positions = self._portfolios[user_id]["positions"]
+            messages[user_id] = {
+                "type": "portfolio_update",
+                **self._summary(user_id),
+                # [symbol, ltp, day change %] for the holdings that moved only
+                "positions": [[s, round(positions[s]["ltp"], 2), _position_pct(positions[s])] for s in symbols],
+            }
+        self.stats["updates_sent"] += len(messages)
+        return messages
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def _summary(self, user_id: str) -> dict:
+        totals = self._portfolios[user_id]["totals"]
+        day_change = totals["value"] - totals["prev_value"]
+        pnl = totals["costed_value"] - totals["cost"] if totals["cost"] else None
+        return {
+            "value": round(totals["value"], 2),
+            "day_change": round(day_change, 2),
+            "day_change_pct": round(day_change / totals["prev_value"] * 100, 2) if totals["prev_value"] else 0.0,
+            "pnl": round(pnl, 2) if pnl is not None else None,
+            "pnl_pct": round(pnl / totals["cost"] * 100, 2) if pnl is not None else None,
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    def snapshot(self, user_id: str) -> Optional[dict]:
+        portfolio = self._portfolios.get(user_id)
+        if portfolio is None:
+            return None
+        return {
+            "type": "portfolio_snapshot",
+            **self._summary(user_id),
+            "positions": [
+                {
+                    "symbol": symbol,
+                    "qty": p["qty"],
+                    "avg_price": p["avg_price"],
+                    "ltp": round(p["ltp"], 2),
+                    "prev_close": round(p["prev_close"], 2),
+                    "day_change_pct": _position_pct(p),
+                }
+                for symbol, p in portfolio["positions"].items()
+            ],
+        }
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "users": len(self._portfolios),
+            "indexed_symbols": len(self._symbol_users),
+        }
+
+
+# Global instance
+portfolio_stream = PortfolioStream()
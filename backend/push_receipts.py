@@ -0,0 +1,133 @@
+"""
+Push Receipts
+Expo accepts a push with a ticket; whether it reached the device is only known
+from the receipt, available ~15 minutes later. This poller keeps the ticket ids
+of every send, fetches their receipts in bulk, keeps delivery statistics, and
+removes tokens Expo reports as DeviceNotRegistered, and malformed tokens
+(in batched storage updates), so broadcasts only pay for live devices.
+
+Pending tickets are held in memory per process: a restart forgets at most the
+receipts not yet checked, and the next send to a dead token reports it again.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from expo_push import INVALID_TOKEN_ERROR, expo_push_client
+from user_service import user_service
+
+RECEIPT_DELAY_SECONDS = 15 * 60       # Expo: receipts are generally ready within 15 minutes
+RECEIPT_EXPIRY_SECONDS = 24 * 3600    # Expo keeps receipts for a day
+POLL_INTERVAL_SECONDS = 60
+MAX_PENDING = 200000
+# Errors that mean the token will never work again
+PRUNE_ERRORS = {"DeviceNotRegistered", INVALID_TOKEN_ERROR}
+
+
+class PushReceiptPoller:
+    def __init__(self):
+        self._pending: Dict[str, Tuple[float, str, str]] = {}   # ticket id -> (sent_at, user_id, token)
+        self._dead: Dict[str, str] = {}                          # user_id -> token awaiting removal
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "tickets": 0, "ticket_errors": 0, "receipts_ok": 0, "receipts_error": 0,
+            "expired": 0, "dropped": 0, "tokens_pruned": 0, "polls": 0,
+        }
+        self.errors: Dict[str, int] = {}  # Expo error code -> count (tickets and receipts)
+
+    # ------------------------------------------------------------------
+    # Collection
+    # ------------------------------------------------------------------
+
+    def _record_error(self, result: dict, user_id: Optional[str], token: str):
+        code = (result.get("details") or {}).get("error") or "Unknown"
+        self.errors[code] = self.errors.get(code, 0) + 1
+        if code in PRUNE_ERRORS and user_id:
+            self._dead[str(user_id)] = token
+
+    def track(self, recipients: List[Tuple[Optional[str], str]], tickets: List[dict]):
+        """Register a send: recipients[i] = (user_id, token) of the message tickets[i] answers"""
+        now = time.time()
+        for (user_id, token), ticket in zip(recipients, tickets):
+            if ticket.get("status") == "ok" and ticket.get("id"):
+                if user_id is None:
+                    continue  # Nothing to prune against
+                if len(self._pending) >= MAX_PENDING:
+                    self.stats["dropped"] += 1
+                    continue
+                self._pending[ticket["id"]] = (now, str(user_id), token)
+                self.stats["tickets"] += 1
+            else:
+                # Rejected at send time (e.g. a malformed or unregistered token)
+                self.stats["ticket_errors"] += 1
+                self._record_error(ticket, user_id, token)
+
+    # ------------------------------------------------------------------
+    # Polling
+    # ------------------------------------------------------------------
+
+    async def _prune(self) -> int:
+        if not self._dead:
+            return 0
+        dead, self._dead = list(self._dead.items()), {}
+        removed = await user_service.clear_push_tokens(dead)
+        self.stats["tokens_pruned"] += removed
+        print(f"[PUSH RECEIPTS] Removed {removed} unregistered or invalid push tokens")
+        return removed
+
+    async def poll_once(self) -> dict:
+        now = time.time()
+        for ticket_id in [t for t, (sent_at, _, _) in self._pending.items() if now - sent_at > RECEIPT_EXPIRY_SECONDS]:
+            del self._pending[ticket_id]
+            self.stats["expired"] += 1
+
+        due = [t for t, (sent_at, _, _) in self._pending.items() if now - sent_at >= RECEIPT_DELAY_SECONDS]
+        receipts = await expo_push_client.get_receipts(due) if due else {}
+        for ticket_id, receipt in receipts.items():
+            entry = self._pending.pop(ticket_id, None)
+            if entry is None:
+                continue
+            if receipt.get("status") == "ok":
+                self.stats["receipts_ok"] += 1
+            else:
+                self.stats["receipts_error"] += 1
+                self._record_error(receipt, entry[1], entry[2])
+
+        pruned = await self._prune()
+        self.stats["polls"] += 1
+        return {"due": len(due), "receipts": len(receipts), "pruned": pruned}
+
+    def start(self, interval: int = POLL_INTERVAL_SECONDS):
+        async def loop():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.poll_once()
+                except Exception as e:
+                    print(f"[PUSH RECEIPTS] Poll failed: {e}")
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        try:
+            await self._prune()  # Don't lose tokens already known dead
+        except Exception as e:
+            print(f"[PUSH RECEIPTS] Final prune failed: {e}")
+
+    def get_stats(self) -> dict:
+        checked = self.stats["receipts_ok"] + self.stats["receipts_error"]
+        return {
+            **self.stats,
+            "pending": len(self._pending),
+            "delivery_rate": round(self.stats["receipts_ok"] / checked, 4) if checked else None,
+            "errors": dict(self.errors),
+        }
+
+
+# Global instance
+push_receipts = PushReceiptPoller()
@@ -35,6 +35,7 @@ class QueryCache:
             "user_activity": 600,            # 10 minutes - analytics
             "stock_fundamentals": 86400,     # 24 hours - company data
             "continuous_aggregate": 1800,    # 30 minutes - pre-computed data
+            "screener_dsl": 86400,           # 24 hours - NL query -> DSL translations
         }
         
         # Track cache statistics
@@ -38,6 +38,7 @@ class ValidatedQuery(BaseModel):
     stock_symbols: List[str] = Field(default_factory=list)
     sector: Optional[str] = None
     time_frame: Optional[str] = None
+    screener_dsl: Optional[str] = None
     confidence: float = Field(ge=0.0, le=1.0, default=0.5)
     
     class Config:
@@ -100,12 +101,66 @@ SECTOR_SYNONYMS = {
     "realty": ["realty", "real estate", "property", "construction"],
 }
 
+# "it" is also an English word: only a sector in capitals ("IT") or followed by a sector noun
+AMBIGUOUS_SECTOR_KEYWORDS = {
+    "it": r'\bIT\b|(?i:\bit\s+(?:sector|stocks?|companies|company|shares|industry|services)\b)',
+}
+
+# Validated queries at or above this confidence skip the LLM (screener plans, symbol search)
+FAST_PATH_CONFIDENCE = 0.7
+
+# Negation and alternatives ("non banking", "except IT", "pe below 20 or roe above 15")
+# that the rule translation can't express; such queries go to the LLM
+COMPOUND_LOGIC_PATTERN = re.compile(
+    r'\b(?:or|nor|not|non|except|excluding|exclude|without|but|other than|apart from)\b'
+)
+# Operator phrases that contain "not" without negating the condition
+NEGATED_OPERATOR_PATTERN = re.compile(r'\bnot\s+(?:more|less)\s+than\b')
+
 TIME_FRAME_PATTERNS = {
     "short_term": ["today", "this week", "short term", "quick", "intraday", "day trading"],
     "medium_term": ["this month", "few months", "medium term", "swing", "3-6 months"],
     "long_term": ["long term", "years", "invest", "retirement", "wealth creation", "hold for long"],
 }
 
+# Screener DSL fields -> phrases users write for them
+SCREENER_FIELD_PATTERNS = {
+    "pe": ["pe ratio", "p/e ratio", "p/e", "pe"],
+    "pb": ["pb ratio", "p/b ratio", "p/b", "pb", "price to book"],
+    "roe": ["return on equity", "roe"],
+    "de": ["debt to equity", "debt/equity", "debt equity", "d/e"],
+    "market_cap": ["market capitalization", "market cap", "mcap"],
+    "dividend_yield": ["dividend yield"],
+    "revenue_growth": ["revenue growth", "sales growth"],
+    "beta": ["beta"],
+    "price": ["share price", "price"],
+}
+
+# Metric abbreviations users write in capitals ("PE below 20"): never tickers
+METRIC_WORDS = {
+    word for field, phrases in SCREENER_FIELD_PATTERNS.items() for word in (field, *phrases) if " " not in word
+} | {
+    "roce", "roa", "eps", "peg", "ebitda", "cagr", "ttm", "yoy", "qoq", "opm", "npm",
+    "rsi", "macd", "ema", "sma", "dma", "vwap", "atr", "fii", "dii",
+}
+
+SCREENER_OPERATOR_PATTERNS = [
+    ("<=", ["<=", "at most", "not more than"]),
+    (">=", [">=", "at least", "not less than"]),
+    ("<", ["<", "below", "under", "less than", "lower than", "within"]),
+    (">", [">", "above", "over", "greater than", "more than", "higher than", "exceeding"]),
+    ("==", ["=", "equal to"]),
+]
+
+SCREENER_SORT_PATTERNS = [
+    (["cheapest", "lowest pe", "undervalued"], "pe asc"),
+    (["top gainers", "best performing", "gainers"], "change_percent desc"),
+    (["top losers", "worst performing", "losers"], "change_percent asc"),
+    (["highest roe", "most profitable"], "roe desc"),
+    (["highest dividend", "high dividend"], "dividend_yield desc"),
+    (["largest", "biggest", "top", "large cap"], "market_cap desc"),
+]
+
 class QueryValidator:
     """Validates and normalizes user queries"""
     
@@ -142,7 +197,9 @@ class QueryValidator:
         # Extract explicit tickers (e.g., TCS, INFY-EQ)
         ticker_pattern = r'\b([A-Z]{2,}(?:-[A-Z]{2})?)\b'
         matches = re.findall(ticker_pattern, query)
-        symbols.extend(matches)
+        # "IT", "FMCG" etc. are sectors and "PE", "ROE" etc. metrics, not tickers
+        sector_words = {keyword for keywords in self.sector_synonyms.values() for keyword in keywords}
+        symbols.extend(match for match in matches if match.lower() not in sector_words | METRIC_WORDS)
         
         # Remove duplicates while preserving order
         seen = set()
@@ -203,11 +260,105 @@ class QueryValidator:
         query_lower = query.lower()
         
         for sector, keywords in self.sector_synonyms.items():
-            if any(keyword in query_lower for keyword in keywords):
-                return sector.upper()
+            for keyword in keywords:
+                if keyword in AMBIGUOUS_SECTOR_KEYWORDS:
+                    found = re.search(AMBIGUOUS_SECTOR_KEYWORDS[keyword], query)
+                else:
+                    # Word boundaries so "oil" doesn't match inside "toil"
+                    found = re.search(r'\b' + re.escape(keyword) + r'\b', query_lower)
+                if found:
+                    return sector.upper()
         
         return None
     
+    @staticmethod
+    def has_compound_logic(query: str) -> bool:
+        """Whether the query negates or offers alternatives ("non banking", "or", "except")"""
+        return bool(COMPOUND_LOGIC_PATTERN.search(NEGATED_OPERATOR_PATTERN.sub(" ", query.lower())))
+    
+    def to_screener_dsl(self, query: str, sector: Optional[str] = None, symbols: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Translate recognizable screening queries into screener DSL:
+        numeric conditions ("PE below 20 and ROE above 15% in IT"), a sector ("IT stocks"),
+        a symbol list ("compare TCS vs INFY") or a movers sort ("top gainers").
+        Returns None when the query is none of these, or negates / offers alternatives.
+        """
+        if self.has_compound_logic(query):
+            return None
+        
+        query_lower = query.lower()
+        
+        field_alt = "|".join(
+            re.escape(phrase)
+            for phrases in SCREENER_FIELD_PATTERNS.values() for phrase in sorted(phrases, key=len, reverse=True)
+        )
+        op_alt = "|".join(
+            re.escape(phrase)
+            for _, phrases in SCREENER_OPERATOR_PATTERNS for phrase in sorted(phrases, key=len, reverse=True)
+        )
+        number = r'(-?\d+(?:\.\d+)?)\s*(%|lakh crore|lakh cr|crore|cr)?'
+        
+        conditions = []
+        
+        # "pe between 10 and 20"
+        for match in re.finditer(rf'\b({field_alt})\s+(?:is\s+)?between\s+{number}\s+(?:and|to|-)\s+{number}', query_lower):
+            field = self._screener_field(match.group(1))
+            low = self._screener_value(match.group(2), match.group(3))
+            high = self._screener_value(match.group(4), match.group(5))
+            conditions.append(f"{field} between {low} and {high}")
+            query_lower = query_lower.replace(match.group(0), " ")
+        
+        # "pe below 20", "roe > 15%"
+        for match in re.finditer(rf'\b({field_alt})\s*(?:is\s+|of\s+)?({op_alt})\s*{number}', query_lower):
+            field = self._screener_field(match.group(1))
+            op = self._screener_operator(match.group(2))
+            value = self._screener_value(match.group(3), match.group(4))
+            conditions.append(f"{field} {op} {value}")
+        
+        if sector:
+            conditions.append(f"sector = {sector.lower()}")
+        
+        if not conditions and symbols and len(symbols) > 1:
+            conditions.append(f"symbol in ({', '.join(s.split('-')[0] for s in symbols)})")
+        
+        sort = next(
+            (sort for phrases, sort in SCREENER_SORT_PATTERNS
+             if any(re.search(r'\b' + re.escape(phrase) + r'\b', query_lower) for phrase in phrases)),
+            None
+        )
+        # A bare sort is only a screen for the movers lists; "top news" is not a market cap screen
+        if not conditions and not (sort and sort.startswith("change_percent")):
+            return None
+        
+        dsl = f"{' and '.join(conditions)} sort by {sort or 'market_cap desc'}".strip()
+        
+        limit_match = re.search(r'\btop\s+(\d{1,3})\b', query_lower)
+        if limit_match:
+            dsl += f" limit {limit_match.group(1)}"
+        
+        return dsl
+    
+    @staticmethod
+    def _screener_field(phrase: str) -> str:
+        for field, phrases in SCREENER_FIELD_PATTERNS.items():
+            if phrase in phrases:
+                return field
+        return phrase
+    
+    @staticmethod
+    def _screener_operator(phrase: str) -> str:
+        for op, phrases in SCREENER_OPERATOR_PATTERNS:
+            if phrase in phrases:
+                return op
+        return "=="
+    
+    @staticmethod
+    def _screener_value(number: str, unit: Optional[str]) -> str:
+        value = float(number)
+        if unit in ("lakh crore", "lakh cr"):
+            value *= 100000  # market_cap is in crore
+        return str(int(value)) if value.is_integer() else str(value)
+    
     def detect_time_frame(self, query: str) -> Optional[str]:
         """Detect time frame from query"""
         query_lower = query.lower()
@@ -218,7 +369,14 @@ class QueryValidator:
         
         return None
     
-    def calculate_confidence(self, query: str, symbols: List[str], intent: QueryIntent) -> float:
+    def calculate_confidence(
+        self,
+        query: str,
+        symbols: List[str],
+        intent: QueryIntent,
+        sector: Optional[str] = None,
+        screener_dsl: Optional[str] = None
+    ) -> float:
         """Calculate confidence score for validation"""
         confidence = 0.5
         
@@ -226,6 +384,12 @@ class QueryValidator:
         if symbols:
             confidence += 0.2
         
+        # Higher confidence for a recognized sector or screen
+        if sector:
+            confidence += 0.2
+        if screener_dsl:
+            confidence += 0.3
+        
         # Higher confidence for specific intents
         if intent in [QueryIntent.STOCK_ANALYSIS, QueryIntent.STOCK_COMPARISON]:
             confidence += 0.1
@@ -238,6 +402,10 @@ class QueryValidator:
         if any(word in query.lower() for word in ["should", "can", "what", "how", "why", "when"]):
             confidence += 0.1
         
+        # Symbols/sector found in "non banking" or "except IT" may be the ones excluded
+        if self.has_compound_logic(query):
+            confidence = min(confidence, FAST_PATH_CONFIDENCE - 0.1)
+        
         return max(0.0, min(1.0, confidence))
     
     def validate(self, query: str) -> ValidatedQuery:
@@ -252,11 +420,15 @@ class QueryValidator:
         symbols = self.extract_stock_symbols(query)
         intent = self.detect_intent(normalized, symbols)
         action = self.detect_action(normalized)
-        sector = self.detect_sector(normalized)
+        sector = self.detect_sector(query)
         time_frame = self.detect_time_frame(normalized)
         
+        screener_dsl = self.to_screener_dsl(
+            query, sector, symbols if intent == QueryIntent.STOCK_COMPARISON else None
+        )
+        
         # Calculate confidence
-        confidence = self.calculate_confidence(query, symbols, intent)
+        confidence = self.calculate_confidence(query, symbols, intent, sector, screener_dsl)
         
         return ValidatedQuery(
             original_query=query,
@@ -266,6 +438,7 @@ class QueryValidator:
             stock_symbols=symbols,
             sector=sector,
             time_frame=time_frame,
+            screener_dsl=screener_dsl,
             confidence=confidence
         )
 
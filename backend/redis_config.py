@@ -1,3 +1,4 @@
+import asyncio
 import os
 import redis.asyncio as redis
 import logging
@@ -7,6 +8,14 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Set hash fields only while ARGV[1] still holds ARGV[2] ("" = absent); ARGV[3] = TTL, then field/value pairs
+HSET_IF_SCRIPT = """
+if (redis.call('HGET', KEYS[1], ARGV[1]) or '') ~= ARGV[2] then return 0 end
+redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+if tonumber(ARGV[3]) > 0 then redis.call('EXPIRE', KEYS[1], ARGV[3]) end
+return 1
+"""
+
 class RedisManager:
     """
     Async Redis connection manager
@@ -92,6 +101,99 @@ class RedisManager:
             logger.error(f"Redis exists error for {key}: {e}")
             return False
 
+    async def hgetall(self, key: str) -> dict:
+        if not self.is_connected or not self.redis:
+            return {}
+        try:
+            return await self.redis.hgetall(key)
+        except Exception as e:
+            logger.error(f"Redis hgetall error for {key}: {e}")
+            return {}
+
+    async def hset(self, key: str, mapping: dict, ttl: int = None):
+        """Set hash fields (and refresh the key's TTL) in one round trip"""
+        if not self.is_connected or not self.redis or not mapping:
+            return False
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping=mapping)
+                if ttl:
+                    pipe.expire(key, ttl)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Redis hset error for {key}: {e}")
+            return False
+
+    async def hset_if(self, key: str, field: str, expected: str, mapping: dict, ttl: int = None) -> bool:
+        """hset, atomically skipped if `field` no longer holds `expected` ("" = absent)"""
+        if not self.is_connected or not self.redis or not mapping:
+            return False
+        try:
+            pairs = [part for item in mapping.items() for part in item]
+            return bool(await self.redis.eval(HSET_IF_SCRIPT, 1, key, field, expected or "", ttl or 0, *pairs))
+        except Exception as e:
+            logger.error(f"Redis hset_if error for {key}: {e}")
+            return False
+
+    async def hincrby(self, key: str, field: str, amount: int = 1, ttl: int = None):
+        """Increment a hash field (and refresh the key's TTL) in one round trip"""
+        if not self.is_connected or not self.redis:
+            return None
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hincrby(key, field, amount)
+                if ttl:
+                    pipe.expire(key, ttl)
+                return (await pipe.execute())[0]
+        except Exception as e:
+            logger.error(f"Redis hincrby error for {key}: {e}")
+            return None
+
+    async def hdel(self, key: str, *fields: str):
+        if not self.is_connected or not self.redis or not fields:
+            return False
+        try:
+            return await self.redis.hdel(key, *fields)
+        except Exception as e:
+            logger.error(f"Redis hdel error for {key}: {e}")
+            return False
+
+    async def publish(self, channel: str, message: str):
+        if not self.is_connected or not self.redis:
+            return 0
+        try:
+            return await self.redis.publish(channel, message)
+        except Exception as e:
+            logger.error(f"Redis publish error for {channel}: {e}")
+            return 0
+
+    async def listen(self, channel: str, handler):
+        """Call handler(data) for every message on channel until cancelled; reconnects on errors"""
+        while True:
+            if not self.is_connected or not self.redis:
+                await asyncio.sleep(5)
+                continue
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(channel)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        try:
+                            handler(message["data"])
+                        except Exception as e:
+                            logger.error(f"Redis handler error on {channel}: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis subscription error on {channel}: {e}")
+                await asyncio.sleep(5)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
     async def get_keys(self, pattern: str):
         if not self.is_connected or not self.redis:
             return []
@@ -0,0 +1,195 @@
+"""
+Risk Engine
+Portfolio risk from an aligned daily-returns matrix: volatility, beta against
+Nifty 50, correlation, historical VaR/CVaR and diversification ratio, computed
+with vectorized linear algebra and cached per watchlist.
+"""
+
+import asyncio
+import hashlib
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+BENCHMARK = "^NSEI"
+HISTORY_DAYS = 730         # Two years of daily candles (one Yahoo "2y" batch download)
+MIN_OBSERVATIONS = 60      # Holdings with a shorter aligned history are reported, not modelled
+MAX_FILL_DAYS = 3          # Forward-fill at most this many missing sessions (suspensions, holidays)
+TRADING_DAYS = 252
+VAR_LEVELS = (0.95, 0.99)
+TOP_PAIRS = 5
+RISK_CACHE_TTL = 6 * 3600  # Daily data; keyed by date too, so it turns over every session
+
+
+def watchlist_hash(symbols: List[str]) -> str:
+    return hashlib.md5(",".join(sorted(set(symbols))).encode()).hexdigest()[:12]
+
+
+def returns_matrix(series: Dict[str, list], benchmark: list) -> tuple:
+    """
+    Align daily closes on the benchmark's trading days.
+    Returns (symbols, R[T x N] simple returns, b[T] benchmark returns, dropped symbols).
+    """
+    def closes(candles: list) -> pd.Series:
+        if not candles:
+            return pd.Series(dtype=float)
+        times = pd.to_datetime([c["time"] for c in candles], unit="s", utc=True)
+        days = times.tz_convert("Asia/Kolkata").normalize().tz_localize(None)
+        s = pd.Series([c["close"] for c in candles], index=days, dtype=float)
+        return s[~s.index.duplicated(keep="last")]
+
+    bench = closes(benchmark)
+    frame = pd.DataFrame({symbol: closes(candles) for symbol, candles in series.items()})
+    frame = frame.reindex(bench.index).ffill(limit=MAX_FILL_DAYS)
+
+    prices = frame.to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = prices[1:] / prices[:-1] - 1
+        bench_returns = bench.to_numpy()[1:] / bench.to_numpy()[:-1] - 1
+
+    counts = np.isfinite(returns).sum(axis=0)
+    keep = counts >= MIN_OBSERVATIONS
+    symbols = [s for s, k in zip(frame.columns, keep) if k]
+    dropped = [s for s, k in zip(frame.columns, keep) if not k]
+    returns = returns[:, keep]
+
+    # Common window: sessions where every kept holding and the benchmark have a return
+    rows = np.isfinite(returns).all(axis=1) & np.isfinite(bench_returns)
+    return symbols, returns[rows], bench_returns[rows], dropped
+
+
+def compute_risk(symbols: List[str], returns: np.ndarray, bench: np.ndarray,
+                 weights: Optional[np.ndarray] = None) -> dict:
+    """All metrics from one returns matrix; equal weights unless given"""
+    n_obs, n = returns.shape
+    w = np.full(n, 1.0 / n) if weights is None else weights / weights.sum()
+    annual = np.sqrt(TRADING_DAYS)
+
+    centered = returns - returns.mean(axis=0)
+    bench_centered = bench - bench.mean()
+    cov = centered.T @ centered / (n_obs - 1)
+    sd = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = np.nan_to_num(cov / np.outer(sd, sd))
+    np.fill_diagonal(corr, 1.0)
+    betas = centered.T @ bench_centered / (bench_centered @ bench_centered)
+
+    portfolio = returns @ w
+    portfolio_sd = float(np.sqrt(w @ cov @ w))
+    bench_sd = float(bench.std(ddof=1))
+
+    var = {}
+    for level in VAR_LEVELS:
+        cutoff = np.quantile(portfolio, 1 - level)
+        tail = portfolio[portfolio <= cutoff]
+        var[f"{int(level * 100)}"] = {
+            "var_pct": round(float(-cutoff) * 100, 2),
+            "cvar_pct": round(float(-tail.mean()) * 100, 2) if len(tail) else None,
+        }
+
+    # Most correlated pairs from the upper triangle
+    pairs = []
+    if n > 1:
+        upper_i, upper_j = np.triu_indices(n, k=1)
+        upper = corr[upper_i, upper_j]
+        for k in np.argsort(upper)[::-1][:TOP_PAIRS]:
+            pairs.append({
+                "pair": [symbols[upper_i[k]], symbols[upper_j[k]]],
+                "correlation": round(float(upper[k]), 2),
+            })
+        avg_corr = float(upper.mean())
+    else:
+        avg_corr = None
+
+    cumulative = np.cumprod(1 + portfolio)
+    drawdown = cumulative / np.maximum.accumulate(cumulative) - 1
+
+    return {
+        "portfolio": {
+            "volatility_pct": round(portfolio_sd * annual * 100, 2),
+            "beta": round(float(w @ betas), 2),
+            "benchmark_volatility_pct": round(bench_sd * annual * 100, 2),
+            "var": var,
+            "diversification_ratio": round(float(w @ sd) / portfolio_sd, 2) if portfolio_sd else None,
+            "average_correlation": round(avg_corr, 2) if avg_corr is not None else None,
+            "max_drawdown_pct": round(float(drawdown.min()) * 100, 2),
+        },
+        "holdings": [
+            {
+                "symbol": symbol,
+                "weight": round(float(w[i]), 4),
+                "volatility_pct": round(float(sd[i]) * annual * 100, 2),
+                "beta": round(float(betas[i]), 2),
+                "average_correlation": round(float((corr[i].sum() - 1) / (n - 1)), 2) if n > 1 else None,
+            }
+            for i, symbol in enumerate(symbols)
+        ],
+        "correlation": {
+            "symbols": symbols,
+            "matrix": np.round(corr, 2).tolist(),
+            "high_correlation_pairs": pairs,
+        },
+        "observations": n_obs,
+    }
+
+
+class RiskEngine:
+    """Watchlist -> risk report, cached per (session date, watchlist hash)"""
+
+    def __init__(self):
+        self.stats = {"computed": 0, "cache_hits": 0, "last_compute_ms": 0.0}
+
+    async def analyze(self, symbols: List[str], force_refresh: bool = False) -> dict:
+        from market_cache import market_data_cache
+
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {"symbols": 0, "error": "Portfolio is empty"}
+
+        cache_key = f"risk:{datetime.now().date().isoformat()}:{watchlist_hash(symbols)}"
+        if not force_refresh:
+            cached = await market_data_cache.get(cache_key)
+            if cached:
+                self.stats["cache_hits"] += 1
+                return cached
+
+        # Lazy import: routers.candles owns the in-flight-deduplicated Yahoo batch download
+        from routers.candles import fetch_daily_candles_batch
+
+        series = await fetch_daily_candles_batch(symbols + [BENCHMARK], "1d", HISTORY_DAYS)
+        benchmark = series.pop(BENCHMARK, [])
+        if not benchmark:
+            return {"symbols": len(symbols), "error": "Benchmark history unavailable"}
+
+        report = await asyncio.to_thread(self._compute, series, benchmark)
+        report["generated_at"] = datetime.now().isoformat()
+        if report.get("portfolio"):
+            await market_data_cache.set(cache_key, report, ttl=RISK_CACHE_TTL)
+        return report
+
+    def _compute(self, series: Dict[str, list], benchmark: list) -> dict:
+        started = time.perf_counter()
+        symbols, returns, bench, dropped = returns_matrix(series, benchmark)
+        if not symbols or len(returns) < MIN_OBSERVATIONS:
+            return {"symbols": len(series), "insufficient_history": dropped or list(series),
+                    "error": "Not enough aligned price history"}
+
+        report = compute_risk(symbols, returns, bench)
+        report["insufficient_history"] = dropped
+        report["benchmark"] = BENCHMARK
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats["computed"] += 1
+        self.stats["last_compute_ms"] = round(elapsed, 2)
+        print(f"[RISK] {len(symbols)} holdings x {len(returns)} sessions in {elapsed:.1f}ms")
+        return report
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
+
+
+# Global instance
+risk_engine = RiskEngine()
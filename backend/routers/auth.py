@@ -4,9 +4,10 @@ from datetime import datetime, timedelta
 from typing import Optional
 from dependencies import (
     verify_password, get_password_hash, create_access_token, 
-    verify_token, get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES, _storage
+    verify_token, get_current_user, user_claims, ACCESS_TOKEN_EXPIRE_MINUTES, _storage
 )
 import dependencies as deps
+from password_hasher import HasherBusy
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -56,7 +57,7 @@ async def signup(user: UserSignup):
             )
         
         # Hash password and create user
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await get_password_hash(user.password)
         user_id = await _storage.create_user(
             email=user.email.strip().lower(),
             username=user.email.split('@')[0],  # Use email prefix as username
@@ -72,11 +73,12 @@ async def signup(user: UserSignup):
             )
         
         print(f"[SIGNUP] Successfully created user: {user.email}, ID: {user_id}")
+        await _storage.log_user_activity(str(user_id), "signup", {})
         
         # Create access token
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"user_id": str(user_id), "email": user.email.strip().lower()},
+            data=user_claims({"id": user_id, "email": user.email.strip().lower(), "full_name": user.name.strip()}),
             expires_delta=access_token_expires
         )
         
@@ -92,6 +94,13 @@ async def signup(user: UserSignup):
         }
     except HTTPException:
         raise
+    except HasherBusy as e:
+        print(f"[SIGNUP] Password hasher saturated: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts right now, please retry shortly",
+            headers={"Retry-After": "2"}
+        )
     except Exception as e:
         error_type = type(e).__name__
         error_msg = str(e)
@@ -133,7 +142,7 @@ async def login(user: UserLogin):
         print(f"[LOGIN] User found: {db_user['email']}, verifying password...")
         
         # Verify password
-        if not verify_password(user.password, db_user.get("password_hash", "")):
+        if not await verify_password(user.password, db_user.get("password_hash", "")):
             print(f"[LOGIN] Password verification failed for: {user.email}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -142,13 +151,14 @@ async def login(user: UserLogin):
         
         # Update last login
         await _storage.update_user(db_user["id"], {"last_login": datetime.utcnow()})
+        await _storage.log_user_activity(str(db_user["id"]), "login", {})
         
         print(f"[LOGIN] Login successful for: {user.email}")
         
         # Create access token
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"user_id": str(db_user["id"]), "email": db_user["email"]},
+            data=user_claims(db_user),
             expires_delta=access_token_expires
         )
         
@@ -164,6 +174,13 @@ async def login(user: UserLogin):
         }
     except HTTPException:
         raise
+    except HasherBusy as e:
+        print(f"[LOGIN] Password hasher saturated: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts right now, please retry shortly",
+            headers={"Retry-After": "2"}
+        )
     except Exception as e:
         error_type = type(e).__name__
         error_msg = str(e)
@@ -201,7 +218,14 @@ async def update_profile(user_update: UserUpdate, current_user: dict = Depends(g
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update profile")
              
-        return {"message": "Profile updated", "user": {**current_user, "name": user_update.name.strip()}}
+        # The old token's name claim is now stale; hand back one carrying the new name
+        user = {**current_user, "name": user_update.name.strip()}
+        access_token = create_access_token(
+            data=user_claims({"id": user["id"], "email": user["email"], "full_name": user["name"],
+                              "is_admin": user["role"] == "admin"}),
+            expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        )
+        return {"message": "Profile updated", "user": user, "access_token": access_token}
         
     except Exception as e:
         print(f"[PROFILE UPDATE ERROR] {e}")
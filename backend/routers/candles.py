@@ -1,11 +1,13 @@
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
-import time
-from datetime import datetime, timedelta
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Tuple
+import asyncio
+from datetime import datetime
 import pytz
-from yahoo_service import get_yahoo_history
+from yahoo_service import get_yahoo_history, get_yahoo_history_batch
 from angelone_service import get_stock_history_angel
 from chart_cache import chart_cache
+from indicators import indicator_service, SUPPORTED_INDICATORS
 
 router = APIRouter(prefix="/api/candles", tags=["candles"])
 
@@ -30,6 +32,21 @@ ANGEL_INTERVALS = {
     "1d": "ONE_DAY"
 }
 
+INTRADAY_INTERVALS = ["1m", "5m", "15m", "30m", "1h"]
+
+# Bulk endpoint limits
+MAX_BULK_SYMBOLS = 50
+BULK_CONCURRENCY = 5  # Parallel Angel One fetches per bulk request (history API is rate limited)
+
+# In-flight fetches keyed by symbol:interval:days - concurrent callers share one upstream request
+_inflight: Dict[str, asyncio.Future] = {}
+
+class BulkCandlesRequest(BaseModel):
+    symbols: List[str]
+    interval: str = "1d"
+    days: Optional[int] = None
+    limit: Optional[int] = None
+
 def convert_to_unix(candles: list, interval: str) -> list:
     """Convert candles to proper format with UNIX timestamps"""
     result = []
@@ -78,6 +95,196 @@ def filter_candles_before(candles: list, to_timestamp: int) -> list:
     """Filter candles to only include those before 'to' timestamp"""
     return [c for c in candles if c["time"] < to_timestamp]
 
+def resolve_fetch_days(interval: str, days: Optional[int] = None) -> int:
+    """Days of intraday history to request: manual override > auto-adjust defaults"""
+    if days:
+        return days
+    if interval in ["1m", "5m"]:
+        return 1  # 1 day for 1m and 5m
+    if interval == "15m":
+        return 7  # 7 days for 15m
+    if interval == "30m":
+        return 14  # 14 days for 30m
+    if interval == "1h":
+        return 28  # 28 days for 1h
+    return 30  # fallback
+
+def resolve_yahoo_period(interval: str, days: Optional[int] = None) -> str:
+    """Yahoo period for daily+ history: manual override > auto-adjust defaults"""
+    if days:
+        # Manual adjustment - convert days to period
+        if days > 1825:  # 5 years
+            return "max"
+        elif days > 730:  # 2 years
+            return "5y"
+        elif days > 365:  # 1 year
+            return "2y"
+        elif days > 180:
+            return "1y"
+        elif days > 90:
+            return "6mo"
+        elif days > 30:
+            return "1mo"
+        elif days > 7:
+            return "1mo"
+        elif days > 1:
+            return "5d"
+        return "1d"
+    if interval == "1d":
+        return "1y"  # 9 months ≈ 1 year
+    if interval == "1w":
+        return "2y"  # 2 years
+    return "max"  # 1mo
+
+def _inflight_key(symbol: str, interval: str, days: Optional[int]) -> str:
+    return f"{symbol}:{interval}:{days}"
+
+async def fetch_candles(symbol: str, interval: str, days: Optional[int] = None) -> list:
+    """
+    Fetch a full candle series (UNIX seconds, ascending) from the right source.
+    Concurrent calls for the same series are coalesced into one upstream fetch.
+    """
+    key = _inflight_key(symbol, interval, days)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_candles_from_source(symbol, interval, days))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        print(f"[CANDLES] Joining in-flight fetch: {key}")
+    
+    # Shield so one cancelled client doesn't cancel the fetch for everyone else
+    return await asyncio.shield(task)
+
+async def _fetch_candles_from_source(symbol: str, interval: str, days: Optional[int] = None) -> list:
+    """
+    Angel One for intraday, Yahoo Finance for daily and above.
+    """
+    is_intraday = interval in INTRADAY_INTERVALS
+    
+    if is_intraday:
+        # Use Angel One for intraday
+        print(f"[CANDLES] Fetching intraday data from Angel One: {symbol} {interval}")
+        angel_interval = ANGEL_INTERVALS.get(interval, "ONE_MINUTE")
+        fetch_days = resolve_fetch_days(interval, days)
+        
+        raw_candles = await get_stock_history_angel(symbol, days=fetch_days, interval=angel_interval)
+        print(f"[CANDLES] AngelOne returned {len(raw_candles)} raw candles")
+    else:
+        # Use Yahoo Finance for daily+
+        print(f"[CANDLES] Fetching daily data from Yahoo: {symbol} {interval}")
+        yahoo_interval = YAHOO_INTERVALS.get(interval, "1d")
+        period = resolve_yahoo_period(interval, days)
+        
+        raw_candles = await get_yahoo_history(symbol, period=period, interval=yahoo_interval)
+        print(f"[CANDLES] Yahoo returned {len(raw_candles)} raw candles")
+    
+    candles = convert_to_unix(raw_candles, interval)
+    print(f"[CANDLES] Converted to {len(candles)} unix candles")
+    return candles
+
+async def get_chart_candles(symbol: str, interval: str) -> list:
+    """Full default-range chart, served from the chart cache when possible"""
+    cached_data = await chart_cache.get_cached_chart(symbol, interval)
+    if cached_data:
+        return cached_data
+    candles = await fetch_candles(symbol, interval)
+    if candles:
+        await chart_cache.set_cached_chart(symbol, interval, candles)
+    return candles
+
+async def fetch_daily_candles_batch(symbols: List[str], interval: str, days: Optional[int] = None) -> Dict[str, list]:
+    """
+    Daily+ candles for many symbols via one Yahoo multi-ticker download.
+    Symbols already being fetched elsewhere are joined instead of re-downloaded,
+    and the symbols downloaded here are registered so other callers can join them.
+    """
+    loop = asyncio.get_running_loop()
+    joined = {}
+    owned = {}
+    for symbol in symbols:
+        key = _inflight_key(symbol, interval, days)
+        if key in _inflight:
+            joined[symbol] = _inflight[key]
+        else:
+            owned[symbol] = _inflight[key] = loop.create_future()
+    
+    results = {}
+    try:
+        if owned:
+            yahoo_interval = YAHOO_INTERVALS.get(interval, "1d")
+            period = resolve_yahoo_period(interval, days)
+            raw = await get_yahoo_history_batch(list(owned), period=period, interval=yahoo_interval)
+            for symbol, future in owned.items():
+                results[symbol] = convert_to_unix(raw.get(symbol, []), interval)
+                future.set_result(results[symbol])
+    except Exception as e:
+        for future in owned.values():
+            if not future.done():
+                future.set_exception(e)
+                future.exception()  # Mark retrieved; joiners still receive it
+        raise
+    finally:
+        for symbol, future in owned.items():
+            _inflight.pop(_inflight_key(symbol, interval, days), None)
+            if not future.done():
+                # This request was cancelled mid-download: fail joiners instead of leaving them waiting
+                future.set_exception(RuntimeError(f"Candle fetch for {symbol} was cancelled"))
+                future.exception()
+    
+    for symbol, future in joined.items():
+        results[symbol] = await asyncio.shield(future)
+    
+    return results
+
+async def fetch_candles_many(symbols: List[str], interval: str, days: Optional[int] = None) -> Tuple[Dict[str, list], Dict[str, str]]:
+    """
+    Candles for many symbols: one Yahoo batch for daily+, bounded Angel One
+    fan-out for intraday. Returns ({symbol: candles}, {symbol: error}).
+    """
+    series: Dict[str, list] = {}
+    errors: Dict[str, str] = {}
+    
+    if interval in INTRADAY_INTERVALS:
+        semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+        
+        async def fetch_one(symbol: str):
+            async with semaphore:
+                return await fetch_candles(symbol, interval, days)
+        
+        fetched = await asyncio.gather(*(fetch_one(symbol) for symbol in symbols), return_exceptions=True)
+        for symbol, result in zip(symbols, fetched):
+            if isinstance(result, Exception):
+                print(f"[CANDLES] Bulk fetch failed for {symbol}: {result}")
+                errors[symbol] = str(result)
+            else:
+                series[symbol] = result
+    else:
+        try:
+            series.update(await fetch_daily_candles_batch(symbols, interval, days))
+        except Exception as e:
+            print(f"[CANDLES ERROR] Bulk daily fetch failed: {e}")
+            for symbol in symbols:
+                errors[symbol] = str(e)
+    
+    return series, errors
+
+async def refresh_charts(symbols: List[str], interval: str) -> Dict[str, list]:
+    """Batch fetch used by the chart cache refresh scheduler"""
+    series, _ = await fetch_candles_many(symbols, interval)
+    return series
+
+def to_columnar(candles: list) -> dict:
+    """Compact column-per-field form of a candle list: {"t": [...], "o": [...], ...}"""
+    return {
+        "t": [c["time"] for c in candles],
+        "o": [c["open"] for c in candles],
+        "h": [c["high"] for c in candles],
+        "l": [c["low"] for c in candles],
+        "c": [c["close"] for c in candles],
+        "v": [c["volume"] for c in candles]
+    }
+
 @router.get("/")
 async def get_candles(
     symbol: str,
@@ -107,79 +314,17 @@ async def get_candles(
     """
     
     try:
-        # Check cache first for instant loading
-        cached_data = chart_cache.get_cached_chart(symbol, interval)
-        if cached_data and not to and not limit:  # Only use cache for full chart requests
-            print(f"[CANDLES] Serving from cache: {symbol} {interval}")
-            return cached_data
-        
-        # Determine data source based on interval
-        is_intraday = interval in ["1m", "5m", "15m", "30m", "1h"]
+        # Check cache first for instant loading - only for full default-range chart requests
+        is_full_chart = not to and not limit and not days
+        if is_full_chart:
+            cached_data = await chart_cache.get_cached_chart(symbol, interval)
+            if cached_data:
+                print(f"[CANDLES] Serving from cache: {symbol} {interval}")
+                return cached_data
         
-        candles = []
-        
-        if is_intraday:
-            # Use Angel One for intraday
-            print(f"[CANDLES] Fetching intraday data from Angel One: {symbol} {interval}")
-            angel_interval = ANGEL_INTERVALS.get(interval, "ONE_MINUTE")
-            
-            # Determine days: manual override > auto-adjust defaults
-            if days:
-                # Manual adjustment
-                fetch_days = days
-            elif interval in ["1m", "5m"]:
-                fetch_days = 1  # 1 day for 1m and 5m
-            elif interval == "15m":
-                fetch_days = 7  # 7 days for 15m
-            elif interval == "30m":
-                fetch_days = 14  # 14 days for 30m
-            elif interval == "1h":
-                fetch_days = 28  # 28 days for 1h
-            else:
-                fetch_days = 30  # fallback
-            
-            raw_candles = await get_stock_history_angel(symbol, days=fetch_days, interval=angel_interval)
-            print(f"[CANDLES] AngelOne returned {len(raw_candles)} raw candles")
-            candles = convert_to_unix(raw_candles, interval)
-            print(f"[CANDLES] Converted to {len(candles)} unix candles")
-            
-        else:
-            # Use Yahoo Finance for daily+
-            print(f"[CANDLES] Fetching daily data from Yahoo: {symbol} {interval}")
-            yahoo_interval = YAHOO_INTERVALS.get(interval, "1d")
-            
-            # Determine period: manual override > auto-adjust defaults
-            if days:
-                # Manual adjustment - convert days to period
-                if days > 1825:  # 5 years
-                    period = "max"
-                elif days > 730:  # 2 years
-                    period = "5y"
-                elif days > 365:  # 1 year
-                    period = "2y"
-                elif days > 180:
-                    period = "1y"
-                elif days > 90:
-                    period = "6mo"
-                elif days > 30:
-                    period = "1mo"
-                elif days > 7:
-                    period = "1mo"
-                elif days > 1:
-                    period = "5d"
-                else:
-                    period = "1d"
-            elif interval == "1d":
-                period = "1y"  # 9 months ≈ 1 year
-            elif interval == "1w":
-                period = "2y"  # 2 years
-            else:  # 1mo
-                period = "max"
-            
-            raw_candles = await get_yahoo_history(symbol, period=period, interval=yahoo_interval)
-            print(f"[CANDLES] Yahoo returned {len(raw_candles)} raw candles")
-            candles = convert_to_unix(raw_candles, interval)
-            print(f"[CANDLES] Converted to {len(candles)} unix candles")
+        candles = await fetch_candles(symbol, interval, days)
+        if is_full_chart and candles:
+            await chart_cache.set_cached_chart(symbol, interval, candles)
         
         # Apply 'to' filter if provided
         if to:
@@ -201,3 +346,102 @@ async def get_candles(
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to fetch candles: {str(e)}")
+
+@router.get("/indicators")
+async def get_candle_indicators(
+    symbol: str,
+    interval: str = Query("1d", description="1m, 5m, 15m, 30m, 1h, 1d, 1w, 1mo"),
+    indicators: Optional[str] = Query(None, description="Comma separated: sma, ema, rsi, macd, bollinger, atr, vwap (default: all)"),
+    limit: Optional[int] = Query(None, description="Number of most recent rows to return")
+):
+    """
+    Get technical indicators for a symbol's candle series
+    
+    - Response is columnar: {"time": [...], "rsi_14": [...], ...}
+    - Warm-up values (not enough bars yet) are null
+    - Repeat requests only process bars added since the last call
+    """
+    requested = None
+    if indicators:
+        requested = [name.strip().lower() for name in indicators.split(",") if name.strip()]
+        unknown = [name for name in requested if name not in SUPPORTED_INDICATORS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported indicators: {', '.join(unknown)}. Must be one of: {', '.join(SUPPORTED_INDICATORS)}"
+            )
+    
+    try:
+        series = await indicator_service.get_indicators(
+            symbol, interval, get_chart_candles, indicators=requested, limit=limit
+        )
+        return {
+            "symbol": symbol,
+            "interval": interval,
+            "indicators": series,
+            "latest": indicator_service.latest(series)
+        }
+    except Exception as e:
+        print(f"[INDICATORS ERROR] {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to compute indicators: {str(e)}")
+
+@router.post("/bulk")
+async def get_bulk_candles(request: BulkCandlesRequest):
+    """
+    Get candles for many symbols (watchlist sparklines, portfolio mini-charts) in one round trip
+    
+    - Same interval/days/limit semantics as GET /api/candles
+    - Daily+ intervals use a single Yahoo multi-ticker download
+    - Intraday intervals fan out to Angel One, at most BULK_CONCURRENCY at a time
+    - Response is columnar per symbol: {"t": [...], "o": [...], "h": [...], "l": [...], "c": [...], "v": [...]}
+    - Symbols that fail are listed in "errors" and don't fail the whole request
+    """
+    symbols = list(dict.fromkeys(s.strip() for s in request.symbols if s and s.strip()))
+    interval = request.interval
+    
+    if not symbols:
+        raise HTTPException(status_code=400, detail="At least one symbol is required")
+    if len(symbols) > MAX_BULK_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"Maximum {MAX_BULK_SYMBOLS} symbols per request")
+    if interval not in YAHOO_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Invalid interval. Must be one of: {', '.join(YAHOO_INTERVALS)}")
+    
+    series: Dict[str, list] = {}
+    errors: Dict[str, str] = {}
+    
+    # Full default-range charts can come straight from the chart cache
+    pending = symbols
+    if not request.days:
+        cached = await asyncio.gather(*(chart_cache.get_cached_chart(symbol, interval) for symbol in symbols))
+        pending = []
+        for symbol, cached_data in zip(symbols, cached):
+            if cached_data:
+                series[symbol] = cached_data
+            else:
+                pending.append(symbol)
+    
+    if pending:
+        print(f"[CANDLES] Bulk {interval}: {len(series)} cached, fetching {len(pending)}")
+        fetched, errors = await fetch_candles_many(pending, interval, request.days)
+        series.update(fetched)
+        if not request.days:
+            await asyncio.gather(*(
+                chart_cache.set_cached_chart(symbol, interval, candles)
+                for symbol, candles in fetched.items() if candles
+            ))
+    
+    data = {}
+    for symbol in symbols:
+        if symbol not in series:
+            continue
+        candles = series[symbol]
+        if request.limit and len(candles) > request.limit:
+            candles = candles[-request.limit:]
+        data[symbol] = to_columnar(candles)
+    
+    return {
+        "interval": interval,
+        "count": len(data),
+        "data": data,
+        "errors": errors
+    }
@@ -16,6 +16,10 @@ from yahoo_service import get_stock_fundamentals
 from finnhub_service import finnhub_service
 # from market_cache import market_data_cache
 from market_cache import market_data_cache
+from sector_classification import sector_classification
+from movers_tracker import movers_tracker
+from market_breadth import market_breadth
+from portfolio_stream import portfolio_stream
 import random
 
 router = APIRouter(prefix="/api", tags=["market"])
@@ -235,6 +239,10 @@ async def get_market_events():
 async def get_market_movers(force_refresh: bool = Query(False, description="Force refresh cache")):
     """Get top gainers and losers from Indian stock market with caching"""
     try:
+        # Maintained from the live tick feed whenever ticks are flowing
+        if movers_tracker.is_live:
+            return movers_tracker.top()
+        
         # Check cache first
         if not force_refresh:
             cached_movers = await market_data_cache.get_movers()
@@ -264,6 +272,23 @@ async def get_market_movers(force_refresh: bool = Query(False, description="Forc
         return {"gainers": [], "losers": []}
 
 
+@router.get("/market/sectors/heatmap")
+async def get_sector_heatmap():
+    """Sector tiles (avg change, breadth, turnover, best/worst stock) from live sector aggregates"""
+    return {
+        "sectors": sector_classification.heatmap(),
+        "classified_stocks": sector_classification.size,
+        "last_refresh": sector_classification.last_refresh.isoformat() if sector_classification.last_refresh else None,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/market/breadth")
+async def get_market_breadth():
+    """Advance/decline counts and new 52-week highs/lows across the NSE equity universe"""
+    return market_breadth.snapshot()
+
+
 # --- Derivatives Market Data Endpoints ---
 
 @router.post("/market/derivatives/gainers-losers")
@@ -482,6 +507,8 @@ async def add_to_watchlist(item: WatchlistItem, user: dict = Depends(get_current
         # Add to storage (handles duplicates via ON CONFLICT)
         success = await storage.add_to_watchlist(user_id, item.symbol, item.exchange)
         if success:
+            await storage.log_user_activity(str(user_id), "watchlist_add", {"symbol": item.symbol, "exchange": item.exchange})
+            await portfolio_stream.watchlist_changed(str(user_id))
             return {"message": f"Added {item.symbol}"}
         else:
              return {"message": "Failed to add (or already exists)"}
@@ -504,6 +531,8 @@ async def remove_from_watchlist(symbol: str, user: dict = Depends(get_current_us
         success = await storage.remove_from_watchlist(user_id, symbol)
         
         if success:
+             await storage.log_user_activity(str(user_id), "watchlist_remove", {"symbol": symbol})
+             await portfolio_stream.watchlist_changed(str(user_id))
              return {"message": f"Removed {symbol}"}
         else:
              return {"message": "Stock not found or failed to remove"}
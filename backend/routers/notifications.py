@@ -7,6 +7,7 @@ from typing import List, Optional
 from pydantic import BaseModel
 from dependencies import get_current_user
 from notification_service import notification_service
+from expo_push import is_valid_push_token
 import logging
 
 logger = logging.getLogger(__name__)
@@ -37,6 +38,9 @@ async def register_push_token(
     current_user = Depends(get_current_user)
 ):
     """Register user's Expo push notification token"""
+    if not is_valid_push_token(request.expo_push_token):
+        raise HTTPException(status_code=400, detail="Invalid Expo push token")
+    
     try:
         success = await notification_service.save_push_token(
             user_id=current_user["id"],
@@ -186,6 +190,7 @@ async def send_test_notification(
             )
             if user_prefs and user_prefs.get("expo_push_token"):
                 push_result = await notification_service.send_push_notification(
+                    user_id=current_user["id"],
                     expo_push_token=user_prefs["expo_push_token"],
                     title=request.title,
                     body=request.body,
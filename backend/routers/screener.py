@@ -1,10 +1,19 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
 from pydantic import BaseModel
 import os
+import re
 import json
+import asyncio
+from typing import Tuple
 from gemini_service import gemini_service
 from yahoo_service import get_stock_fundamentals, get_yahoo_history
 from angelone_service import search_stocks
+from screening_engine import screening_engine, NUMERIC_FIELDS
+from screener_dsl import compile_dsl, plan_cache, DSLError, QueryPlan
+from query_validator import query_validator, FAST_PATH_CONFIDENCE
+from query_cache import query_cache
+from saved_screens import saved_screen_service
+from dependencies import get_current_user
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,11 +23,220 @@ router = APIRouter(prefix="/api/screener", tags=["screener"])
 class ScreenerQuery(BaseModel):
     query: str
 
+class SavedScreenRequest(BaseModel):
+    name: str = ""
+    query: str  # Screener DSL or natural language
+    notify: bool = True
+
+DSL_PROMPT = """Convert this Indian stock screener query into screener DSL.
+Query: {query}
+
+DSL grammar:
+  <field> <op> <number>            ops: < <= > >= == !=
+  <field> between <number> and <number>
+  sector = <sector> | sector in (<sector>, ...)
+  symbol in (<SYMBOL>, ...)
+  combine with and / or / not and parentheses
+  optional suffix: sort by <field> asc|desc limit <n>
+
+Fields: {fields}
+(pe = P/E ratio, pb = P/B ratio, roe = ROE in %, de = debt/equity ratio,
+market_cap in ₹ crore, change_percent = today's % change, dividend_yield in %,
+pct_from_high / pct_from_low = % distance from 52 week high / low)
+Sectors: it, banking, finance, pharma, auto, fmcg, energy, metals, realty
+
+Example: "profitable IT companies that aren't expensive"
+-> pe < 25 and roe > 15 and sector = it sort by market_cap desc limit 20
+
+Return ONLY a JSON object with this format:
+{{
+    "dsl": "pe < 20 and roe > 15 and sector = it sort by market_cap desc",
+    "intent": "fundamental_screen",
+    "criteria": "IT stocks with P/E below 20 and ROE above 15%"
+}}"""
+
+# Filler words dropped when matching near-identical queries in the DSL cache
+QUERY_FILLER_WORDS = {
+    "show", "me", "find", "list", "get", "give", "all", "the", "please", "stocks", "stock",
+    "companies", "company", "shares", "with", "having", "that", "have", "which", "are", "a", "an"
+}
+
+def _parse_json_response(response: str) -> dict:
+    """LLM JSON, tolerating markdown code fences"""
+    text = response.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.lower().startswith("json"):
+            text = text[4:]
+    return json.loads(text)
+
+def _query_cache_key(query: str) -> str:
+    """Normalized natural-language query, so near-identical screens share a cached DSL"""
+    words = re.findall(r"[a-z0-9<>=!./%&]+", query_validator.normalize_query(query))
+    return " ".join(word for word in words if word not in QUERY_FILLER_WORDS)
+
+def translate_query_with_ai(query: str) -> dict:
+    """Ask the AI to turn a natural-language query into screener DSL"""
+    response = gemini_service.chat(DSL_PROMPT.format(query=query, fields=", ".join(NUMERIC_FIELDS)))
+    parsed = _parse_json_response(response)
+    if not parsed.get("dsl"):
+        raise DSLError("AI returned no DSL")
+    return {
+        "dsl": parsed["dsl"],
+        "intent": parsed.get("intent", "general"),
+        "criteria": parsed.get("criteria", query)
+    }
+
+async def resolve_query_plan(query: str) -> Tuple[QueryPlan, dict]:
+    """
+    Query text -> compiled plan, cheapest source first:
+    1. the text is already DSL
+    2. query_validator recognizes the screen with confidence >= FAST_PATH_CONFIDENCE
+    3. DSL cached for a near-identical query
+    4. AI translation (result cached)
+    """
+    try:
+        return compile_dsl(query), {"source": "dsl", "intent": "dsl_screen", "criteria": query, "confidence": 1.0}
+    except DSLError:
+        pass
+    
+    validated = query_validator.validate(query)
+    if validated.screener_dsl and validated.confidence >= FAST_PATH_CONFIDENCE:
+        try:
+            plan = compile_dsl(validated.screener_dsl)
+            return plan, {
+                "source": "rules",
+                "intent": validated.intent,
+                "criteria": query,
+                "confidence": validated.confidence
+            }
+        except DSLError as e:
+            print(f"[SCREENER] Validator DSL rejected ({validated.screener_dsl}): {e}")
+    
+    cache_params = {"q": _query_cache_key(query)}
+    cached = await query_cache.get("screener_dsl", cache_params)
+    if cached:
+        try:
+            return compile_dsl(cached["dsl"]), {**cached, "source": "cache"}
+        except DSLError:
+            pass
+    
+    translated = await asyncio.to_thread(translate_query_with_ai, query)
+    plan = compile_dsl(translated["dsl"])
+    await query_cache.set("screener_dsl", cache_params, {**translated, "dsl": plan.dsl})
+    return plan, {**translated, "source": "llm"}
+
+def format_engine_results(rows: list) -> list:
+    """Engine rows in the screener response shape"""
+    return [
+        {
+            "symbol": row["symbol"],
+            "company": row["company"],
+            "price": row["price"] or 0,
+            "change": row["change"] or 0,
+            "changePercent": row["change_percent"] or 0,
+            "pe_ratio": row["pe"],
+            "pb_ratio": row["pb"],
+            "roe": row["roe"],
+            "debt_to_equity": row["de"],
+            "market_cap": row["market_cap"],
+            "sector": row["sector"] or "Unknown",
+            "exchange": "NSE"
+        }
+        for row in rows
+    ]
+
 @router.post("/")
 async def screen_stocks(query: ScreenerQuery):
     """
     AI-Powered Stock Screener
-    1. Interpret user query using Free AI
+    1. Query -> screener DSL (DSL as-is, rule-based, cached, or AI translation)
+    2. DSL compiles to a cached query plan run over the whole NSE universe table
+    3. Return top matches
+    """
+    if screening_engine.size == 0:
+        print("[SCREENER] Universe table not ready, using AI suggestions")
+        return await suggest_stocks_with_ai(query)
+    
+    try:
+        plan, meta = await resolve_query_plan(query.query)
+    except Exception as e:
+        print(f"[SCREENER] Query interpretation failed: {e}")
+        return await suggest_stocks_with_ai(query)
+    
+    result = screening_engine.execute(plan)
+    print(f"[SCREENER] {meta['source']} plan '{plan.dsl}': {result['total_matches']} matches in {result['elapsed_ms']}ms")
+    
+    stocks = format_engine_results(result["results"])
+    if stocks:
+        answer = f"Found {result['total_matches']} of {result['universe_size']} stocks matching {meta['criteria']}."
+    else:
+        answer = f"No stocks found matching: {query.query}"
+    
+    return {
+        "stocks": stocks,
+        "intent": meta.get("intent", "general"),
+        "criteria": meta["criteria"],
+        "summary": answer,
+        "dsl": plan.dsl,
+        "parsed_dsl": plan.to_dict(),
+        "plan_source": meta["source"],
+        "confidence": meta.get("confidence"),
+        "total_matches": result["total_matches"],
+        "universe_size": result["universe_size"],
+        "elapsed_ms": result["elapsed_ms"]
+    }
+
+@router.post("/dsl/validate")
+async def validate_dsl(query: ScreenerQuery):
+    """Compile screener DSL without running it"""
+    try:
+        plan = compile_dsl(query.query)
+        return {"valid": True, "parsed_dsl": plan.to_dict()}
+    except DSLError as e:
+        return {"valid": False, "error": str(e)}
+
+@router.get("/saved")
+async def list_saved_screens(current_user = Depends(get_current_user)):
+    """User's saved screens with their current matches"""
+    return {"screens": saved_screen_service.list_for_user(current_user["id"])}
+
+@router.post("/saved")
+async def create_saved_screen(request: SavedScreenRequest, current_user = Depends(get_current_user)):
+    """Save a screen; matches are then tracked live and changes pushed to the user"""
+    try:
+        plan, meta = await resolve_query_plan(request.query)
+        screen = await saved_screen_service.create(
+            user_id=current_user["id"],
+            name=request.name or meta.get("criteria", request.query),
+            dsl=plan.dsl,
+            notify=request.notify
+        )
+    except (DSLError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**screen, "plan_source": meta["source"]}
+
+@router.delete("/saved/{screen_id}")
+async def delete_saved_screen(screen_id: str, current_user = Depends(get_current_user)):
+    if not await saved_screen_service.delete(current_user["id"], screen_id):
+        raise HTTPException(status_code=404, detail="Saved screen not found")
+    return {"success": True}
+
+@router.get("/engine/stats")
+async def get_engine_stats():
+    """Universe table size, refresh time, screen latency, plan cache and fundamentals store"""
+    from fundamentals_store import fundamentals_store
+    return {
+        **screening_engine.get_stats(),
+        "plan_cache": plan_cache.get_stats(),
+        "saved_screens": saved_screen_service.get_stats(),
+        "fundamentals_store": await asyncio.to_thread(fundamentals_store.get_stats),
+    }
+
+async def suggest_stocks_with_ai(query: ScreenerQuery):
+    """
+    Fallback screener used until the universe table is built
+    1. Ask the AI to suggest stocks for the query
     2. Fetch real stock data with prices and percentages
     3. Return structured results
     """
@@ -94,7 +312,8 @@ Provide a 2-3 sentence analysis."""
             "stocks": results,
             "intent": parsed.get("intent", "general"),
             "criteria": parsed.get("criteria", query.query),
-            "summary": answer
+            "summary": answer,
+            "plan_source": "llm_suggestions"
         }
 
     except Exception as e:
@@ -3,8 +3,9 @@ from pydantic import BaseModel
 from typing import Optional, List
 import os
 import json
+import asyncio
 from dependencies import get_current_user
-from angelone_service import search_stocks, get_stock_history as get_angel_history
+from angelone_service import search_stocks, get_stock_history as get_angel_history, HistoryIncompleteError
 from yahoo_service import get_yahoo_history, get_stock_fundamentals, get_batch_stock_data
 import ai_search
 
@@ -44,7 +45,15 @@ async def stock_history_endpoint(symbol: str, days: int = 30, interval: str = "1
         api_interval = angel_interval_map.get(interval, "ONE_MINUTE")
         # Angel One logic
         print(f"[HISTORY] Using Angel One for {symbol} (Intraday: {interval})")
-        return {"history": await get_angel_history(symbol, days=days, interval=api_interval)}
+        try:
+            return {"history": await get_angel_history(symbol, days=days, interval=api_interval)}
+        except HistoryIncompleteError as e:
+            # Gapped series are never served; the client can retry once the chunks recover
+            print(f"[HISTORY] {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"History for {symbol} is temporarily incomplete, please retry"
+            )
     
     # Use Yahoo for Daily/Weekly/Monthly (Long term)
     else:
@@ -121,13 +130,14 @@ async def search_stocks_endpoint(q: str = None):
                     "changePercent": 0
                 })
         
-        return {"results": enriched_results}
+        return {"results": enriched_results, "resolved_by": "direct"}
         
-    # 2. If no results, try AI Search (Semantic interpretation)
+    # 2. If no results, interpret the query (rule-based fast path, AI below the confidence threshold)
     print(f"[STOCK SEARCH] No direct match, attempting AI search for: '{q}'")
     try:
-        ai_results = await search_stocks(q, use_ai=True)
-        print(f"[STOCK SEARCH] AI match found {len(ai_results)} results")
+        resolved, path = await asyncio.to_thread(ai_search.resolve_search_query, q)
+        ai_results = await search_stocks(resolved, use_ai=False)
+        print(f"[STOCK SEARCH] {path} match '{resolved}' found {len(ai_results)} results")
         
         # Enrich AI results with price data too
         enriched_results = []
@@ -163,7 +173,7 @@ async def search_stocks_endpoint(q: str = None):
                     "changePercent": 0
                 })
         
-        return {"results": enriched_results}
+        return {"results": enriched_results, "resolved_by": path}
     except Exception as e:
         print(f"[STOCK_SEARCH] Error: {type(e).__name__}: {e}")
         import traceback
@@ -0,0 +1,289 @@
+"""
+Saved Screens
+Per-user screener DSL queries that run continuously: every PriceBatcher flush
+re-evaluates only the symbols whose price changed, against per-plan match sets,
+and pushes symbols entering or leaving a screen to the user.
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+import numpy as np
+
+from screening_engine import screening_engine
+from screener_dsl import compile_dsl
+from storage_backend import get_storage
+
+# Engine columns moved by update_prices; plans that use none of them only change on rebuilds
+PRICE_FIELDS = {"price", "change", "change_percent", "pct_from_high", "pct_from_low"}
+MAX_SCREENS_PER_USER = 20
+NOTIFY_COOLDOWN_SECONDS = 900  # Per screen + symbol, so a stock hovering at a threshold can't spam pushes
+
+
+def plan_fields(node: tuple) -> Set[str]:
+    """Engine fields a compiled plan node reads"""
+    kind = node[0]
+    if kind in ("and", "or"):
+        return set().union(*(plan_fields(child) for child in node[1]))
+    if kind == "not":
+        return plan_fields(node[1])
+    if kind in ("cmp", "between", "in"):
+        return {node[1]}
+    return set()
+
+
+class SavedScreenService:
+    """
+    Screens sharing the same canonical DSL share one plan entry and one match set,
+    so evaluation cost grows with distinct plans, not with saved screens.
+    """
+
+    def __init__(self):
+        self._screens: Dict[str, dict] = {}       # screen_id -> screen
+        self._user_screens: Dict[str, Set[str]] = {}
+        self._plans: Dict[str, dict] = {}         # canonical dsl -> {plan, fields, screen_ids, matches}
+        self._price_plans: Set[str] = set()       # plan keys that depend on a price field
+        self._engine_version = -1
+        self._last_notified: Dict[tuple, float] = {}
+        self.loaded = False
+        # Set by the server: async (user_id, message) -> None, delivers over WebSocket
+        self.on_event: Optional[Callable[[str, dict], Awaitable[None]]] = None
+        self.stats = {"flushes": 0, "rows_evaluated": 0, "plans_evaluated": 0, "events": 0, "last_flush_ms": 0.0}
+
+    # ------------------------------------------------------------------
+    # Persistence (storage backend "saved_screens")
+    # ------------------------------------------------------------------
+
+    async def load(self):
+        """Index every saved screen at startup"""
+        try:
+            screens = await get_storage().list_saved_screens()
+        except Exception as e:
+            print(f"[SAVED SCREENS] Load failed: {e}")
+            return
+
+        for screen in screens:
+            try:
+                self._index(screen)
+            except Exception as e:
+                print(f"[SAVED SCREENS] Skipping screen {screen.get('id')}: {e}")
+        self.loaded = True
+        print(f"[SAVED SCREENS] Indexed {len(self._screens)} screens as {len(self._plans)} distinct plans")
+
+    async def create(self, user_id: str, name: str, dsl: str, notify: bool = True) -> dict:
+        """Compile, persist and index a screen. Raises DSLError / ValueError."""
+        plan = compile_dsl(dsl)
+        if len(self._user_screens.get(user_id, ())) >= MAX_SCREENS_PER_USER:
+            raise ValueError(f"At most {MAX_SCREENS_PER_USER} saved screens per user")
+
+        screen = {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "name": name.strip() or plan.dsl,
+            "dsl": plan.dsl,
+            "notify": notify,
+            "created_at": datetime.now().isoformat(),
+        }
+        await get_storage().put_saved_screen(screen["id"], {k: v for k, v in screen.items() if k != "id"})
+
+        entry = self._index(screen)
+        return {**screen, "matches": sorted(entry["matches"] or [])}
+
+    async def delete(self, user_id: str, screen_id: str) -> bool:
+        screen = self._screens.get(screen_id)
+        if not screen or screen["user_id"] != user_id:
+            return False
+        await get_storage().delete_saved_screen(screen_id)
+        self._unindex(screen_id)
+        return True
+
+    def list_for_user(self, user_id: str) -> List[dict]:
+        screens = []
+        for screen_id in self._user_screens.get(user_id, ()):
+            screen = self._screens[screen_id]
+            matches = self._plans[screen["plan_key"]]["matches"]
+            screens.append({
+                **{k: v for k, v in screen.items() if k != "plan_key"},
+                "matches": sorted(matches or []),
+            })
+        return sorted(screens, key=lambda s: s["created_at"])
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    def _index(self, screen: dict) -> dict:
+        plan = compile_dsl(screen["dsl"])
+        key = plan.dsl
+        entry = self._plans.get(key)
+        if entry is None:
+            fields = plan_fields(plan.root)
+            entry = {"plan": plan, "fields": fields, "screen_ids": set(), "matches": None}
+            self._plans[key] = entry
+            if fields & PRICE_FIELDS:
+                self._price_plans.add(key)
+            if screening_engine.size:
+                entry["matches"] = self._full_matches(plan)
+
+        entry["screen_ids"].add(screen["id"])
+        self._screens[screen["id"]] = {**screen, "plan_key": key}
+        self._user_screens.setdefault(screen["user_id"], set()).add(screen["id"])
+        return entry
+
+    def _unindex(self, screen_id: str):
+        screen = self._screens.pop(screen_id)
+        self._user_screens.get(screen["user_id"], set()).discard(screen_id)
+        entry = self._plans[screen["plan_key"]]
+        entry["screen_ids"].discard(screen_id)
+        if not entry["screen_ids"]:
+            del self._plans[screen["plan_key"]]
+            self._price_plans.discard(screen["plan_key"])
+
+    @staticmethod
+    def _full_matches(plan) -> Set[str]:
+        mask = screening_engine.evaluate(plan.root)
+        return set(screening_engine.symbols_at()[mask])
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    async def on_price_batch(self, batch: dict):
+        """PriceBatcher flush: {token: {symbol, ltp, ...}}"""
+        prices = {}
+        for data in batch.values():
+            symbol, ltp = data.get("symbol"), data.get("ltp")
+            if symbol and ltp:
+                prices[symbol.replace("-EQ", "")] = float(ltp)
+
+        started = time.perf_counter()
+        changed_rows = screening_engine.update_prices(prices)
+        if not self._plans or not screening_engine.size:
+            return
+
+        if self._engine_version != screening_engine.version:
+            # Table rebuilt (row indices moved, fundamentals may have changed): diff every plan
+            changes = self._resync()
+        elif len(changed_rows):
+            changes = self._evaluate_rows(changed_rows)
+        else:
+            return
+
+        self.stats["flushes"] += 1
+        self.stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        if changes:
+            asyncio.create_task(self._dispatch(changes))
+
+    def _resync(self) -> Dict[str, tuple]:
+        changes = {}
+        for key, entry in self._plans.items():
+            matches = self._full_matches(entry["plan"])
+            previous = entry["matches"]
+            entry["matches"] = matches
+            # First evaluation after startup is a baseline, not an event
+            if previous is not None and matches != previous:
+                changes[key] = (matches - previous, previous - matches)
+        self._engine_version = screening_engine.version
+        self.stats["plans_evaluated"] += len(self._plans)
+        return changes
+
+    def _evaluate_rows(self, rows: np.ndarray) -> Dict[str, tuple]:
+        """Re-test only the changed rows against plans that read a price field"""
+        symbols = screening_engine.symbols_at(rows)
+        candidates = set(symbols)
+        changes = {}
+        for key in self._price_plans:
+            entry = self._plans[key]
+            if entry["matches"] is None:
+                continue
+            now_in = set(symbols[screening_engine.evaluate(entry["plan"].root, rows)])
+            entered = now_in - entry["matches"]
+            left = (candidates & entry["matches"]) - now_in
+            if entered or left:
+                entry["matches"] = (entry["matches"] | entered) - left
+                changes[key] = (entered, left)
+        self.stats["rows_evaluated"] += len(rows)
+        self.stats["plans_evaluated"] += len(self._price_plans)
+        return changes
+
+    # ------------------------------------------------------------------
+    # Delivery
+    # ------------------------------------------------------------------
+
+    async def _dispatch(self, changes: Dict[str, tuple]):
+        from notification_service import notification_service
+
+        now = time.time()
+        if len(self._last_notified) > 100000:
+            self._last_notified = {
+                k: t for k, t in self._last_notified.items() if now - t < NOTIFY_COOLDOWN_SECONDS
+            }
+        for key, (entered, left) in changes.items():
+            entry = self._plans.get(key)
+            if not entry:
+                continue
+            rows = {row["symbol"]: row for row in screening_engine.get_rows(list(entered | left))}
+            for screen_id in list(entry["screen_ids"]):
+                screen = self._screens.get(screen_id)
+                if not screen:
+                    continue
+                message = {
+                    "type": "screen_update",
+                    "screen_id": screen_id,
+                    "name": screen["name"],
+                    "dsl": screen["dsl"],
+                    "entered": [self._brief(rows, s) for s in sorted(entered)],
+                    "left": [self._brief(rows, s) for s in sorted(left)],
+                    "timestamp": datetime.now().isoformat(),
+                }
+                self.stats["events"] += 1
+
+                if self.on_event:
+                    try:
+                        await self.on_event(screen["user_id"], message)
+                    except Exception as e:
+                        print(f"[SAVED SCREENS] WebSocket delivery failed: {e}")
+
+                if not screen.get("notify"):
+                    continue
+                notify_entered = self._due(screen_id, entered, now)
+                notify_left = self._due(screen_id, left, now)
+                if notify_entered or notify_left:
+                    try:
+                        await notification_service.send_screen_alert(
+                            user_id=screen["user_id"],
+                            screen_id=screen_id,
+                            screen_name=screen["name"],
+                            entered=notify_entered,
+                            left=notify_left,
+                        )
+                    except Exception as e:
+                        print(f"[SAVED SCREENS] Notification failed for {screen_id}: {e}")
+
+    def _due(self, screen_id: str, symbols: Set[str], now: float) -> List[str]:
+        due = []
+        for symbol in sorted(symbols):
+            if now - self._last_notified.get((screen_id, symbol), 0) >= NOTIFY_COOLDOWN_SECONDS:
+                self._last_notified[(screen_id, symbol)] = now
+                due.append(symbol)
+        return due
+
+    @staticmethod
+    def _brief(rows: Dict[str, dict], symbol: str) -> dict:
+        row = rows.get(symbol, {})
+        return {"symbol": symbol, "price": row.get("price"), "change_percent": row.get("change_percent")}
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "screens": len(self._screens),
+            "distinct_plans": len(self._plans),
+            "price_dependent_plans": len(self._price_plans),
+        }
+
+
+# Global instance
+saved_screen_service = SavedScreenService()
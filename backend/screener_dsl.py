@@ -0,0 +1,285 @@
+"""
+Screener DSL
+A small query language for the screening engine, compiled into cached query plans.
+
+    pe < 20 and roe > 15 and sector = it sort by market_cap desc limit 20
+    (pe between 10 and 25 or pb < 2) and sector in (banking, finance)
+    symbol in (TCS, INFY, WIPRO) sort by change_percent
+
+Numeric fields are the engine columns (see screening_engine.NUMERIC_FIELDS and
+FIELD_ALIASES); text fields are `sector` and `symbol`.
+"""
+
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from screening_engine import normalize_field, OPERATORS
+
+TEXT_FIELDS = ["sector", "symbol"]
+KEYWORDS = {"and", "or", "not", "between", "in", "sort", "by", "asc", "desc", "limit"}
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 200
+PLAN_CACHE_SIZE = 500
+
+TOKEN_PATTERN = re.compile(
+    r"\s*(?:"
+    # A number must not run into letters, so 360ONE / 3MINDIA lex as symbols
+    r"(?P<number>-?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)(?![A-Za-z0-9_&])"
+    r"|(?P<op><=|>=|!=|==|<|>|=)"
+    r"|(?P<punct>[(),])"
+    r"|(?P<ident>[A-Za-z0-9_][A-Za-z0-9_&\-\.]*)"
+    r")"
+)
+
+
+class DSLError(ValueError):
+    """Raised for text that is not valid screener DSL"""
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    root: tuple
+    sort_by: Optional[str]
+    descending: bool
+    limit: int
+    dsl: str  # Canonical text
+
+    def to_dict(self) -> dict:
+        """JSON form, stored as QueryLog.parsed_dsl"""
+        return {
+            "dsl": self.dsl,
+            "where": _node_to_dict(self.root),
+            "sort_by": self.sort_by,
+            "descending": self.descending,
+            "limit": self.limit,
+        }
+
+
+def _node_to_dict(node: tuple):
+    kind = node[0]
+    if kind in ("and", "or"):
+        return {kind: [_node_to_dict(child) for child in node[1]]}
+    if kind == "not":
+        return {"not": _node_to_dict(node[1])}
+    if kind == "cmp":
+        return {"field": node[1], "op": node[2], "value": node[3]}
+    if kind == "between":
+        return {"field": node[1], "between": [node[2], node[3]]}
+    if kind == "in":
+        return {"field": node[1], "in": list(node[2])}
+    return {}
+
+
+def render(node: tuple) -> str:
+    """Canonical DSL text for an AST node"""
+    kind = node[0]
+    if kind == "all":
+        return ""
+    if kind in ("and", "or"):
+        parts = []
+        for child in node[1]:
+            text = render(child)
+            # Parenthesize OR inside AND so precedence survives a round trip
+            parts.append(f"({text})" if kind == "and" and child[0] == "or" else text)
+        return f" {kind} ".join(parts)
+    if kind == "not":
+        return f"not ({render(node[1])})"
+    if kind == "cmp":
+        return f"{node[1]} {node[2]} {_fmt_number(node[3])}"
+    if kind == "between":
+        return f"{node[1]} between {_fmt_number(node[2])} and {_fmt_number(node[3])}"
+    if kind == "in":
+        return f"{node[1]} in ({', '.join(node[2])})"
+    raise DSLError(f"Unknown node: {kind}")
+
+
+def _fmt_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if not match or match.end() == position:
+            raise DSLError(f"Unexpected character at {position}: {text[position:position + 10]!r}")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "ident" and value.lower() in KEYWORDS:
+            tokens.append(("kw", value.lower()))
+        else:
+            tokens.append((kind, value))
+    return tokens
+
+
+def normalize_dsl(text: str) -> str:
+    """Whitespace/case-insensitive cache key (the parser upper-cases symbol values itself)"""
+    return " ".join(value.lower() for _, value in tokenize(text))
+
+
+class _Parser:
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset: int = 0) -> Tuple[Optional[str], Optional[str]]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, kind: str, value: Optional[str] = None) -> str:
+        token_kind, token_value = self.peek()
+        if token_kind != kind or (value is not None and token_value != value):
+            expected = value or kind
+            raise DSLError(f"Expected {expected}, got {token_value or 'end of query'}")
+        self.pos += 1
+        return token_value
+
+    def accept(self, kind: str, value: Optional[str] = None) -> bool:
+        token_kind, token_value = self.peek()
+        if token_kind == kind and (value is None or token_value == value):
+            self.pos += 1
+            return True
+        return False
+
+    def parse_query(self) -> QueryPlan:
+        root = ("all",)
+        if self.peek()[0] is not None and self.peek() not in (("kw", "sort"), ("kw", "limit")):
+            root = self.parse_or()
+
+        sort_by, descending = None, True
+        if self.accept("kw", "sort"):
+            self.take("kw", "by")
+            raw = self.take("ident")
+            sort_by = normalize_field(raw)
+            if not sort_by:
+                raise DSLError(f"Unknown sort field: {raw}")
+            if self.accept("kw", "asc"):
+                descending = False
+            else:
+                self.accept("kw", "desc")
+
+        limit = DEFAULT_LIMIT
+        if self.accept("kw", "limit"):
+            limit = int(float(self.take("number")))
+            if not 1 <= limit <= MAX_LIMIT:
+                raise DSLError(f"Limit must be between 1 and {MAX_LIMIT}")
+
+        if self.peek()[0] is not None:
+            raise DSLError(f"Unexpected {self.peek()[1]!r}")
+
+        text = render(root)
+        if sort_by:
+            text += f" sort by {sort_by} {'desc' if descending else 'asc'}"
+        text += f" limit {limit}"
+        return QueryPlan(root, sort_by, descending, limit, text.strip())
+
+    def parse_or(self) -> tuple:
+        nodes = [self.parse_and()]
+        while self.accept("kw", "or"):
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else ("or", tuple(nodes))
+
+    def parse_and(self) -> tuple:
+        nodes = [self.parse_unary()]
+        while self.accept("kw", "and"):
+            nodes.append(self.parse_unary())
+        return nodes[0] if len(nodes) == 1 else ("and", tuple(nodes))
+
+    def parse_unary(self) -> tuple:
+        if self.accept("kw", "not"):
+            return ("not", self.parse_unary())
+        if self.accept("punct", "("):
+            node = self.parse_or()
+            self.take("punct", ")")
+            return node
+        return self.parse_condition()
+
+    def parse_condition(self) -> tuple:
+        raw_field = self.take("ident")
+        field = raw_field.lower()
+
+        if field in TEXT_FIELDS:
+            if self.accept("op", "=") or self.accept("op", "=="):
+                return ("in", field, (self._text_value(field),))
+            if self.accept("op", "!="):
+                return ("not", ("in", field, (self._text_value(field),)))
+            negate = self.accept("kw", "not")
+            self.take("kw", "in")
+            self.take("punct", "(")
+            values = [self._text_value(field)]
+            while self.accept("punct", ","):
+                values.append(self._text_value(field))
+            self.take("punct", ")")
+            node = ("in", field, tuple(values))
+            return ("not", node) if negate else node
+
+        column = normalize_field(field)
+        if not column:
+            raise DSLError(f"Unknown field: {raw_field}")
+
+        if self.accept("kw", "between"):
+            low = float(self.take("number"))
+            self.take("kw", "and")
+            high = float(self.take("number"))
+            if low > high:
+                low, high = high, low
+            return ("between", column, low, high)
+
+        op = self.take("op")
+        if op == "=":
+            op = "=="
+        if op not in OPERATORS:
+            raise DSLError(f"Unknown operator: {op}")
+        return ("cmp", column, op, float(self.take("number")))
+
+    def _text_value(self, field: str) -> str:
+        kind, value = self.peek()
+        if kind not in ("ident", "number"):
+            raise DSLError(f"Expected a {field} value, got {value or 'end of query'}")
+        self.pos += 1
+        return value.upper() if field == "symbol" else value.lower()
+
+
+class PlanCache:
+    """LRU of compiled plans keyed by normalized DSL text"""
+
+    def __init__(self, max_entries: int = PLAN_CACHE_SIZE):
+        self._plans: "OrderedDict[str, QueryPlan]" = OrderedDict()
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0}
+
+    def compile(self, text: str) -> QueryPlan:
+        key = normalize_dsl(text)
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+            self.stats["hits"] += 1
+            return plan
+
+        self.stats["misses"] += 1
+        plan = _Parser(tokenize(text)).parse_query()
+        self._plans[key] = plan
+        # The canonical form is a key too, so equivalent spellings share one entry
+        self._plans[normalize_dsl(plan.dsl)] = plan
+        while len(self._plans) > self.max_entries:
+            self._plans.popitem(last=False)
+        return plan
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "cached_plans": len(self._plans)}
+
+
+# Global instance
+plan_cache = PlanCache()
+
+
+def compile_dsl(text: str) -> QueryPlan:
+    """Compile screener DSL into a (cached) query plan. Raises DSLError."""
+    if not text or not text.strip():
+        raise DSLError("Empty query")
+    return plan_cache.compile(text)
@@ -0,0 +1,369 @@
+"""
+Screening Engine
+Keeps a columnar in-memory table of the NSE equity universe and evaluates
+screener filters as vectorized boolean masks with top-k selection.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fundamentals_store import fundamentals_store, reference_close
+from instrument_master import load_instruments_sync
+
+# Numeric columns available to filters and sorting
+NUMERIC_FIELDS = [
+    "price", "prev_close", "change", "change_percent", "pe", "pb", "roe", "de", "market_cap",
+    "dividend_yield", "beta", "revenue_growth", "high_52w", "low_52w",
+    "pct_from_high", "pct_from_low",
+]
+TEXT_FIELDS = ["company", "sector", "industry"]
+
+# Names the LLM / query parsers may use for each column
+FIELD_ALIASES = {
+    "pe_ratio": "pe", "p/e": "pe", "pe ratio": "pe",
+    "pb_ratio": "pb", "p/b": "pb", "price_to_book": "pb",
+    "return_on_equity": "roe",
+    "debt_to_equity": "de", "d/e": "de", "debt_equity": "de",
+    "market_cap_cr": "market_cap", "marketcap": "market_cap", "mcap": "market_cap",
+    "change_pct": "change_percent", "changepercent": "change_percent",
+    "52_week_high": "high_52w", "52_week_low": "low_52w",
+    "ltp": "price", "current_price": "price",
+    "previous_close": "prev_close",
+}
+
+OPERATORS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "=": np.equal,
+    "!=": np.not_equal,
+}
+
+# query_validator sector keys -> Yahoo sector/industry keywords
+SECTOR_MATCHERS = {
+    "it": ["technology", "information technology", "software"],
+    "banking": ["banks"],
+    "finance": ["financial services", "credit services", "capital markets", "insurance", "asset management"],
+    "pharma": ["healthcare", "drug manufacturers", "pharmaceutical", "biotechnology"],
+    "auto": ["auto manufacturers", "auto parts", "auto & truck"],
+    "fmcg": ["consumer defensive", "packaged foods", "household", "tobacco", "beverages", "personal products"],
+    "energy": ["energy", "oil & gas", "utilities"],
+    "metals": ["steel", "aluminum", "copper", "metal", "mining"],
+    "realty": ["real estate"],
+}
+
+REFRESH_INTERVAL_SECONDS = 900
+
+
+def normalize_field(field: str) -> Optional[str]:
+    """Map a user/LLM field name to an engine column, or None if unknown"""
+    key = field.strip().lower()
+    key = FIELD_ALIASES.get(key, key)
+    return key if key in NUMERIC_FIELDS else None
+
+
+def _num(value) -> float:
+    try:
+        if value is None or value == "":
+            return np.nan
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class ScreeningEngine:
+    """Columnar universe table: one numpy array per field, rows aligned with self._symbols"""
+
+    def __init__(self):
+        self._symbols: np.ndarray = np.array([], dtype=object)
+        self._columns: Dict[str, np.ndarray] = {}
+        self._sector_masks: Dict[str, np.ndarray] = {}
+        self._index: Dict[str, int] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._live_prices: Dict[str, float] = {}  # Latest ticks, re-applied after each rebuild
+        self.universe: List[str] = []
+        self.version = 0  # Bumped on every rebuild; row indices are only stable within a version
+        self.last_refresh: Optional[datetime] = None
+        self.stats = {"screens": 0, "refreshes": 0, "last_screen_ms": 0.0}
+
+    # ------------------------------------------------------------------
+    # Table building
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _load_universe() -> List[str]:
+        """Plain NSE equity symbols (RELIANCE-EQ -> RELIANCE) from the instrument master"""
+        symbols = []
+        for inst in load_instruments_sync():
+            symbol = inst.get("symbol", "")
+            if inst.get("exch_seg") == "NSE" and symbol.endswith("-EQ"):
+                symbols.append(symbol[:-3])
+        return sorted(set(symbols))
+
+    @staticmethod
+    def _row_from_fundamentals(symbol: str, fund: dict) -> dict:
+        price = _num(fund.get("current_price"))
+        prev_close = _num(reference_close(fund)) or np.nan  # Same base as market_breadth / portfolio_stream
+        high = _num(fund.get("52_week_high"))
+        low = _num(fund.get("52_week_low"))
+        market_cap = _num(fund.get("market_cap"))
+        dividend_yield = _num(fund.get("dividend_yield"))
+        return {
+            "symbol": symbol,
+            "company": fund.get("company_name") or symbol,
+            "sector": fund.get("sector") or "",
+            "industry": fund.get("industry") or "",
+            "price": price,
+            "prev_close": prev_close,
+            "change": price - prev_close,
+            "change_percent": (price / prev_close - 1) * 100,
+            "pe": _num(fund.get("pe_ratio")),
+            "pb": _num(fund.get("pb_ratio")),
+            "roe": _num(fund.get("return_on_equity")),
+            "de": _num(fund.get("debt_to_equity")),
+            "market_cap": market_cap / 1e7 if market_cap else np.nan,  # ₹ crore
+            "dividend_yield": dividend_yield * 100 if dividend_yield else np.nan,
+            "beta": _num(fund.get("beta")),
+            "revenue_growth": _num(fund.get("revenue_growth")),
+            "high_52w": high,
+            "low_52w": low,
+            "pct_from_high": (price / high - 1) * 100 if high else np.nan,
+            "pct_from_low": (price / low - 1) * 100 if low else np.nan,
+        }
+
+    def _build(self, rows: List[dict]):
+        """Swap in a new table built from row dicts"""
+        symbols = np.array([r["symbol"] for r in rows], dtype=object)
+        columns = {
+            field: np.array([r[field] for r in rows], dtype=np.float64) for field in NUMERIC_FIELDS
+        }
+        for field in TEXT_FIELDS:
+            columns[field] = np.array([r[field] for r in rows], dtype=object)
+
+        # Precompute sector masks once per refresh
+        haystack = np.char.lower(
+            np.array([f"{r['sector']}|{r['industry']}" for r in rows], dtype=str)
+        ) if rows else np.array([], dtype=str)
+        sector_masks = {}
+        for key, keywords in SECTOR_MATCHERS.items():
+            mask = np.zeros(len(rows), dtype=bool)
+            for keyword in keywords:
+                mask |= np.char.find(haystack, keyword) >= 0
+            sector_masks[key] = mask
+
+        self._symbols = symbols
+        self._columns = columns
+        self._sector_masks = sector_masks
+        self._index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.version += 1
+
+    @staticmethod
+    def _read_stored_fundamentals(symbols: List[str]) -> Dict[str, dict]:
+        """Fundamentals from the local store (filled by the nightly ingestion job)"""
+        stored = fundamentals_store.get_many(f"{symbol}.NS" for symbol in symbols)
+        return {ticker[:-3]: fund for ticker, fund in stored.items()}
+
+    async def refresh(self):
+        """Rebuild the table from the universe and stored fundamentals"""
+        async with self._lock:
+            started = time.time()
+            universe = await asyncio.to_thread(self._load_universe)
+            if universe:
+                self.universe = universe
+
+            fundamentals = await asyncio.to_thread(self._read_stored_fundamentals, self.universe)
+            rows = [
+                self._row_from_fundamentals(symbol, fund)
+                for symbol, fund in fundamentals.items()
+                if fund.get("current_price")
+            ]
+            self._build(rows)
+            if self._live_prices:
+                self.update_prices(self._live_prices)
+            self.last_refresh = datetime.now()
+            self.stats["refreshes"] += 1
+            print(f"[SCREENER ENGINE] Table rebuilt: {len(rows)}/{len(self.universe)} stocks in {time.time() - started:.1f}s")
+
+    def update_prices(self, prices: Dict[str, float]) -> np.ndarray:
+        """Patch live prices (and derived columns) in place. Returns the rows whose price changed."""
+        self._live_prices.update(prices)
+        if not self._index:
+            return np.array([], dtype=np.int64)
+        symbols = [s for s in prices if s in self._index]
+        if not symbols:
+            return np.array([], dtype=np.int64)
+        idx = np.array([self._index[s] for s in symbols])
+        new_price = np.array([prices[s] for s in symbols], dtype=np.float64)
+        cols = self._columns
+        changed = cols["price"][idx] != new_price
+        idx, new_price = idx[changed], new_price[changed]
+        prev_close = cols["prev_close"][idx]
+        cols["price"][idx] = new_price
+        cols["change"][idx] = new_price - prev_close
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cols["change_percent"][idx] = (new_price / prev_close - 1) * 100
+            cols["pct_from_high"][idx] = (new_price / cols["high_52w"][idx] - 1) * 100
+            cols["pct_from_low"][idx] = (new_price / cols["low_52w"][idx] - 1) * 100
+        return idx
+
+    def start(self, refresh_interval: int = REFRESH_INTERVAL_SECONDS):
+        """Background loop: initial build, then periodic rebuilds"""
+        async def loop():
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"[SCREENER ENGINE] Initial build failed: {e}")
+            while True:
+                await asyncio.sleep(refresh_interval)
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    print(f"[SCREENER ENGINE] Refresh failed: {e}")
+
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(loop())
+
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    # ------------------------------------------------------------------
+    # Screening
+    # ------------------------------------------------------------------
+
+    @property
+    def size(self) -> int:
+        return len(self._symbols)
+
+    def _sector_mask(self, sector: str) -> np.ndarray:
+        sector_mask = self._sector_masks.get(sector.lower())
+        if sector_mask is None:
+            haystack = np.char.lower(self._columns["sector"].astype(str))
+            sector_mask = np.char.find(haystack, sector.lower()) >= 0
+        return sector_mask
+
+    def evaluate(self, node: tuple, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Boolean row mask for a compiled screener DSL node; NaN never matches a comparison.
+        With `rows`, only those row indices are evaluated and the mask is aligned with them.
+        """
+        return self._truth(node, rows)[0]
+
+    def _truth(self, node: tuple, rows: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (true, false) masks under three-valued logic: a comparison on a NaN field is
+        neither, so `not pe > 20` doesn't match rows with no P/E either.
+        """
+        def column(field: str) -> np.ndarray:
+            return self._columns[field] if rows is None else self._columns[field][rows]
+
+        kind = node[0]
+        if kind == "all":
+            size = self.size if rows is None else len(rows)
+            return np.ones(size, dtype=bool), np.zeros(size, dtype=bool)
+        if kind in ("cmp", "between"):
+            values = column(node[1])
+            known = ~np.isnan(values)
+            with np.errstate(invalid="ignore"):
+                if kind == "cmp":
+                    mask = OPERATORS[node[2]](values, node[3])
+                else:
+                    mask = (values >= node[2]) & (values <= node[3])
+            mask &= known
+            return mask, known & ~mask
+        if kind == "in":
+            _, field, values = node
+            if field == "symbol":
+                mask = np.isin(self.symbols_at(rows), list(values))
+            else:
+                mask = np.zeros(self.size, dtype=bool)
+                for value in values:
+                    mask |= self._sector_mask(value)
+                if rows is not None:
+                    mask = mask[rows]
+            return mask, ~mask
+        if kind == "not":
+            true, false = self._truth(node[1], rows)
+            return false, true
+        if kind in ("and", "or"):
+            true, false = self._truth(node[1][0], rows)
+            for child in node[1][1:]:
+                child_true, child_false = self._truth(child, rows)
+                if kind == "and":
+                    true, false = true & child_true, false | child_false
+                else:
+                    true, false = true | child_true, false & child_false
+            return true, false
+        raise ValueError(f"Unknown plan node: {kind}")
+
+    def symbols_at(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        return self._symbols if rows is None else self._symbols[rows]
+
+    def top_k(self, mask: np.ndarray, sort_by: Optional[str], descending: bool, limit: int) -> np.ndarray:
+        """Row indices of the best `limit` matches, ordered"""
+        matched = np.flatnonzero(mask)
+        limit = max(1, limit)
+        if not sort_by or len(matched) == 0:
+            return matched[:limit]
+
+        values = self._columns[sort_by][matched]
+        # NaNs always sort last
+        keys = np.where(np.isnan(values), np.inf, -values if descending else values)
+        if len(matched) > limit:
+            part = np.argpartition(keys, limit - 1)[:limit]
+        else:
+            part = np.arange(len(matched))
+        order = part[np.argsort(keys[part], kind="stable")]
+        return matched[order]
+
+    def _row(self, i: int) -> dict:
+        def clean(value):
+            return None if isinstance(value, float) and np.isnan(value) else value
+
+        row = {"symbol": self._symbols[i]}
+        for field in TEXT_FIELDS:
+            row[field] = self._columns[field][i]
+        for field in NUMERIC_FIELDS:
+            value = clean(float(self._columns[field][i]))
+            row[field] = round(value, 2) if value is not None else None
+        return row
+
+    def get_rows(self, symbols: List[str]) -> List[dict]:
+        """Current table rows for the given symbols (unknown symbols are skipped)"""
+        return [self._row(self._index[s]) for s in symbols if s in self._index]
+
+    def execute(self, plan) -> dict:
+        """Run a compiled screener_dsl.QueryPlan over the whole universe"""
+        started = time.perf_counter()
+        mask = self.evaluate(plan.root)
+        rows = [self._row(i) for i in self.top_k(mask, plan.sort_by, plan.descending, plan.limit)]
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.stats["screens"] += 1
+        self.stats["last_screen_ms"] = elapsed_ms
+        return {
+            "results": rows,
+            "total_matches": int(mask.sum()),
+            "universe_size": self.size,
+            "elapsed_ms": elapsed_ms,
+        }
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "universe_size": len(self.universe),
+            "table_size": self.size,
+            "last_refresh": self.last_refresh.isoformat() if self.last_refresh else None,
+        }
+
+
+# Global instance
+screening_engine = ScreeningEngine()
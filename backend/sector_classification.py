@@ -0,0 +1,376 @@
+"""
+Sector Classification
+Sector and market-cap category for every NSE equity, built from the instrument
+master and the fundamentals store, plus per-sector aggregates (average change,
+breadth, turnover) kept current incrementally from live price batches.
+"""
+
+import asyncio
+import time
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from fundamentals_store import fundamentals_store, reference_close
+
+REFRESH_INTERVAL_SECONDS = 3600
+LARGE_CAP_RANK = 100  # SEBI: top 100 by market cap are large caps, 101-250 mid caps
+MID_CAP_RANK = 250
+
+# Hand-curated labels; these win over the Yahoo-derived sector
+SECTOR_OVERRIDES = {
+    # IT
+    "TCS": "IT", "INFY": "IT", "WIPRO": "IT", "HCLTECH": "IT", "TECHM": "IT",
+    "LTI": "IT", "COFORGE": "IT", "MINDTREE": "IT", "MPHASIS": "IT",
+    "LTTS": "IT", "PERSISTENT": "IT", "KPIT": "IT",
+
+    # Banking & Finance
+    "HDFCBANK": "Banking", "ICICIBANK": "Banking", "SBIN": "Banking",
+    "KOTAKBANK": "Banking", "AXISBANK": "Banking", "INDUSINDBK": "Banking",
+    "BANDHANBNK": "Banking", "FEDERALBNK": "Banking", "IDFCFIRSTB": "Banking",
+    "BAJFINANCE": "Finance", "BAJAJFINSV": "Finance", "CHOLAFIN": "Finance",
+    "SHRIRAMFIN": "Finance", "SBICARD": "Finance", "HDFCLIFE": "Finance",
+    "SBILIFE": "Finance", "ICICIGI": "Finance",
+
+    # Pharma
+    "SUNPHARMA": "Pharma", "DRREDDY": "Pharma", "CIPLA": "Pharma",
+    "DIVISLAB": "Pharma", "BIOCON": "Pharma", "AUROPHARMA": "Pharma",
+    "LUPIN": "Pharma", "TORNTPHARM": "Pharma", "ALKEM": "Pharma",
+    "LALPATHLAB": "Pharma", "METROPOLIS": "Pharma",
+
+    # Auto
+    "MARUTI": "Auto", "TATAMOTORS": "Auto", "M&M": "Auto",
+    "BAJAJ-AUTO": "Auto", "HEROMOTOCO": "Auto", "EICHERMOT": "Auto",
+    "ASHOKLEY": "Auto", "TVSMOTOR": "Auto", "ESCORTS": "Auto",
+    "MOTHERSON": "Auto", "BALKRISIND": "Auto",
+
+    # FMCG
+    "HINDUNILVR": "FMCG", "ITC": "FMCG", "NESTLEIND": "FMCG",
+    "BRITANNIA": "FMCG", "DABUR": "FMCG", "MARICO": "FMCG",
+    "GODREJCP": "FMCG", "COLPAL": "FMCG", "TATACONSUM": "FMCG",
+    "EMAMILTD": "FMCG", "VARUN": "FMCG",
+
+    # Energy & Power
+    "RELIANCE": "Energy", "ONGC": "Energy", "BPCL": "Energy",
+    "IOC": "Energy", "GAIL": "Energy", "NTPC": "Power",
+    "POWERGRID": "Power", "ADANIGREEN": "Power", "TATAPOWER": "Power",
+    "ADANIPOWER": "Power", "ADANIENT": "Energy",
+
+    # Metals
+    "TATASTEEL": "Metals", "JSWSTEEL": "Metals", "HINDALCO": "Metals",
+    "VEDL": "Metals", "COALINDIA": "Metals", "NATIONALUM": "Metals",
+    "SAIL": "Metals", "NMDC": "Metals",
+
+    # Cement
+    "ULTRACEMCO": "Cement", "GRASIM": "Cement", "SHREECEM": "Cement",
+    "ACC": "Cement", "AMBUJACEMENT": "Cement", "DALMIACEM": "Cement",
+
+    # Infrastructure
+    "LT": "Infrastructure", "ADANIPORTS": "Infrastructure",
+    "CONCOR": "Infrastructure", "IRB": "Infrastructure",
+
+    # Retail
+    "DMART": "Retail", "TRENT": "Retail", "JUBLFOOD": "Retail",
+    "AVENUE": "Retail",
+
+    # Telecom
+    "BHARTIARTL": "Telecom", "IDEA": "Telecom",
+
+    # Realty
+    "DLF": "Realty", "GODREJPROP": "Realty", "OBEROIRLTY": "Realty",
+    "PHOENIXLTD": "Realty",
+
+    # Consumer Durables
+    "TITAN": "Consumer", "ASIANPAINT": "Consumer", "PIDILITIND": "Consumer",
+    "VOLTAS": "Consumer", "HAVELLS": "Consumer", "CROMPTON": "Consumer",
+}
+
+# Used until fundamentals are ingested (no market cap to rank yet)
+FALLBACK_LARGE_CAP = {
+    "RELIANCE", "TCS", "HDFCBANK", "INFY", "ICICIBANK", "HINDUNILVR",
+    "ITC", "SBIN", "BHARTIARTL", "KOTAKBANK", "LT", "AXISBANK",
+    "MARUTI", "SUNPHARMA", "BAJFINANCE", "TITAN", "ULTRACEMCO",
+    "NESTLEIND", "ASIANPAINT", "HCLTECH", "WIPRO", "ADANIPORTS",
+    "ONGC", "NTPC", "POWERGRID", "TATASTEEL", "M&M", "TECHM",
+    "BAJAJFINSV", "GRASIM", "DRREDDY", "BRITANNIA", "CIPLA",
+}
+FALLBACK_MID_CAP = {
+    "DIVISLAB", "INDUSINDBK", "BANDHANBNK", "BIOCON", "LUPIN",
+    "GODREJCP", "MARICO", "DABUR", "TATACONSUM", "COLPAL",
+    "TVSMOTOR", "ESCORTS", "ASHOKLEY", "EICHERMOT", "TORNTPHARM",
+    "AUROPHARMA", "ALKEM", "DMART", "TRENT", "JUBLFOOD",
+    "CHOLAFIN", "SBICARD", "SHRIRAMFIN", "MPHASIS", "COFORGE",
+}
+
+# Yahoo industry keywords -> app sector, checked in order (banks before other financials)
+INDUSTRY_SECTORS = [
+    ("bank", "Banking"),
+    ("insurance", "Finance"), ("credit services", "Finance"), ("capital markets", "Finance"),
+    ("asset management", "Finance"), ("financial", "Finance"),
+    ("auto", "Auto"),
+    ("steel", "Metals"), ("aluminum", "Metals"), ("copper", "Metals"), ("metal", "Metals"),
+    ("mining", "Metals"), ("coal", "Metals"),
+    ("building materials", "Cement"),
+    ("utilities", "Power"),
+    ("oil & gas", "Energy"),
+    ("telecom", "Telecom"),
+    ("real estate", "Realty"),
+    ("drug", "Pharma"), ("biotech", "Pharma"), ("diagnostics", "Pharma"), ("medical", "Pharma"),
+    ("information technology", "IT"), ("software", "IT"),
+    ("engineering & construction", "Infrastructure"), ("infrastructure", "Infrastructure"),
+    ("marine", "Infrastructure"),
+    ("retail", "Retail"), ("department stores", "Retail"), ("restaurants", "Retail"),
+    ("packaged foods", "FMCG"), ("household", "FMCG"), ("tobacco", "FMCG"),
+    ("beverages", "FMCG"), ("confectioners", "FMCG"),
+]
+
+# Yahoo sector -> app sector when no industry keyword matched
+YAHOO_SECTORS = {
+    "Technology": "IT",
+    "Financial Services": "Finance",
+    "Healthcare": "Pharma",
+    "Consumer Defensive": "FMCG",
+    "Consumer Cyclical": "Consumer",
+    "Energy": "Energy",
+    "Utilities": "Power",
+    "Basic Materials": "Metals",
+    "Industrials": "Infrastructure",
+    "Real Estate": "Realty",
+    "Communication Services": "Telecom",
+}
+
+
+# Exchange endings, then series suffixes; hyphens inside a ticker (BAJAJ-AUTO) are kept
+SYMBOL_ENDINGS = (".NS", ".NSE", ".XNSE", ".BO", "-EQ", "-BE")
+
+
+def clean_symbol(symbol: str) -> str:
+    """RELIANCE-EQ / RELIANCE.NS / RELIANCE.XNSE -> RELIANCE, BAJAJ-AUTO-EQ -> BAJAJ-AUTO"""
+    symbol = symbol.upper()
+    for ending in SYMBOL_ENDINGS:
+        if symbol.endswith(ending):
+            symbol = symbol[:-len(ending)]
+    return symbol
+
+
+def map_sector(sector: str, industry: str) -> str:
+    """Yahoo sector/industry -> app sector label"""
+    industry_lower = (industry or "").lower()
+    for keyword, label in INDUSTRY_SECTORS:
+        if keyword in industry_lower:
+            return label
+    return YAHOO_SECTORS.get(sector or "", "Other")
+
+
+class SectorClassification:
+    """symbol -> sector / market-cap category, with live per-sector aggregates"""
+
+    def __init__(self):
+        self._entries: Dict[str, dict] = {}   # symbol -> {sector, cap, prev_close, change_percent, turnover}
+        self._sectors: Dict[str, dict] = {}   # sector -> running aggregate
+        self._members: Dict[str, List[str]] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.last_refresh: Optional[datetime] = None
+        self.last_tick: Optional[float] = None
+        self.stats = {"refreshes": 0, "ticks_applied": 0}
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def sector_of(self, symbol: str) -> str:
+        symbol = clean_symbol(symbol)
+        if symbol in SECTOR_OVERRIDES:
+            return SECTOR_OVERRIDES[symbol]
+        entry = self._entries.get(symbol)
+        return entry["sector"] if entry else "Other"
+
+    def market_cap_category(self, symbol: str) -> str:
+        symbol = clean_symbol(symbol)
+        entry = self._entries.get(symbol)
+        if entry and entry["cap"]:
+            return entry["cap"]
+        if symbol in FALLBACK_LARGE_CAP:
+            return "Large-cap"
+        if symbol in FALLBACK_MID_CAP:
+            return "Mid-cap"
+        return "Small-cap"
+
+    def reference_close(self, symbol: str) -> float:
+        """Close that today's change is measured against (0 if unknown)"""
+        entry = self._entries.get(clean_symbol(symbol))
+        return entry["prev_close"] if entry else 0
+
+    @property
+    def size(self) -> int:
+        return len(self._entries)
+
+    @property
+    def is_live(self) -> bool:
+        """Ticks applied in today's session; otherwise the aggregates only hold the stored seed"""
+        return self.last_tick is not None and datetime.fromtimestamp(self.last_tick).date() == date.today()
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    async def refresh(self):
+        """Rebuild the table from the fundamentals store, keeping today's live changes"""
+        started = time.time()
+        rows = await asyncio.to_thread(fundamentals_store.load_universe)
+        if not rows:
+            return
+
+        ranked = sorted(
+            (symbol for symbol, fund in rows.items() if (fund.get("market_cap") or 0) > 0),
+            key=lambda s: rows[s]["market_cap"],
+            reverse=True,
+        )
+        rank = {symbol: i + 1 for i, symbol in enumerate(ranked)}
+        # A new session starts from the stored closes, not from the last session's moves
+        carried = self._entries if self.last_refresh and self.last_refresh.date() == date.today() else {}
+
+        entries = {}
+        for symbol, fund in rows.items():
+            position = rank.get(symbol)
+            if position is None:
+                cap = None
+            elif position <= LARGE_CAP_RANK:
+                cap = "Large-cap"
+            elif position <= MID_CAP_RANK:
+                cap = "Mid-cap"
+            else:
+                cap = "Small-cap"
+
+            prev_close = reference_close(fund)
+            previous = carried.get(symbol)
+            if previous:
+                change_percent = previous["change_percent"]
+            elif prev_close:
+                change_percent = ((fund.get("current_price") or prev_close) / prev_close - 1) * 100
+            else:
+                change_percent = 0.0
+            entries[symbol] = {
+                "sector": SECTOR_OVERRIDES.get(symbol) or map_sector(fund.get("sector"), fund.get("industry")),
+                "cap": cap,
+                "prev_close": prev_close,
+                "change_percent": change_percent,
+                "turnover": previous["turnover"] if previous else 0.0,
+            }
+
+        self._entries = entries
+        self._rebuild_aggregates()
+        self.last_refresh = datetime.now()
+        self.stats["refreshes"] += 1
+        print(f"[SECTORS] Classified {len(entries)} stocks into {len(self._sectors)} sectors in {time.time() - started:.1f}s")
+
+    def _rebuild_aggregates(self):
+        self._sectors = {}
+        self._members = {}
+        for symbol, entry in self._entries.items():
+            self._members.setdefault(entry["sector"], []).append(symbol)
+            self._add(entry)
+
+    # ------------------------------------------------------------------
+    # Incremental aggregates
+    # ------------------------------------------------------------------
+
+    def _aggregate(self, sector: str) -> dict:
+        agg = self._sectors.get(sector)
+        if agg is None:
+            agg = {"count": 0, "change_sum": 0.0, "advances": 0, "declines": 0, "unchanged": 0, "turnover": 0.0}
+            self._sectors[sector] = agg
+        return agg
+
+    @staticmethod
+    def _breadth_key(change: float) -> str:
+        return "advances" if change > 0 else "declines" if change < 0 else "unchanged"
+
+    def _add(self, entry: dict, sign: int = 1):
+        agg = self._aggregate(entry["sector"])
+        agg["count"] += sign
+        agg["change_sum"] += sign * entry["change_percent"]
+        agg[self._breadth_key(entry["change_percent"])] += sign
+        agg["turnover"] += sign * entry["turnover"]
+
+    def on_price_batch(self, batch: dict):
+        """PriceBatcher flush: {token: {symbol, ltp, volume?, ...}} - O(changed symbols)"""
+        for data in batch.values():
+            symbol, ltp = data.get("symbol"), data.get("ltp")
+            if not symbol or not ltp:
+                continue
+            entry = self._entries.get(clean_symbol(symbol))
+            if not entry or not entry["prev_close"]:
+                continue
+
+            self._add(entry, -1)
+            entry["change_percent"] = (float(ltp) / entry["prev_close"] - 1) * 100
+            if data.get("volume"):
+                entry["turnover"] = float(ltp) * float(data["volume"])
+            self._add(entry)
+            self.last_tick = time.time()
+            self.stats["ticks_applied"] += 1
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def sector_summary(self) -> Dict[str, dict]:
+        """Per-sector aggregates, the shape stored in daily snapshots"""
+        summary = {}
+        for sector, agg in self._sectors.items():
+            if agg["count"] <= 0:
+                continue
+            summary[sector] = {
+                "avg_change": round(agg["change_sum"] / agg["count"], 2),
+                "stock_count": agg["count"],
+                "advances": agg["advances"],
+                "declines": agg["declines"],
+                "unchanged": agg["unchanged"],
+                "turnover": round(agg["turnover"], 2),
+            }
+        return summary
+
+    def heatmap(self) -> List[dict]:
+        """Sectors ordered by average change, with each sector's best and worst stock"""
+        tiles = []
+        for sector, summary in self.sector_summary().items():
+            members = self._members.get(sector, [])
+            best = max(members, key=lambda s: self._entries[s]["change_percent"], default=None)
+            worst = min(members, key=lambda s: self._entries[s]["change_percent"], default=None)
+            tiles.append({
+                "sector": sector,
+                **summary,
+                "top_gainer": {"symbol": best, "change_percent": round(self._entries[best]["change_percent"], 2)} if best else None,
+                "top_loser": {"symbol": worst, "change_percent": round(self._entries[worst]["change_percent"], 2)} if worst else None,
+            })
+        return sorted(tiles, key=lambda t: t["avg_change"], reverse=True)
+
+    def start(self, refresh_interval: int = REFRESH_INTERVAL_SECONDS):
+        """Background loop: initial build, then periodic rebuilds as fundamentals are refreshed"""
+        async def loop():
+            while True:
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    print(f"[SECTORS] Refresh failed: {e}")
+                await asyncio.sleep(refresh_interval)
+
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(loop())
+
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "classified": len(self._entries),
+            "sectors": len(self._sectors),
+            "last_refresh": self.last_refresh.isoformat() if self.last_refresh else None,
+        }
+
+
+# Global instance
+sector_classification = SectorClassification()
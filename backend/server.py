@@ -30,6 +30,22 @@ from routers import auth, chat, stocks, market, screener, candles, portfolio, no
 from instrument_master import init_instruments
 from smartapi_websocket import smartapi_ws_manager
 from price_batcher import price_batcher
+from chart_cache import chart_cache
+from screening_engine import screening_engine
+from fundamentals_store import fundamentals_store
+from saved_screens import saved_screen_service
+from sector_classification import sector_classification
+from movers_tracker import movers_tracker
+from market_breadth import market_breadth
+from portfolio_stream import portfolio_stream
+from advisory_precompute import advisory_precomputer
+from auth_cache import auth_cache
+from password_hasher import password_hasher
+from activity_log import activity_log
+from storage_backend import STORAGE_BACKEND, get_storage
+from expo_push import expo_push_client
+from push_receipts import push_receipts
+from dependencies import verify_token
 
 # Import Storage/Cache services
 from redis_config import redis_manager
@@ -50,6 +66,10 @@ class ConnectionManager:
     def __init__(self):
         self.active_connections: list[WebSocket] = []
         self.client_subscriptions: dict[WebSocket, set] = {}
+        self.client_charts: dict[WebSocket, list] = {}  # Open charts per client, for viewer refcounts
+        self.client_users: dict[WebSocket, str] = {}  # Authenticated user per client (saved screen updates)
+        self.user_connections: dict[str, set] = {}
+        self.portfolio_clients: dict[WebSocket, str] = {}  # Sockets streaming live portfolio P&L
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
@@ -62,11 +82,44 @@ class ConnectionManager:
             self.active_connections.remove(websocket)
         if websocket in self.client_subscriptions:
             del self.client_subscriptions[websocket]
+        for symbol, interval in self.client_charts.pop(websocket, []):
+            chart_cache.release_chart(symbol, interval)
+        if websocket in self.portfolio_clients:
+            portfolio_stream.release(self.portfolio_clients.pop(websocket))
+        user_id = self.client_users.pop(websocket, None)
+        if user_id in self.user_connections:
+            self.user_connections[user_id].discard(websocket)
+            if not self.user_connections[user_id]:
+                del self.user_connections[user_id]
         print(f"[WS] Client disconnected. Total: {len(self.active_connections)}")
 
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         await websocket.send_json(message)
 
+    def bind_user(self, websocket: WebSocket, user_id: str):
+        previous = self.client_users.get(websocket)
+        if previous is not None and previous != user_id:
+            # Re-authenticated as someone else: stop routing the old user's events here
+            if previous in self.user_connections:
+                self.user_connections[previous].discard(websocket)
+                if not self.user_connections[previous]:
+                    del self.user_connections[previous]
+            if websocket in self.portfolio_clients:
+                portfolio_stream.release(self.portfolio_clients.pop(websocket))
+        self.client_users[websocket] = user_id
+        self.user_connections.setdefault(user_id, set()).add(websocket)
+
+    async def send_to_user(self, user_id: str, message: dict):
+        disconnected = []
+        for connection in list(self.user_connections.get(user_id, ())):
+            try:
+                await connection.send_json(message)
+            except Exception:
+                disconnected.append(connection)
+        
+        for conn in disconnected:
+            self.disconnect(conn)
+
     async def broadcast(self, message: dict):
         disconnected = []
         for connection in self.active_connections:
@@ -101,8 +154,19 @@ manager = ConnectionManager()
 # WebSocket Callbacks
 async def on_batch_ready(batch: dict):
     await manager.broadcast_price_updates(batch)
+    sector_classification.on_price_batch(batch)
+    movers_tracker.on_price_batch(batch)
+    market_breadth.on_price_batch(batch)
+    breadth = market_breadth.pop_update()
+    if breadth:
+        await manager.broadcast({"type": "breadth", "data": breadth})
+    for user_id, message in portfolio_stream.on_price_batch(batch).items():
+        await manager.send_to_user(user_id, message)
+    await saved_screen_service.on_price_batch(batch)
 
 price_batcher.on_batch_ready = on_batch_ready
+saved_screen_service.on_event = manager.send_to_user
+portfolio_stream.on_event = manager.send_to_user
 
 async def on_price_update(token: str, price_data: dict):
     await price_batcher.add_update(token, price_data)
@@ -118,9 +182,11 @@ async def lifespan(app: FastAPI):
     # 0. Connect to Redis (Real-time Cache)
     await redis_manager.connect()
     
-    # 1. Connect to Firebase (Persistent Storage)
+    # 1. Connect to Firebase (Persistent Storage; STORAGE_BACKEND=sqlite runs without it)
     if initialize_firebase():
         print("✅ Firebase initialized")
+    elif STORAGE_BACKEND == "sqlite":
+        print("⚠️ Firebase unavailable - using SQLite storage")
     else:
         print("❌ Firebase initialization failed")
     
@@ -173,6 +239,52 @@ async def lifespan(app: FastAPI):
 
     asyncio.create_task(news_monitor())
     
+    # 7. Chart refresh scheduler (refcounted, market hours only)
+    chart_cache.start_refresh_scheduler(candles.refresh_charts)
+    
+    # 8. Screening engine universe table (background build + periodic refresh)
+    screening_engine.start()
+    
+    # 9. First boot: fill the local fundamentals store now instead of waiting for the nightly job
+    async def initial_fundamentals_ingest():
+        try:
+            if await asyncio.to_thread(fundamentals_store.count) == 0:
+                await asyncio.to_thread(fundamentals_store.run_ingestion)
+                await screening_engine.refresh()
+                await sector_classification.refresh()
+                await market_breadth.refresh()
+        except Exception as e:
+            print(f"⚠️  Fundamentals ingestion failed: {e}")
+
+    asyncio.create_task(initial_fundamentals_ingest())
+    
+    # 10. Saved screens (re-evaluated on every price batch flush)
+    asyncio.create_task(saved_screen_service.load())
+    
+    # 11. Sector classification table + live sector aggregates
+    sector_classification.start()
+    
+    # 12. Market breadth counters (advance/decline, new 52-week highs/lows)
+    market_breadth.start()
+    
+    # 13. Advisory signals / screener matches for every watchlisted symbol, precomputed into Redis
+    advisory_precomputer.start()
+    
+    # 14. Auth claim invalidations (role changes, bans) from every instance
+    await auth_cache.start()
+    
+    # 15. bcrypt worker processes (spawned now so the first login doesn't wait for them)
+    try:
+        await password_hasher.start()
+    except Exception as e:
+        print(f"[STARTUP] Password hasher warm-up failed: {e}")
+    
+    # 16. Batched activity/audit log writer
+    activity_log.start()
+    
+    # 17. Expo push receipts: delivery stats + removal of unregistered device tokens
+    push_receipts.start()
+    
     print("✅ Server startup complete!\n")
 
     yield  # Application runs
@@ -180,6 +292,17 @@ async def lifespan(app: FastAPI):
     # --- SHUTDOWN ---
     print("\n🛑 Shutting down...")
     await price_batcher.stop()
+    await chart_cache.stop_refresh_scheduler()
+    await screening_engine.stop()
+    await sector_classification.stop()
+    await market_breadth.stop()
+    await advisory_precomputer.stop()
+    await auth_cache.stop()
+    password_hasher.stop()
+    await push_receipts.stop()
+    await activity_log.stop()
+    await expo_push_client.close()
+    await get_storage().close()
     await smartapi_ws_manager.disconnect()
     await redis_manager.close()
     print("✅ Shutdown complete\n")
@@ -233,6 +356,7 @@ async def health():
     health_status = {
         "status": "healthy",
         "firebase": "unknown",
+        "storage": STORAGE_BACKEND,
         "redis": "disconnected",
         "instruments": "not_loaded"
     }
@@ -246,6 +370,9 @@ async def health():
     if redis_manager.is_connected:
         health_status["redis"] = "connected"
     
+    health_status["password_hasher"] = password_hasher.get_stats()
+    health_status["push"] = {**expo_push_client.get_stats(), "receipts": push_receipts.get_stats()}
+    
     return health_status
 
 # WebSocket Connection Handler
@@ -273,6 +400,59 @@ async def handle_websocket_connection(websocket: WebSocket):
                     "type": "unsubscription_confirmed",
                     "symbols": list(manager.client_subscriptions[websocket])
                 })
+            
+            elif action == "chart_open":
+                symbol, interval = data.get("symbol"), data.get("interval", "1d")
+                if symbol:
+                    manager.client_charts.setdefault(websocket, []).append((symbol, interval))
+                    viewers = chart_cache.acquire_chart(symbol, interval)
+                    await websocket.send_json({
+                        "type": "chart_opened",
+                        "symbol": symbol,
+                        "interval": interval,
+                        "viewers": viewers
+                    })
+            
+            elif action == "screens_subscribe":
+                # Saved screen updates are per user, so the client authenticates with its JWT
+                try:
+                    payload = verify_token(data.get("token", ""))
+                    user_id = str(payload.get("user_id"))
+                except Exception:
+                    await websocket.send_json({"type": "error", "message": "Invalid token"})
+                    continue
+                manager.bind_user(websocket, user_id)
+                await websocket.send_json({
+                    "type": "screens_subscribed",
+                    "screens": saved_screen_service.list_for_user(user_id)
+                })
+            
+            elif action == "portfolio_subscribe":
+                # Private channel: holdings and P&L of the authenticated user only
+                try:
+                    payload = verify_token(data.get("token", ""))
+                    user_id = str(payload.get("user_id"))
+                except Exception:
+                    await websocket.send_json({"type": "error", "message": "Invalid token"})
+                    continue
+                manager.bind_user(websocket, user_id)
+                if websocket not in manager.portfolio_clients:
+                    manager.portfolio_clients[websocket] = user_id
+                    snapshot = await portfolio_stream.subscribe(user_id)
+                else:
+                    snapshot = portfolio_stream.snapshot(user_id)
+                await websocket.send_json(snapshot or {"type": "portfolio_snapshot", "positions": []})
+            
+            elif action == "portfolio_unsubscribe":
+                if websocket in manager.portfolio_clients:
+                    portfolio_stream.release(manager.portfolio_clients.pop(websocket))
+            
+            elif action == "chart_close":
+                symbol, interval = data.get("symbol"), data.get("interval", "1d")
+                charts = manager.client_charts.get(websocket, [])
+                if (symbol, interval) in charts:
+                    charts.remove((symbol, interval))
+                    chart_cache.release_chart(symbol, interval)
                 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
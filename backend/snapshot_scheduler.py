@@ -8,6 +8,7 @@ import threading
 import asyncio
 from datetime import datetime
 from market_cache import market_data_cache
+from fundamentals_store import fundamentals_store, INGEST_TIME
 
 def run_pre_market_snapshot():
     """Run snapshot at 9:00 AM to pre-warm cache for the day"""
@@ -19,6 +20,11 @@ def run_closing_snapshot():
     print(f"[SCHEDULER] 🌇 Running EOD Market Snapshot: {datetime.now()}")
     asyncio.run(market_data_cache.create_daily_snapshot())
 
+def run_fundamentals_ingestion():
+    """Refresh the local fundamentals store for the whole universe overnight"""
+    print(f"[SCHEDULER] 📚 Running Fundamentals Ingestion: {datetime.now()}")
+    fundamentals_store.run_ingestion()
+
 def start_scheduler():
     """Start the scheduler thread"""
     # Schedule morning cache warming
@@ -27,7 +33,10 @@ def start_scheduler():
     # Schedule evening closing snapshot
     schedule.every().day.at("15:45").do(run_closing_snapshot)
     
-    print("[SCHEDULER] ✅ Market Data Scheduler Started (09:00 AM & 03:45 PM)")
+    # Schedule nightly fundamentals ingestion
+    schedule.every().day.at(INGEST_TIME).do(run_fundamentals_ingestion)
+    
+    print(f"[SCHEDULER] ✅ Market Data Scheduler Started (09:00 AM & 03:45 PM, fundamentals {INGEST_TIME})")
     
     def run_loop():
         while True:
@@ -0,0 +1,423 @@
+"""
+SQLite Storage Backend
+StorageBackend on a local SQLite file for local runs, load tests/benchmarks and
+single-node deploys. Documents are stored as JSON with the fields that are
+filtered or sorted on copied into indexed columns. WAL mode lets readers run
+alongside the writer; all access goes through one connection on a dedicated
+thread so SQLite work never queues behind the shared default executor.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from storage_backend import SERVER_TIMESTAMP, StorageBackend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT,
+    push_token TEXT,
+    doc TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS idx_users_push_token ON users(push_token) WHERE push_token IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS watchlists (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    added_at TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_watchlists_user_symbol ON watchlists(user_id, symbol);
+
+CREATE TABLE IF NOT EXISTS portfolio_history (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_portfolio_history_user_time ON portfolio_history(user_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS activity_logs (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT,
+    type TEXT,
+    timestamp TEXT NOT NULL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_activity_logs_user_time ON activity_logs(user_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    read INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_notifications_user_time ON notifications(user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS market_snapshots (
+    id TEXT PRIMARY KEY,
+    date TEXT,
+    timestamp TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_market_snapshots_date_time ON market_snapshots(date, timestamp);
+CREATE INDEX IF NOT EXISTS idx_market_snapshots_time ON market_snapshots(timestamp);
+
+CREATE TABLE IF NOT EXISTS chat_conversations (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    updated_at TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_conversations_user_time ON chat_conversations(user_id, updated_at);
+
+CREATE TABLE IF NOT EXISTS saved_screens (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    doc TEXT NOT NULL
+);
+"""
+
+INSERT_NOTIFICATION = "INSERT INTO notifications (id, user_id, read, created_at, doc) VALUES (?, ?, ?, ?, ?)"
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:20]
+
+
+def _ts(value) -> Optional[str]:
+    """Sortable text form of a timestamp column"""
+    if value is None:
+        return None
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _prepare(data: Dict) -> Dict:
+    now = datetime.utcnow()
+    return {k: now if v is SERVER_TIMESTAMP else v for k, v in data.items()}
+
+
+def _dump(doc: Dict) -> str:
+    return json.dumps(doc, default=_ts)
+
+
+def _load(row, with_id: bool = False) -> Dict:
+    doc = json.loads(row["doc"])
+    if with_id:
+        doc["id"] = row["id"]
+    return doc
+
+
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)  # Only ever used from the executor thread
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Durable across app crashes; WAL fsyncs at checkpoints
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.executescript(SCHEMA)
+        print(f"[SQLITE] Opened {self.path}")
+        return conn
+
+    def _call(self, fn, args):
+        if self._conn is None:
+            self._conn = self._connect()
+        with self._conn:  # One transaction per operation
+            return fn(self._conn, *args)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, fn, args)
+
+    # ------------------------------------------------------------------
+    # Users
+    # ------------------------------------------------------------------
+
+    async def get_user(self, user_id: str) -> Optional[Dict]:
+        def fetch(conn):
+            row = conn.execute("SELECT id, doc FROM users WHERE id = ?", (str(user_id),)).fetchone()
+            return _load(row, with_id=True) if row else None
+        return await self._run(fetch)
+
+    async def get_user_by_email(self, email: str) -> Optional[Dict]:
+        def fetch(conn):
+            row = conn.execute("SELECT id, doc FROM users WHERE email = ?", (email,)).fetchone()
+            return _load(row, with_id=True) if row else None
+        return await self._run(fetch)
+
+    @staticmethod
+    def _write_user(conn, user_id: str, doc: Dict):
+        conn.execute(
+            "INSERT OR REPLACE INTO users (id, email, push_token, doc) VALUES (?, ?, ?, ?)",
+            (user_id, doc.get("email"), doc.get("expo_push_token") or None, _dump(doc)),
+        )
+
+    async def create_user(self, data: Dict) -> str:
+        user_id = _new_id()
+        doc = _prepare(data)
+        await self._run(lambda conn: self._write_user(conn, user_id, doc))
+        return user_id
+
+    async def _merge_user(self, user_id: str, fields: Dict, create: bool):
+        fields = _prepare(fields)
+
+        def merge(conn):
+            row = conn.execute("SELECT doc FROM users WHERE id = ?", (user_id,)).fetchone()
+            if row is None and not create:
+                raise KeyError(f"No user {user_id}")
+            doc = json.loads(row["doc"]) if row else {}
+            doc.update(fields)
+            self._write_user(conn, user_id, doc)
+        await self._run(merge)
+
+    async def update_user(self, user_id: str, updates: Dict) -> None:
+        await self._merge_user(str(user_id), updates, create=False)
+
+    async def merge_user(self, user_id: str, fields: Dict) -> None:
+        await self._merge_user(str(user_id), fields, create=True)
+
+    async def list_push_users(self) -> List[Dict]:
+        def fetch(conn):
+            rows = conn.execute("SELECT id, doc FROM users WHERE push_token IS NOT NULL").fetchall()
+            return [_load(row, with_id=True) for row in rows]
+        return await self._run(fetch)
+
+    async def clear_push_tokens(self, tokens: List[Tuple[str, str]]) -> int:
+        now = _ts(datetime.utcnow())
+        rows = [(now, str(user_id), token) for user_id, token in tokens]
+
+        def clear(conn):
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE users SET push_token = NULL, "
+                "doc = json_set(json_remove(doc, '$.expo_push_token'), '$.push_token_invalidated_at', ?) "
+                "WHERE id = ? AND push_token = ?",
+                rows,
+            )
+            return conn.total_changes - before
+        return await self._run(clear)
+
+    # ------------------------------------------------------------------
+    # Portfolio history / activity
+    # ------------------------------------------------------------------
+
+    async def add_portfolio_snapshot(self, user_id: str, snapshot: Dict) -> None:
+        doc = _prepare(snapshot)
+        await self._run(lambda conn: conn.execute(
+            "INSERT INTO portfolio_history (user_id, timestamp, doc) VALUES (?, ?, ?)",
+            (str(user_id), _ts(doc.get("timestamp")), _dump(doc)),
+        ))
+
+    async def list_portfolio_snapshots(self, user_id: str, since: datetime) -> List[Dict]:
+        def fetch(conn):
+            rows = conn.execute(
+                "SELECT doc FROM portfolio_history WHERE user_id = ? AND timestamp >= ? ORDER BY timestamp DESC",
+                (str(user_id), _ts(since)),
+            ).fetchall()
+            return [_load(row) for row in rows]
+        return await self._run(fetch)
+
+    async def add_activity_logs(self, events: List[Dict]) -> None:
+        rows = []
+        for event in events:
+            doc = _prepare(event)
+            rows.append((doc.get("user_id"), doc.get("type"), _ts(doc.get("timestamp")), _dump(doc)))
+        await self._run(lambda conn: conn.executemany(
+            "INSERT INTO activity_logs (user_id, type, timestamp, doc) VALUES (?, ?, ?, ?)", rows
+        ))
+
+    # ------------------------------------------------------------------
+    # Watchlists
+    # ------------------------------------------------------------------
+
+    async def list_watchlist(self, user_id) -> List[Dict]:
+        def fetch(conn):
+            rows = conn.execute(
+                "SELECT doc FROM watchlists WHERE user_id = ? ORDER BY added_at", (str(user_id),)
+            ).fetchall()
+            return [_load(row) for row in rows]
+        return await self._run(fetch)
+
+    async def put_watchlist_item(self, item_id: str, item: Dict) -> None:
+        doc = _prepare(item)
+        await self._run(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO watchlists (id, user_id, symbol, added_at, doc) VALUES (?, ?, ?, ?, ?)",
+            (item_id, str(doc.get("user_id")), doc.get("symbol"), _ts(doc.get("added_at")), _dump(doc)),
+        ))
+
+    async def delete_watchlist_symbol(self, user_id, symbol: str) -> bool:
+        def delete(conn):
+            cursor = conn.execute(
+                "DELETE FROM watchlists WHERE user_id = ? AND symbol = ?", (str(user_id), symbol)
+            )
+            return cursor.rowcount > 0
+        return await self._run(delete)
+
+    async def update_watchlist_symbol(self, user_id, symbol: str, updates: Dict) -> List[Dict]:
+        updates = _prepare(updates)
+
+        def update(conn):
+            row = conn.execute(
+                "SELECT id, doc FROM watchlists WHERE user_id = ? AND symbol = ? LIMIT 1", (str(user_id), symbol)
+            ).fetchone()
+            if row is None:
+                return []
+            doc = {**json.loads(row["doc"]), **updates}
+            conn.execute("UPDATE watchlists SET doc = ? WHERE id = ?", (_dump(doc), row["id"]))
+            return [doc]
+        return await self._run(update)
+
+    async def list_watchlist_symbols(self) -> List[Dict]:
+        def fetch(conn):
+            rows = conn.execute(
+                "SELECT symbol, json_extract(doc, '$.exchange') AS exchange FROM watchlists"
+            ).fetchall()
+            return [{"symbol": row["symbol"], "exchange": row["exchange"]} for row in rows]
+        return await self._run(fetch)
+
+    # ------------------------------------------------------------------
+    # Notifications
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _notification_row(user_id: str, notification: Dict) -> tuple:
+        notification["id"] = _new_id()
+        doc = _prepare(notification)
+        return (doc["id"], str(user_id), int(bool(doc.get("read"))), _ts(doc.get("created_at")), _dump(doc))
+
+    async def add_notification(self, user_id: str, notification: Dict) -> str:
+        row = self._notification_row(user_id, notification)
+        await self._run(lambda conn: conn.execute(INSERT_NOTIFICATION, row))
+        return row[0]
+
+    async def add_notifications(self, notifications: List[Dict]) -> List[str]:
+        rows = [self._notification_row(n["user_id"], n) for n in notifications]
+        await self._run(lambda conn: conn.executemany(INSERT_NOTIFICATION, rows))
+        return [row[0] for row in rows]
+
+    async def list_notifications(self, user_id: str, limit: int, unread_only: bool = False) -> List[Dict]:
+        def fetch(conn):
+            sql = "SELECT id, doc FROM notifications WHERE user_id = ?"
+            if unread_only:
+                sql += " AND read = 0"
+            rows = conn.execute(sql + " ORDER BY created_at DESC LIMIT ?", (str(user_id), limit)).fetchall()
+            return [_load(row, with_id=True) for row in rows]
+        return await self._run(fetch)
+
+    async def mark_notification_read(self, user_id: str, notification_id: str) -> None:
+        await self._run(lambda conn: conn.execute(
+            "UPDATE notifications SET read = 1, doc = json_set(doc, '$.read', json('true')) WHERE id = ? AND user_id = ?",
+            (str(notification_id), str(user_id)),
+        ))
+
+    async def mark_all_notifications_read(self, user_id: str) -> None:
+        await self._run(lambda conn: conn.execute(
+            "UPDATE notifications SET read = 1, doc = json_set(doc, '$.read', json('true')) WHERE user_id = ? AND read = 0",
+            (str(user_id),),
+        ))
+
+    # ------------------------------------------------------------------
+    # Market snapshots
+    # ------------------------------------------------------------------
+
+    async def put_market_snapshot(self, snapshot_id: str, snapshot: Dict) -> None:
+        doc = _prepare(snapshot)
+        await self._run(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO market_snapshots (id, date, timestamp, doc) VALUES (?, ?, ?, ?)",
+            (snapshot_id, doc.get("date"), _ts(doc.get("timestamp")), _dump(doc)),
+        ))
+
+    async def latest_market_snapshot(self, date: Optional[str] = None) -> Optional[Dict]:
+        def fetch(conn):
+            if date:
+                row = conn.execute(
+                    "SELECT doc FROM market_snapshots WHERE date = ? ORDER BY timestamp DESC LIMIT 1", (date,)
+                ).fetchone()
+            else:
+                row = conn.execute("SELECT doc FROM market_snapshots ORDER BY timestamp DESC LIMIT 1").fetchone()
+            return _load(row) if row else None
+        return await self._run(fetch)
+
+    async def list_market_snapshots(self, start_date: str, end_date: str) -> List[Dict]:
+        def fetch(conn):
+            rows = conn.execute(
+                "SELECT doc FROM market_snapshots WHERE date >= ? AND date <= ? ORDER BY date",
+                (start_date, end_date),
+            ).fetchall()
+            return [_load(row) for row in rows]
+        return await self._run(fetch)
+
+    # ------------------------------------------------------------------
+    # Chat conversations
+    # ------------------------------------------------------------------
+
+    async def add_conversation(self, conversation: Dict) -> str:
+        conversation_id = _new_id()
+        doc = _prepare(conversation)
+        await self._run(lambda conn: conn.execute(
+            "INSERT INTO chat_conversations (id, user_id, updated_at, doc) VALUES (?, ?, ?, ?)",
+            (conversation_id, str(doc.get("user_id")), _ts(doc.get("updated_at")), _dump(doc)),
+        ))
+        return conversation_id
+
+    async def list_conversations(self, user_id: str, limit: int) -> List[Dict]:
+        def fetch(conn):
+            rows = conn.execute(
+                "SELECT id, doc FROM chat_conversations WHERE user_id = ? ORDER BY updated_at DESC LIMIT ?",
+                (str(user_id), limit),
+            ).fetchall()
+            return [_load(row, with_id=True) for row in rows]
+        return await self._run(fetch)
+
+    async def get_conversation(self, conversation_id: str) -> Optional[Dict]:
+        def fetch(conn):
+            row = conn.execute("SELECT id, doc FROM chat_conversations WHERE id = ?", (conversation_id,)).fetchone()
+            return _load(row, with_id=True) if row else None
+        return await self._run(fetch)
+
+    async def delete_conversation(self, conversation_id: str) -> None:
+        await self._run(lambda conn: conn.execute("DELETE FROM chat_conversations WHERE id = ?", (conversation_id,)))
+
+    # ------------------------------------------------------------------
+    # Saved screens
+    # ------------------------------------------------------------------
+
+    async def list_saved_screens(self) -> List[Dict]:
+        def fetch(conn):
+            return [_load(row, with_id=True) for row in conn.execute("SELECT id, doc FROM saved_screens").fetchall()]
+        return await self._run(fetch)
+
+    async def put_saved_screen(self, screen_id: str, screen: Dict) -> None:
+        doc = _prepare(screen)
+        await self._run(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO saved_screens (id, user_id, doc) VALUES (?, ?, ?)",
+            (screen_id, str(doc.get("user_id")), _dump(doc)),
+        ))
+
+    async def delete_saved_screen(self, screen_id: str) -> None:
+        await self._run(lambda conn: conn.execute("DELETE FROM saved_screens WHERE id = ?", (screen_id,)))
+
+    async def close(self):
+        def close():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, close)
+        self._executor.shutdown(wait=False)
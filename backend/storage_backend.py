@@ -0,0 +1,200 @@
+"""
+Storage Backend
+The persistence interface behind UserService, MarketService, chat history, saved
+screens and the activity log writer. Firestore is the production implementation; SQLite (WAL) serves
+local runs, load tests/benchmarks and single-node deploys without a Firebase project.
+
+Select with STORAGE_BACKEND=firestore|sqlite (SQLITE_PATH sets the database file).
+Documents are plain dicts; ids are strings chosen by the backend unless given.
+"""
+
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "firestore").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(os.path.dirname(__file__), "data", "app.db"))
+
+
+class _ServerTimestamp:
+    def __repr__(self):
+        return "SERVER_TIMESTAMP"
+
+
+# Top-level field value replaced with the write time by the backend
+SERVER_TIMESTAMP = _ServerTimestamp()
+
+
+class StorageBackend(ABC):
+    name = ""
+
+    # ------------------------------------------------------------------
+    # Users
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    async def get_user(self, user_id: str) -> Optional[Dict]:
+        """User document with its "id", or None"""
+
+    @abstractmethod
+    async def get_user_by_email(self, email: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    async def create_user(self, data: Dict) -> str:
+        """Returns the new user id"""
+
+    @abstractmethod
+    async def update_user(self, user_id: str, updates: Dict) -> None:
+        """Update fields of an existing user (raises if the user doesn't exist)"""
+
+    @abstractmethod
+    async def merge_user(self, user_id: str, fields: Dict) -> None:
+        """Update fields, creating the user document if missing"""
+
+    @abstractmethod
+    async def list_push_users(self) -> List[Dict]:
+        """Users with an expo_push_token"""
+
+    @abstractmethod
+    async def clear_push_tokens(self, tokens: List[Tuple[str, str]]) -> int:
+        """
+        Remove dead (user_id, token) push tokens in batched writes, skipping users
+        who have since registered a different token. Returns how many were removed.
+        """
+
+    # ------------------------------------------------------------------
+    # Portfolio history / activity
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    async def add_portfolio_snapshot(self, user_id: str, snapshot: Dict) -> None:
+        ...
+
+    @abstractmethod
+    async def list_portfolio_snapshots(self, user_id: str, since: datetime) -> List[Dict]:
+        """Newest first"""
+
+    @abstractmethod
+    async def add_activity_logs(self, events: List[Dict]) -> None:
+        """Write a batch of activity events in one operation"""
+
+    # ------------------------------------------------------------------
+    # Watchlists
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    async def list_watchlist(self, user_id) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def put_watchlist_item(self, item_id: str, item: Dict) -> None:
+        """Create or replace (item_id makes re-adding the same stock idempotent)"""
+
+    @abstractmethod
+    async def delete_watchlist_symbol(self, user_id, symbol: str) -> bool:
+        """Remove the symbol on any exchange; False if it wasn't there"""
+
+    @abstractmethod
+    async def update_watchlist_symbol(self, user_id, symbol: str, updates: Dict) -> List[Dict]:
+        """Update the first matching item; returns the updated items"""
+
+    @abstractmethod
+    async def list_watchlist_symbols(self) -> List[Dict]:
+        """{symbol, exchange} of every watchlist entry across all users"""
+
+    # ------------------------------------------------------------------
+    # Notifications
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    async def add_notification(self, user_id: str, notification: Dict) -> str:
+        """Stores the notification with its new id set as notification["id"]"""
+
+    @abstractmethod
+    async def add_notifications(self, notifications: List[Dict]) -> List[str]:
+        """Bulk add_notification (each carries its user_id), written in batches"""
+
+    @abstractmethod
+    async def list_notifications(self, user_id: str, limit: int, unread_only: bool = False) -> List[Dict]:
+        """Newest first"""
+
+    @abstractmethod
+    async def mark_notification_read(self, user_id: str, notification_id: str) -> None:
+        ...
+
+    @abstractmethod
+    async def mark_all_notifications_read(self, user_id: str) -> None:
+        ...
+
+    # ------------------------------------------------------------------
+    # Market snapshots
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    async def put_market_snapshot(self, snapshot_id: str, snapshot: Dict) -> None:
+        ...
+
+    @abstractmethod
+    async def latest_market_snapshot(self, date: Optional[str] = None) -> Optional[Dict]:
+        """Most recent snapshot overall, or on the given date"""
+
+    @abstractmethod
+    async def list_market_snapshots(self, start_date: str, end_date: str) -> List[Dict]:
+        """Oldest first"""
+
+    # ------------------------------------------------------------------
+    # Chat conversations
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    async def add_conversation(self, conversation: Dict) -> str:
+        ...
+
+    @abstractmethod
+    async def list_conversations(self, user_id: str, limit: int) -> List[Dict]:
+        """Most recently updated first, each with its "id\""""
+
+    @abstractmethod
+    async def get_conversation(self, conversation_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    async def delete_conversation(self, conversation_id: str) -> None:
+        ...
+
+    # ------------------------------------------------------------------
+    # Saved screens
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    async def list_saved_screens(self) -> List[Dict]:
+        """Every user's saved screens, each with its "id\""""
+
+    @abstractmethod
+    async def put_saved_screen(self, screen_id: str, screen: Dict) -> None:
+        ...
+
+    @abstractmethod
+    async def delete_saved_screen(self, screen_id: str) -> None:
+        ...
+
+    async def close(self):
+        pass
+
+
+_backend: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """The configured backend, created on first use"""
+    global _backend
+    if _backend is None:
+        if STORAGE_BACKEND == "sqlite":
+            from sqlite_backend import SQLiteBackend
+            _backend = SQLiteBackend(SQLITE_PATH)
+        else:
+            from firestore_backend import FirestoreBackend
+            _backend = FirestoreBackend()
+    return _backend
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from angelone_service import ANGEL_HISTORY_MAX_DAYS, _chunk_date, _merge_candles, plan_history_chunks
+from candle_store import calendar_days
+
+
+@pytest.mark.parametrize("interval, days", [
+    ("ONE_MINUTE", 95),
+    ("FIVE_MINUTE", 365),
+    ("ONE_DAY", 4000),
+    ("UNKNOWN", 61),
+])
+def test_chunks_tile_the_range_within_the_api_limit(interval, days):
+    start = datetime(2024, 1, 1, 9, 15)
+    end = start + timedelta(days=days)
+    chunks = plan_history_chunks(start, end, interval)
+    max_days = ANGEL_HISTORY_MAX_DAYS.get(interval, 30)
+
+    assert chunks[0][0] == "2024-01-01 09:15"
+    assert chunks[-1][1] == end.strftime("%Y-%m-%d 15:30")
+    covered = []
+    for chunk_from, chunk_to in chunks:
+        chunk_days = calendar_days(_chunk_date(chunk_from), _chunk_date(chunk_to))
+        assert len(chunk_days) <= max_days
+        covered.extend(chunk_days)
+    # Consecutive, no gaps and no overlaps
+    assert covered == calendar_days(start, end)
+
+
+def test_single_day_and_empty_ranges():
+    day = datetime(2024, 3, 4, 10, 0)
+    assert plan_history_chunks(day, day, "ONE_MINUTE") == [("2024-03-04 09:15", "2024-03-04 15:30")]
+    assert plan_history_chunks(day, day - timedelta(days=1), "ONE_MINUTE") == []
+
+
+def test_merge_dedupes_chunk_edges_oldest_first():
+    first = [{"date": "2024-01-02T09:15", "close": 1}, {"date": "2024-01-03T09:15", "close": 2}]
+    second = [{"date": "2024-01-03T09:15", "close": 3}, {"date": "2024-01-01T09:15", "close": 0}]
+    merged = _merge_candles([first, second])
+    assert [c["close"] for c in merged] == [0, 1, 3]
@@ -0,0 +1,93 @@
+import math
+
+import numpy as np
+import pytest
+
+from indicators import IncrementalIndicators, IndicatorService, compute_indicators, ema, rsi, sma, vwap
+
+DAY = 86400
+
+
+def _candles(count: int, start: int = 1_700_000_000, step: int = 300) -> list:
+    rng = np.random.default_rng(7)
+    closes = 100 + np.cumsum(rng.normal(0, 1, count))
+    return [
+        {"time": start + i * step, "open": c, "high": c + 1.5, "low": c - 1.0, "close": c, "volume": 1000 + i}
+        for i, c in enumerate(closes)
+    ]
+
+
+def _close(a, b) -> bool:
+    if a is None or b is None:
+        return a is b
+    return math.isclose(a, b, rel_tol=1e-6, abs_tol=2e-4)
+
+
+def test_sma_and_ema():
+    values = np.array([1.0, 2.0, 3.0, 4.0])
+    assert np.isnan(sma(values, 3)[:2]).all()
+    assert list(sma(values, 3)[2:]) == [2.0, 3.0]
+    assert np.isnan(sma(values, 5)).all()
+    assert ema(values, 3)[0] == 1.0
+    assert ema(values, 3)[1] == pytest.approx(1.5)
+
+
+def test_rsi_bounds():
+    assert rsi(np.arange(30, dtype=float), 14)[-1] == 100.0
+    assert rsi(np.arange(30, 0, -1, dtype=float), 14)[-1] == 0.0
+    assert np.isnan(rsi(np.arange(30, dtype=float), 14)[:14]).all()
+
+
+def test_vwap_resets_every_ist_session():
+    # 09:15 IST on two consecutive days
+    times = np.array([1_700_020_500, 1_700_020_800, 1_700_020_500 + DAY])
+    prices = np.array([100.0, 110.0, 50.0])
+    out = vwap(times, prices, prices, prices, np.array([1.0, 1.0, 1.0]))
+    assert list(out) == [100.0, 105.0, 50.0]
+
+
+def test_incremental_matches_vectorized():
+    candles = _candles(120)
+    full = compute_indicators(candles)
+    engine = IncrementalIndicators.from_candles(candles[:-1])
+    latest = engine.update(candles[-1])
+    for name, value in latest.items():
+        assert _close(value, full[name][-1]), name
+
+
+def test_forming_bar_is_replaced_not_double_counted():
+    candles = _candles(60)
+    engine = IncrementalIndicators.from_candles(candles)
+    revised = {**candles[-1], "close": candles[-1]["close"] + 5, "high": candles[-1]["high"] + 5}
+    latest = engine.update(revised)
+    full = compute_indicators(candles[:-1] + [revised])
+    for name, value in latest.items():
+        assert _close(value, full[name][-1]), name
+
+    with pytest.raises(ValueError):
+        engine.update({**candles[0]})
+
+
+def test_service_extends_series_incrementally():
+    service = IndicatorService()
+    candles = _candles(80)
+    service.update_series("TCS", "5m", candles[:70])
+    series = service.update_series("TCS", "5m", candles)
+    assert service.get_stats()["full_computes"] == 1
+    assert service.get_stats()["bars_applied"] == 11  # Last known bar re-applied + 10 new
+    assert series["time"] == [c["time"] for c in candles]
+
+    full = compute_indicators(candles)
+    for name in ("sma_20", "rsi_14", "macd", "bb_upper", "atr_14", "vwap"):
+        assert _close(series[name][-1], full[name][-1]), name
+
+    # Changed history falls back to a full compute
+    service.update_series("TCS", "5m", candles[5:])
+    assert service.get_stats()["full_computes"] == 2
+
+
+def test_select_and_latest():
+    series = {"time": [1, 2, 3], "rsi_14": [None, 40.0, 50.0], "bb_upper": [1, 2, 3], "sma_20": [1, 2, 3]}
+    selected = IndicatorService.select(series, ["rsi", "bollinger"], limit=2)
+    assert selected == {"time": [2, 3], "rsi_14": [40.0, 50.0], "bb_upper": [2, 3]}
+    assert IndicatorService.latest(series)["rsi_14"] == 50.0
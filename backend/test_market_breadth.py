@@ -0,0 +1,103 @@
+import asyncio
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import market_breadth as mb
+from market_breadth import MarketBreadth
+
+YESTERDAY = (date.today() - timedelta(days=1)).isoformat()
+
+
+def _fund(close: float, high: float = 0, low: float = 0) -> dict:
+    return {"current_price": close, "52_week_high": high, "52_week_low": low, "refreshed_on": YESTERDAY}
+
+
+@pytest.fixture
+def universe(monkeypatch):
+    rows = {
+        "A": _fund(100.0, high=110.0, low=90.0),
+        "B": _fund(200.0, high=250.0, low=150.0),
+        "C": _fund(50.0),
+        "NOCLOSE": _fund(0),
+    }
+    monkeypatch.setattr(mb.fundamentals_store, "load_universe", lambda: rows)
+    return rows
+
+
+@pytest.fixture
+def breadth(universe):
+    breadth = MarketBreadth()
+    asyncio.run(breadth.refresh())
+    return breadth
+
+
+def test_seeded_flat_from_nightly_closes(breadth):
+    snapshot = breadth.snapshot()
+    assert (snapshot["advances"], snapshot["declines"], snapshot["unchanged"]) == (0, 0, 3)
+    assert snapshot["total"] == 3  # No reference close, not tracked
+    assert snapshot["source"] == "stored"
+
+
+def test_ticks_move_only_the_counters_they_change(breadth):
+    breadth.on_price_batch({
+        "1": {"symbol": "A-EQ", "ltp": 101.0},
+        "2": {"symbol": "B-EQ", "ltp": 190.0},
+        "3": {"symbol": "C-EQ", "ltp": 50.0},
+        "4": {"symbol": "UNKNOWN-EQ", "ltp": 10.0},
+    })
+    snapshot = breadth.snapshot()
+    assert (snapshot["advances"], snapshot["declines"], snapshot["unchanged"]) == (1, 1, 1)
+    assert snapshot["ad_ratio"] == 1.0
+
+    breadth.update("B", 205.0)
+    assert breadth.snapshot()["advances"] == 2
+    assert breadth.snapshot()["declines"] == 0
+
+
+def test_new_highs_and_lows_count_once_per_day(breadth):
+    breadth.update("A", 111.0)
+    breadth.update("A", 112.0)
+    breadth.update("A", 105.0)  # Back inside the range: still a new high today
+    breadth.update("B", 149.0)
+    snapshot = breadth.snapshot()
+    assert (snapshot["new_highs"], snapshot["new_lows"]) == (1, 1)
+    breadth.update("C", 1000.0)  # No 52-week range known
+    assert breadth.snapshot()["new_highs"] == 1
+
+
+def test_counters_match_a_full_recount(breadth):
+    rng = random.Random(5)
+    for _ in range(500):
+        symbol = rng.choice(["A", "B", "C"])
+        breadth.update(symbol, rng.uniform(0.8, 1.2) * breadth._entries[symbol]["prev_close"])
+    incremental = breadth.snapshot()
+    breadth._recount()
+    assert breadth.snapshot() == incremental
+
+
+def test_same_day_refresh_keeps_live_state(breadth):
+    breadth.update("A", 120.0)
+    asyncio.run(breadth.refresh())
+    assert breadth.snapshot()["advances"] == 1
+    assert breadth.snapshot()["new_highs"] == 1
+
+
+def test_pushes_are_throttled(breadth, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(mb.time, "time", lambda: now[0])
+    assert breadth.pop_update() is not None  # Dirty after seeding
+    assert breadth.pop_update() is None  # Nothing moved
+
+    breadth.update("A", 101.0)
+    assert breadth.pop_update() is None  # Within the push interval
+    now[0] += mb.PUSH_INTERVAL_SECONDS
+    assert breadth.pop_update()["advances"] == 1
+
+
+def test_live_only_after_ticks(breadth):
+    assert not breadth.is_live
+    breadth.on_price_batch({"1": {"symbol": "A.NS", "ltp": 101.0}})
+    assert breadth.is_live
+    assert breadth.snapshot()["advances"] == 1
@@ -0,0 +1,78 @@
+import random
+
+import movers_tracker as mt
+from movers_tracker import MoversTracker
+
+
+def _symbols(rows):
+    return [row["symbol"] for row in rows]
+
+
+def test_top_gainers_and_losers():
+    tracker = MoversTracker(top_k=2)
+    for symbol, change in [("A", 5.0), ("B", -3.0), ("C", 1.0), ("D", -7.0), ("E", 0.0)]:
+        tracker.update(symbol, 100.0, change, prev_close=100.0)
+    top = tracker.top()
+    assert _symbols(top["gainers"]) == ["A", "C"]
+    assert _symbols(top["losers"]) == ["D", "B"]
+    assert top["total_fetched"] == 5
+    # Reads push live entries back, so a second read sees the same lists
+    assert tracker.top() == top
+
+
+def test_updates_replace_a_symbols_entry():
+    tracker = MoversTracker(top_k=3)
+    tracker.update("A", 100.0, 5.0)
+    tracker.update("B", 100.0, 2.0)
+    tracker.update("A", 100.0, -4.0)  # Fell from top gainer to loser
+    top = tracker.top()
+    assert _symbols(top["gainers"]) == ["B"]
+    assert _symbols(top["losers"]) == ["A"]
+    assert top["losers"][0]["changePercent"] == -4.0
+
+
+def test_penny_stocks_are_dropped():
+    tracker = MoversTracker()
+    tracker.update("PENNY", 50.0, 9.0)
+    tracker.update("PENNY", mt.MIN_PRICE - 1, 12.0)
+    assert tracker.top()["gainers"] == []
+    assert len(tracker) == 0
+
+
+def test_compaction_keeps_results_exact():
+    tracker = MoversTracker(top_k=5)
+    rng = random.Random(3)
+    latest = {}
+    for _ in range(5000):
+        symbol = f"S{rng.randrange(40)}"
+        change = round(rng.uniform(-10, 10), 2)
+        tracker.update(symbol, 100.0, change)
+        latest[symbol] = change
+
+    assert tracker.get_stats()["compactions"] > 0
+    assert tracker.get_stats()["heap_size"] <= mt.COMPACT_FACTOR * 64 + 1
+    ranked = sorted(latest.items(), key=lambda item: -item[1])
+    expected = [symbol for symbol, change in ranked[:5] if change > 0]
+    assert [row["changePercent"] for row in tracker.top()["gainers"]] == [latest[s] for s in expected]
+
+
+def test_price_batches_use_the_reference_close(monkeypatch):
+    import sector_classification
+
+    closes = {"RELIANCE": 100.0, "BAJAJ-AUTO": 200.0}
+    monkeypatch.setattr(sector_classification.sector_classification, "reference_close", closes.get)
+    tracker = MoversTracker()
+    tracker.on_price_batch({
+        "1": {"symbol": "RELIANCE-EQ", "ltp": 105.0, "volume": 10},
+        "2": {"symbol": "BAJAJ-AUTO-EQ", "ltp": 190.0},
+        "3": {"symbol": "UNKNOWN-EQ", "ltp": 50.0},  # No reference close
+        "4": {"symbol": "TCS-EQ", "ltp": None},
+    })
+    top = tracker.top()
+    assert top["gainers"][0] == {
+        "symbol": "RELIANCE", "name": "RELIANCE", "price": 105.0, "change": 5.0,
+        "changePercent": 5.0, "volume": 10, "exchange": "NSE",
+    }
+    assert _symbols(top["losers"]) == ["BAJAJ-AUTO"]
+    assert len(tracker) == 2
+    assert not tracker.is_live  # Too few symbols for the live lists
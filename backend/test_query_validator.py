@@ -0,0 +1,43 @@
+import pytest
+
+from query_validator import query_validator, FAST_PATH_CONFIDENCE
+
+
+@pytest.mark.parametrize("query, dsl", [
+    ("pe below 20 and roe above 15", "pe < 20 and roe > 15 sort by market_cap desc"),
+    ("IT stocks with roe above 20", "roe > 20 and sector = it sort by market_cap desc"),
+    ("debt to equity not more than 1", "de <= 1 sort by market_cap desc"),
+    ("top gainers", "change_percent desc"),
+])
+def test_simple_screens_take_the_fast_path(query, dsl):
+    validated = query_validator.validate(query)
+    assert validated.screener_dsl.endswith(dsl)
+    assert validated.confidence >= FAST_PATH_CONFIDENCE
+
+
+@pytest.mark.parametrize("query", [
+    "pe below 20 or roe above 15",
+    "non banking stocks with roe above 20",
+    "non-banking stocks with roe above 20",
+    "stocks with roe above 20 but not banking",
+    "pharma stocks except IT",
+    "top gainers excluding banking",
+    "roe above 15 without debt",
+])
+def test_negation_and_alternatives_fall_through_to_llm(query):
+    validated = query_validator.validate(query)
+    assert validated.screener_dsl is None
+    assert validated.confidence < FAST_PATH_CONFIDENCE
+
+
+def test_compound_logic_detection():
+    assert query_validator.has_compound_logic("PE below 20 OR ROE above 15")
+    assert not query_validator.has_compound_logic("pe not less than 10")
+    assert not query_validator.has_compound_logic("large cap energy stocks")  # "or" only as a word
+
+
+def test_metric_abbreviations_are_not_tickers():
+    validated = query_validator.validate("PE below 20 and ROE above 15% in IT")
+    assert validated.stock_symbols == []
+    assert validated.screener_dsl.endswith("pe < 20 and roe > 15 and sector = it sort by market_cap desc")
+    assert query_validator.extract_stock_symbols("TCS vs INFY on ROCE and EPS") == ["TCS", "INFY"]
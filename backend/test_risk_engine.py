@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+import risk_engine
+from risk_engine import compute_risk, returns_matrix, watchlist_hash
+
+DAY = 86400
+START = 1_704_067_200  # 2024-01-01 00:00 UTC, 05:30 IST
+
+
+@pytest.fixture
+def market():
+    rng = np.random.default_rng(11)
+    bench = rng.normal(0.0005, 0.01, 250)
+    returns = np.column_stack([
+        1.2 * bench + rng.normal(0, 0.005, 250),
+        0.5 * bench + rng.normal(0, 0.01, 250),
+        rng.normal(0, 0.02, 250),
+    ])
+    return ["A", "B", "C"], returns, bench
+
+
+def test_metrics_match_reference_formulas(market):
+    symbols, returns, bench = market
+    report = compute_risk(symbols, returns, bench)
+    w = np.full(3, 1 / 3)
+    annual = np.sqrt(risk_engine.TRADING_DAYS)
+
+    cov = np.cov(returns, rowvar=False)
+    assert report["portfolio"]["volatility_pct"] == round(np.sqrt(w @ cov @ w) * annual * 100, 2)
+    assert report["correlation"]["matrix"] == np.round(np.corrcoef(returns, rowvar=False), 2).tolist()
+    for i, holding in enumerate(report["holdings"]):
+        beta = np.cov(returns[:, i], bench)[0, 1] / np.var(bench, ddof=1)
+        assert holding["beta"] == round(beta, 2)
+    assert report["holdings"][0]["beta"] > report["holdings"][1]["beta"]
+
+    portfolio = returns @ w
+    assert report["portfolio"]["var"]["95"]["var_pct"] == round(-np.quantile(portfolio, 0.05) * 100, 2)
+    assert report["portfolio"]["var"]["99"]["cvar_pct"] >= report["portfolio"]["var"]["99"]["var_pct"]
+    assert report["portfolio"]["diversification_ratio"] > 1
+    assert report["portfolio"]["max_drawdown_pct"] <= 0
+    assert report["correlation"]["high_correlation_pairs"][0]["pair"] == ["A", "B"]
+    assert report["observations"] == 250
+
+
+def test_weights_are_normalised(market):
+    symbols, returns, bench = market
+    report = compute_risk(symbols, returns, bench, weights=np.array([2.0, 1.0, 1.0]))
+    assert [h["weight"] for h in report["holdings"]] == [0.5, 0.25, 0.25]
+
+
+def test_single_holding(market):
+    _, returns, bench = market
+    report = compute_risk(["A"], returns[:, :1], bench)
+    assert report["portfolio"]["average_correlation"] is None
+    assert report["portfolio"]["diversification_ratio"] == 1.0
+    assert report["correlation"]["high_correlation_pairs"] == []
+
+
+def _candles(closes, skip=()):
+    return [{"time": START + i * DAY, "close": c} for i, c in enumerate(closes) if i not in skip]
+
+
+def test_returns_matrix_aligns_on_benchmark_sessions():
+    days = risk_engine.MIN_OBSERVATIONS + 10
+    bench = _candles(100 + np.arange(days, dtype=float))
+    series = {
+        "FULL": _candles(50 + np.arange(days, dtype=float)),
+        "GAPPY": _candles(20 + np.arange(days, dtype=float), skip={10, 11}),  # Forward-filled
+        "SHORT": _candles(10 + np.arange(20, dtype=float)),  # Too little history
+    }
+    symbols, returns, bench_returns, dropped = returns_matrix(series, bench)
+    assert symbols == ["FULL", "GAPPY"]
+    assert dropped == ["SHORT"]
+    assert returns.shape == (days - 1, 2)
+    assert len(bench_returns) == days - 1
+    assert returns[10, 1] == 0.0  # Filled session: no move
+    assert np.isfinite(returns).all()
+
+
+def test_watchlist_hash_ignores_order_and_duplicates():
+    assert watchlist_hash(["TCS", "INFY"]) == watchlist_hash(["INFY", "TCS", "TCS"])
+    assert watchlist_hash(["TCS"]) != watchlist_hash(["INFY"])
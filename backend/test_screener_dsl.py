@@ -0,0 +1,98 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from screener_dsl import DSLError, PlanCache, compile_dsl, tokenize
+from screening_engine import ScreeningEngine
+
+TODAY = date.today().isoformat()
+
+
+def test_compiles_to_canonical_plan():
+    plan = compile_dsl("PE < 20 AND (roe > 15 or pb<2) sort by mcap asc limit 5")
+    assert plan.dsl == "pe < 20 and (roe > 15 or pb < 2) sort by market_cap asc limit 5"
+    assert plan.root[0] == "and"
+    assert (plan.sort_by, plan.descending, plan.limit) == ("market_cap", False, 5)
+
+
+def test_digit_leading_symbols():
+    assert tokenize("symbol in (360ONE, 3MINDIA)")[3:6] == [("ident", "360ONE"), ("punct", ","), ("ident", "3MINDIA")]
+    plan = compile_dsl("symbol in (360one, 3mindia, tcs)")
+    assert plan.root == ("in", "symbol", ("360ONE", "3MINDIA", "TCS"))
+
+
+@pytest.mark.parametrize("text, value", [
+    ("market_cap > 1e3", 1000.0),
+    ("market_cap > 2.5E+4", 25000.0),
+    ("pe < .5", 0.5),
+    ("roe > -5", -5.0),
+])
+def test_number_forms(text, value):
+    assert compile_dsl(text).root[3] == value
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "pe <",
+    "pe between 10",
+    "foo > 10",
+    "sector in (it",
+    "pe > 10 limit 0",
+    "pe > 10 extra",
+    "pe > 10 $",
+])
+def test_invalid_queries(text):
+    with pytest.raises(DSLError):
+        compile_dsl(text)
+
+
+def test_plan_cache_shares_equivalent_spellings():
+    cache = PlanCache(max_entries=10)
+    first = cache.compile("pe < 20 and roe > 15")
+    assert cache.compile("PE<20   AND ROE>15") is first
+    assert cache.compile(first.dsl) is first
+    assert cache.get_stats()["hits"] == 2
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_plan_cache_is_bounded():
+    cache = PlanCache(max_entries=4)
+    for n in range(10):
+        cache.compile(f"pe < {n}")
+    assert cache.get_stats()["cached_plans"] <= 4
+
+
+@pytest.fixture
+def engine():
+    engine = ScreeningEngine()
+    engine._build([ScreeningEngine._row_from_fundamentals(symbol, fund) for symbol, fund in {
+        "CHEAP": {"current_price": 10.0, "pe_ratio": 8.0, "refreshed_on": TODAY},
+        "DEAR": {"current_price": 10.0, "pe_ratio": 40.0, "refreshed_on": TODAY},
+        "LOSS": {"current_price": 10.0, "refreshed_on": TODAY},  # No P/E
+    }.items()])
+    return engine
+
+
+def _matches(engine, text):
+    return sorted(engine.symbols_at()[engine.evaluate(compile_dsl(text).root)])
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("pe > 20", ["DEAR"]),
+    ("not pe > 20", ["CHEAP"]),
+    ("pe != 8", ["DEAR"]),
+    ("not pe between 5 and 10", ["DEAR"]),
+    ("not (pe > 20 or pe < 10)", []),
+    ("not (pe > 20 and pe < 10)", ["CHEAP", "DEAR"]),
+    ("not (pe > 20) or symbol = loss", ["CHEAP", "LOSS"]),
+    ("not symbol = cheap", ["DEAR", "LOSS"]),
+])
+def test_nan_fields_match_neither_a_comparison_nor_its_negation(engine, text, expected):
+    assert _matches(engine, text) == expected
+
+
+def test_evaluate_on_row_subset(engine):
+    rows = np.array([2, 1])
+    mask = engine.evaluate(compile_dsl("not pe < 10").root, rows)
+    assert list(mask) == [False, True]
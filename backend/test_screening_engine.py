@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from screening_engine import ScreeningEngine
+
+TODAY = date.today().isoformat()
+YESTERDAY = (date.today() - timedelta(days=1)).isoformat()
+
+
+def _engine(funds: dict) -> ScreeningEngine:
+    engine = ScreeningEngine()
+    engine._build([ScreeningEngine._row_from_fundamentals(symbol, fund) for symbol, fund in funds.items()])
+    return engine
+
+
+@pytest.fixture
+def engine():
+    return _engine({
+        # Nightly row: current_price is already yesterday's close
+        "NIGHTLY": {"current_price": 100.0, "previous_close": 90.0, "change_percent": 11.1, "refreshed_on": YESTERDAY},
+        # Ingested during today's session: measured against previous_close
+        "INTRADAY": {"current_price": 210.0, "previous_close": 200.0, "refreshed_on": TODAY},
+    })
+
+
+def test_nightly_row_shows_no_move_before_first_tick(engine):
+    row = engine.get_rows(["NIGHTLY"])[0]
+    assert row["prev_close"] == 100.0
+    assert row["change"] == 0.0
+    assert row["change_percent"] == 0.0
+
+
+def test_intraday_row_measures_against_previous_close(engine):
+    row = engine.get_rows(["INTRADAY"])[0]
+    assert row["prev_close"] == 200.0
+    assert row["change_percent"] == 5.0
+
+
+def test_live_moves_measured_against_reference_close(engine):
+    engine.update_prices({"NIGHTLY": 96.0})
+    engine.update_prices({"NIGHTLY": 95.0})  # Repeated ticks keep the same base
+    row = engine.get_rows(["NIGHTLY"])[0]
+    assert row["prev_close"] == 100.0
+    assert row["change"] == -5.0
+    assert row["change_percent"] == -5.0
+
+
+def test_down_today_screen(engine):
+    engine.update_prices({"NIGHTLY": 98.0, "INTRADAY": 190.0})
+    mask = engine.evaluate(("cmp", "change_percent", "<", -3))
+    assert list(engine.symbols_at()[mask]) == ["INTRADAY"]
+
+
+def test_update_prices_returns_changed_rows_only(engine):
+    changed = engine.update_prices({"NIGHTLY": 100.0, "INTRADAY": 211.0, "UNKNOWN": 5.0})
+    assert list(engine.symbols_at(changed)) == ["INTRADAY"]
+
+
+def test_unknown_reference_close_is_nan():
+    engine = _engine({"NOCLOSE": {"current_price": 50.0, "refreshed_on": TODAY}})
+    engine.update_prices({"NOCLOSE": 55.0})
+    assert np.isnan(engine._columns["change_percent"][0])
+    assert not engine.evaluate(("cmp", "change_percent", ">", 0)).any()
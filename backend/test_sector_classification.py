@@ -0,0 +1,77 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+import sector_classification as sc
+from sector_classification import SectorClassification, clean_symbol
+
+YESTERDAY = (date.today() - timedelta(days=1)).isoformat()
+
+
+@pytest.mark.parametrize("raw, clean", [
+    ("RELIANCE-EQ", "RELIANCE"),
+    ("RELIANCE.NS", "RELIANCE"),
+    ("reliance.xnse", "RELIANCE"),
+    ("SBIN.BO", "SBIN"),
+    ("IDEA-BE", "IDEA"),
+    ("BAJAJ-AUTO-EQ", "BAJAJ-AUTO"),
+    ("BAJAJ-AUTO.NS", "BAJAJ-AUTO"),
+    ("M&M", "M&M"),
+])
+def test_clean_symbol(raw, clean):
+    assert clean_symbol(raw) == clean
+
+
+@pytest.fixture
+def classification(monkeypatch):
+    rows = {
+        "BAJAJ-AUTO": {"current_price": 100.0, "market_cap": 3e12, "industry": "Auto Manufacturers", "refreshed_on": YESTERDAY},
+        "MARUTI": {"current_price": 200.0, "market_cap": 4e12, "industry": "Auto Manufacturers", "refreshed_on": YESTERDAY},
+        "HDFCBANK": {"current_price": 50.0, "market_cap": 1e13, "industry": "Banks - Regional", "refreshed_on": YESTERDAY},
+    }
+    monkeypatch.setattr(sc.fundamentals_store, "load_universe", lambda: rows)
+    classification = SectorClassification()
+    asyncio.run(classification.refresh())
+    return classification
+
+
+def test_hyphenated_ticker_lookups(classification):
+    assert classification.sector_of("BAJAJ-AUTO-EQ") == "Auto"
+    assert classification.market_cap_category("BAJAJ-AUTO-EQ") == "Large-cap"
+    assert classification.reference_close("BAJAJ-AUTO.NS") == 100.0
+
+
+def test_sector_aggregates_follow_ticks(classification):
+    classification.on_price_batch({
+        "1": {"symbol": "BAJAJ-AUTO-EQ", "ltp": 110.0, "volume": 10},
+        "2": {"symbol": "MARUTI-EQ", "ltp": 190.0},
+        "3": {"symbol": "HDFCBANK-EQ", "ltp": 50.0},
+    })
+    summary = classification.sector_summary()
+    assert summary["Auto"] == {
+        "avg_change": 2.5, "stock_count": 2, "advances": 1, "declines": 1, "unchanged": 0, "turnover": 1100.0,
+    }
+    assert summary["Banking"]["unchanged"] == 1
+
+    # A second tick replaces the symbol's contribution instead of adding to it
+    classification.on_price_batch({"1": {"symbol": "BAJAJ-AUTO-EQ", "ltp": 90.0}})
+    assert classification.sector_summary()["Auto"]["advances"] == 0
+    assert classification.sector_summary()["Auto"]["declines"] == 2
+
+
+def test_live_only_after_ticks(classification):
+    assert not classification.is_live
+    classification.on_price_batch({"1": {"symbol": "MARUTI-EQ", "ltp": 210.0}})
+    assert classification.is_live
+
+
+def test_new_session_drops_carried_changes(classification):
+    classification.on_price_batch({"1": {"symbol": "MARUTI-EQ", "ltp": 210.0}})
+    asyncio.run(classification.refresh())  # Same session: live change kept
+    assert classification.sector_summary()["Auto"]["advances"] == 1
+
+    classification.last_refresh -= timedelta(days=1)
+    asyncio.run(classification.refresh())
+    assert classification.sector_summary()["Auto"]["advances"] == 0
+    assert classification.sector_summary()["Auto"]["avg_change"] == 0.0
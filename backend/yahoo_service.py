@@ -10,6 +10,9 @@ FUNDAMENTALS_TTL = 86400  # 24 hours
 BATCH_TTL = 300  # 5 minutes
 QUOTE_TTL = 30  # 30 seconds for quotes
 
+# Fundamentals fields that move intraday: never served from the nightly store or the 24h cache
+PRICE_FIELDS = ("current_price", "previous_close", "change", "change_percent")
+
 # In-memory cache for Yahoo quotes
 _yahoo_quote_cache = {}
 
@@ -199,21 +202,7 @@ def _fetch_yahoo_history_sync(symbol: str, period: str, interval: str):
     Internal sync function to fetch from Yahoo
     """
     try:
-        # Normalize symbol for Yahoo
-        ticker_symbol = symbol
-        
-        # Remove Angel One suffixes like -EQ.XNSE or .XNSE
-        if "-EQ" in ticker_symbol:
-            ticker_symbol = ticker_symbol.replace("-EQ", "")
-        
-        if ticker_symbol.endswith(".XNSE"):
-             ticker_symbol = ticker_symbol.replace(".XNSE", ".NS")
-        elif ticker_symbol.endswith(".XBSE"):
-             ticker_symbol = ticker_symbol.replace(".XBSE", ".BO")
-        
-        # If no suffix, assume NSE (.NS)
-        if not ticker_symbol.endswith(".NS") and not ticker_symbol.endswith(".BO"):
-             ticker_symbol = f"{ticker_symbol}.NS"
+        ticker_symbol = _to_yahoo_ticker(symbol)
              
         print(f"[YAHOO] Fetching {ticker_symbol} period={period} interval={interval}")
         
@@ -227,61 +216,206 @@ def _fetch_yahoo_history_sync(symbol: str, period: str, interval: str):
             print(f"[YAHOO] No data returned for {ticker_symbol} period={period} interval={interval}")
             return []
 
-        # Reset index to make Date a column and convert to list of dicts
-        history.reset_index(inplace=True)
-        
-        # Normalize columns
-        data = []
-        for index, row in history.iterrows():
-            data.append({
-                "date": row["Date"].isoformat(),
-                "open": row["Open"],
-                "high": row["High"],
-                "low": row["Low"],
-                "close": row["Close"],
-                "volume": row["Volume"]
-            })
-            
-        return data
+        return _history_to_records(history)
     except Exception as e:
         print(f"[YAHOO] Error fetching history for {symbol}: {e}")
         return []
 
+def _to_yahoo_ticker(symbol: str) -> str:
+    """Normalize an app/Angel One symbol to a Yahoo ticker (RELIANCE-EQ -> RELIANCE.NS)"""
+    if symbol.startswith("^"):
+        return symbol  # Yahoo index (^NSEI), no exchange suffix
+    ticker_symbol = symbol
+    
+    # Remove Angel One suffixes like -EQ.XNSE or .XNSE
+    if "-EQ" in ticker_symbol:
+        ticker_symbol = ticker_symbol.replace("-EQ", "")
+    
+    if ticker_symbol.endswith(".XNSE"):
+         ticker_symbol = ticker_symbol.replace(".XNSE", ".NS")
+    elif ticker_symbol.endswith(".XBSE"):
+         ticker_symbol = ticker_symbol.replace(".XBSE", ".BO")
+    
+    # If no suffix, assume NSE (.NS)
+    if not ticker_symbol.endswith(".NS") and not ticker_symbol.endswith(".BO"):
+         ticker_symbol = f"{ticker_symbol}.NS"
+    
+    return ticker_symbol
+
+def _history_to_records(history: pd.DataFrame) -> list:
+    """Convert a Yahoo OHLCV frame (DatetimeIndex) to the list-of-dicts history format"""
+    history = history.dropna(subset=["Open", "High", "Low", "Close"])
+    return [
+        {
+            "date": ts.isoformat(),
+            "open": float(o),
+            "high": float(h),
+            "low": float(l),
+            "close": float(c),
+            "volume": int(v) if pd.notna(v) else 0
+        }
+        for ts, o, h, l, c, v in zip(
+            history.index, history["Open"], history["High"], history["Low"],
+            history["Close"], history["Volume"]
+        )
+    ]
+
+async def get_yahoo_history_batch(symbols: list, period: str = "1mo", interval: str = "1d") -> dict:
+    """
+    Fetch historical data for many symbols with one Yahoo multi-ticker download.
+    Shares the per-symbol cache with get_yahoo_history; only misses are downloaded.
+    Returns {symbol: [candles]}.
+    """
+    from market_cache import market_data_cache
+    
+    cache_keys = [f"history:{symbol}:{period}:{interval}" for symbol in symbols]
+    cached = await asyncio.gather(*(market_data_cache.get(key) for key in cache_keys))
+    
+    results = {}
+    missing = []
+    for symbol, data in zip(symbols, cached):
+        if data:
+            results[symbol] = data
+        else:
+            missing.append(symbol)
+    
+    if missing:
+        print(f"[YAHOO] Batch history: {len(results)} cached, downloading {len(missing)}")
+        fetched = await asyncio.to_thread(_fetch_yahoo_history_batch_sync, missing, period, interval)
+        for symbol in missing:
+            data = fetched.get(symbol, [])
+            results[symbol] = data
+            if data:
+                await market_data_cache.set(f"history:{symbol}:{period}:{interval}", data, ttl=HISTORY_TTL)
+    
+    return results
+
+@retry_on_failure(retries=2, delay=1)
+def _fetch_yahoo_history_batch_sync(symbols: list, period: str, interval: str) -> dict:
+    """
+    Internal sync function: single yf.download call for all tickers
+    """
+    tickers = {symbol: _to_yahoo_ticker(symbol) for symbol in symbols}
+    unique_tickers = sorted(set(tickers.values()))
+    
+    print(f"[YAHOO] Batch downloading {len(unique_tickers)} tickers period={period} interval={interval}")
+    frame = yf.download(
+        unique_tickers,
+        period=period,
+        interval=interval,
+        group_by="ticker",
+        auto_adjust=True,
+        threads=True,
+        progress=False
+    )
+    
+    results = {}
+    for symbol, ticker_symbol in tickers.items():
+        try:
+            if isinstance(frame.columns, pd.MultiIndex):
+                if ticker_symbol not in frame.columns.get_level_values(0):
+                    results[symbol] = []
+                    continue
+                history = frame[ticker_symbol]
+            else:
+                history = frame
+            results[symbol] = _history_to_records(history)
+        except Exception as e:
+            print(f"[YAHOO] Error parsing batch history for {symbol}: {e}")
+            results[symbol] = []
+    
+    return results
+
 async def get_stock_fundamentals(symbol: str):
     """
-    Fetch fundamental data with Caching
+    Fetch fundamental data with Caching.
+    Fundamentals come from the nightly store (or one Yahoo fetch); the price
+    fields are always overlaid from a short-TTL live fetch.
     """
     cache_key = f"fundamentals:{symbol}"
     
     # Try Cache
     from market_cache import market_data_cache
-    cached_data = await market_data_cache.get(cache_key)
-    if cached_data:
-        return cached_data
-        
-    # Fetch from API
-    data = await asyncio.to_thread(_fetch_stock_fundamentals_sync, symbol)
+    data = await market_data_cache.get(cache_key)
+    
+    if not data:
+        data = await _load_fundamentals(symbol)
+        # Save to Cache (price fields are never served from here)
+        if data:
+            await market_data_cache.set(cache_key, data, ttl=FUNDAMENTALS_TTL)
+    if not data:
+        return data
+    
+    data = {key: value for key, value in data.items() if key not in PRICE_FIELDS}
+    data.update(await _get_live_price_fields(symbol))
+    return data
+
+async def _load_fundamentals(symbol: str) -> dict:
+    """Store row for universe stocks, else one Yahoo fetch (stored only for universe stocks)"""
+    from fundamentals_store import fundamentals_store
+    ticker_symbol = _to_yahoo_ticker(symbol)
+    try:
+        in_universe = await asyncio.to_thread(fundamentals_store.in_universe, ticker_symbol)
+        data = await asyncio.to_thread(fundamentals_store.get, ticker_symbol) if in_universe else None
+    except Exception as e:
+        print(f"[YAHOO] Fundamentals store read failed for {symbol}: {e}")
+        in_universe, data = False, None
     
-    # Save to Cache
     if data:
-        await market_data_cache.set(cache_key, data, ttl=FUNDAMENTALS_TTL)
-        
+        data["symbol"] = symbol
+        return data
+    
+    # Not ingested yet (new listing, first boot), or outside the universe (indices) - fetch from API
+    data = await asyncio.to_thread(_fetch_stock_fundamentals_sync, symbol)
+    if data and in_universe:
+        try:
+            await asyncio.to_thread(fundamentals_store.upsert_many, {ticker_symbol: data})
+        except Exception as e:
+            print(f"[YAHOO] Fundamentals store write failed for {symbol}: {e}")
     return data
 
+async def _get_live_price_fields(symbol: str) -> dict:
+    """current_price/previous_close/change/change_percent, cached for QUOTE_TTL"""
+    from market_cache import market_data_cache
+    cache_key = f"fundamentals_price:{symbol}"
+    prices = await market_data_cache.get(cache_key)
+    if not prices:
+        prices = await asyncio.to_thread(_fetch_price_fields_sync, symbol)
+        if prices:
+            await market_data_cache.set(cache_key, prices, ttl=QUOTE_TTL)
+    return prices or {}
+
+def _fetch_price_fields_sync(symbol: str) -> dict:
+    """Live price fields from fast_info (works for ^ indices too)"""
+    try:
+        fast_info = yf.Ticker(_to_yahoo_ticker(symbol)).fast_info
+        current_price = fast_info.last_price
+        previous_close = fast_info.previous_close
+    except Exception as e:
+        print(f"[YAHOO] Error fetching live price for {symbol}: {e}")
+        return {}
+    if not current_price or current_price <= 0:
+        return {}
+    
+    if previous_close and previous_close > 0:
+        change = current_price - previous_close
+        change_percent = (change / previous_close) * 100
+    else:
+        change = 0
+        change_percent = 0
+    return {
+        "current_price": current_price,
+        "previous_close": previous_close,
+        "change": round(change, 2),
+        "change_percent": round(change_percent, 2)
+    }
+
 def _fetch_stock_fundamentals_sync(symbol: str):
     """
     Internal sync function for fundamentals
     """
     try:
-        # Normalize symbol for Yahoo (Copy logic from above)
-        ticker_symbol = symbol
-        
-        # Skip normalization for indices (starting with ^)
-        if not ticker_symbol.startswith("^"):
-            if "-EQ" in ticker_symbol: ticker_symbol = ticker_symbol.replace("-EQ", "")
-            if ticker_symbol.endswith(".XNSE"): ticker_symbol = ticker_symbol.replace(".XNSE", ".NS")
-            elif ticker_symbol.endswith(".XBSE"): ticker_symbol = ticker_symbol.replace(".XBSE", ".BO")
-            if not ticker_symbol.endswith(".NS") and not ticker_symbol.endswith(".BO"): ticker_symbol = f"{ticker_symbol}.NS"
+        ticker_symbol = _to_yahoo_ticker(symbol)
         
         stock = yf.Ticker(ticker_symbol)
         info = stock.info
@@ -310,6 +444,10 @@ def _fetch_stock_fundamentals_sync(symbol: str):
             "beta": info.get("beta", 0),
             "52_week_high": info.get("fiftyTwoWeekHigh", 0),
             "52_week_low": info.get("fiftyTwoWeekLow", 0),
+            # Ratios in the units the app displays: D/E as a ratio, ROE/growth in percent
+            "debt_to_equity": round(info["debtToEquity"] / 100, 2) if info.get("debtToEquity") is not None else None,
+            "return_on_equity": round(info["returnOnEquity"] * 100, 2) if info.get("returnOnEquity") is not None else None,
+            "revenue_growth": round(info["revenueGrowth"] * 100, 2) if info.get("revenueGrowth") is not None else None,
             "business_summary": info.get("longBusinessSummary", ""),
             "current_price": current_price,
             "previous_close": previous_close,
@@ -89,35 +89,14 @@ export default function PortfolioScreen() {
                 return;
             }
 
-            // Fetch all portfolio data in parallel
-            const [overviewData, stocksData, analysisData, signalsData, summaryData] = await Promise.all([
-                api.get('/api/portfolio/overview', token).catch(err => {
-                    console.error('[PORTFOLIO] Overview error:', err);
-                    return null;
-                }),
-                api.get('/api/portfolio/stocks', token).catch(err => {
-                    console.error('[PORTFOLIO] Stocks error:', err);
-                    return { stocks: [] };
-                }),
-                api.get('/api/portfolio/analysis', token).catch(err => {
-                    console.error('[PORTFOLIO] Analysis error:', err);
-                    return null;
-                }),
-                api.get('/api/portfolio/signals', token).catch(err => {
-                    console.error('[PORTFOLIO] Signals error:', err);
-                    return { signals: [] };
-                }),
-                api.get('/api/portfolio/ai-summary', token).catch(err => {
-                    console.error('[PORTFOLIO] AI Summary error:', err);
-                    return { summary: '' };
-                })
-            ]);
-
-            setOverview(overviewData);
-            setStocks(stocksData.stocks || []);
-            setAnalysis(analysisData);
-            setSignals(signalsData.signals || []);
-            setAiSummary(summaryData.summary || '');
+            // One round trip; the backend loads each symbol once for every section
+            const dashboard = await api.get('/api/portfolio/dashboard', token);
+
+            setOverview(dashboard.overview);
+            setStocks(dashboard.stocks || []);
+            setAnalysis(dashboard.analysis);
+            setSignals(dashboard.signals || []);
+            setAiSummary(dashboard.ai_summary?.summary || '');
         } catch (error) {
             console.error('[PORTFOLIO] Error fetching data:', error);
         } finally {
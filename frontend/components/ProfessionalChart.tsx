@@ -2,6 +2,7 @@ import React, { useEffect, useState, useRef } from 'react';
 import { View, ActivityIndicator, Text, StyleSheet, Dimensions } from 'react-native';
 import { WebView } from 'react-native-webview';
 import { api } from '../utils/api';
+import { useChartViewer } from '../hooks/useChartViewer';
 
 interface ProfessionalChartProps {
   symbol: string;
@@ -24,6 +25,9 @@ export default function ProfessionalChart({ symbol, interval, height = 400, them
 
   const screenWidth = Dimensions.get('window').width;
 
+  // Keeps the backend refreshing this chart's candles while it is mounted
+  useChartViewer(symbol, interval);
+
   // PHASE 5: Reset on symbol/interval change
   useEffect(() => {
     resetAndLoadInitial();
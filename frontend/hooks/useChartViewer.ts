@@ -0,0 +1,65 @@
+/**
+ * useChartViewer Hook
+ * Registers the open chart with the backend so its candles keep refreshing while it is on screen
+ */
+
+import { useEffect, useRef } from 'react';
+
+const BACKEND_URL = process.env.EXPO_PUBLIC_BACKEND_URL || 'http://localhost:8000';
+const WS_URL = BACKEND_URL.replace('http://', 'ws://').replace('https://', 'wss://');
+
+export const useChartViewer = (symbol: string, interval: string) => {
+    const ws = useRef<WebSocket | null>(null);
+    const reconnectTimeout = useRef<NodeJS.Timeout | null>(null);
+    const reconnectAttempts = useRef(0);
+    const maxReconnectAttempts = 10;
+
+    useEffect(() => {
+        if (!symbol) return;
+        let closed = false;
+
+        const connect = () => {
+            const websocket = new WebSocket(`${WS_URL}/ws/market-data`);
+
+            websocket.onopen = () => {
+                reconnectAttempts.current = 0;
+                // Sent again after every reconnect: the server drops viewers with the socket
+                websocket.send(JSON.stringify({ type: 'chart_open', symbol, interval }));
+                console.log('[CHART_WS] Viewing', symbol, interval);
+            };
+
+            websocket.onerror = (error) => {
+                console.error('[CHART_WS] Error:', error);
+            };
+
+            websocket.onclose = () => {
+                if (closed || reconnectAttempts.current >= maxReconnectAttempts) return;
+                const delay = Math.min(1000 * Math.pow(2, reconnectAttempts.current), 30000);
+                reconnectTimeout.current = setTimeout(() => {
+                    reconnectAttempts.current++;
+                    connect();
+                }, delay) as any;
+            };
+
+            ws.current = websocket;
+        };
+
+        connect();
+
+        return () => {
+            closed = true;
+            if (reconnectTimeout.current) {
+                clearTimeout(reconnectTimeout.current);
+                reconnectTimeout.current = null;
+            }
+            const websocket = ws.current;
+            ws.current = null;
+            if (websocket) {
+                if (websocket.readyState === WebSocket.OPEN) {
+                    websocket.send(JSON.stringify({ type: 'chart_close', symbol, interval }));
+                }
+                websocket.close();
+            }
+        };
+    }, [symbol, interval]);
+};